@@ -13,7 +13,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from app.db.database import Base
 from app.core.config import settings
-from app.models import User, AnalysisRequest, AnalysisResult
+from app.models import User, AnalysisBatch, AnalysisRequest, AnalysisResult, ReviewModel, WatchedProduct, AspectCountFact, AspectFactSnapshot
 
 
 config = context.config
@@ -0,0 +1,24 @@
+"""Composite (product_id, id) index for keyset pagination of reviews
+
+Revision ID: 3d5e7a9c1b20
+Revises: 8c1f4b2d9a7e
+Create Date: 2026-10-19 11:40:05.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d5e7a9c1b20'
+down_revision = '8c1f4b2d9a7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reviews_product_id_id', 'reviews', ['product_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_reviews_product_id_id', table_name='reviews')
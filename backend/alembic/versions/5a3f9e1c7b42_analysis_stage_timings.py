@@ -0,0 +1,25 @@
+"""Per-stage timings on analysis requests
+
+Revision ID: 5a3f9e1c7b42
+Revises: e4a91d6c5f08
+Create Date: 2026-10-19 16:08:41.217304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5a3f9e1c7b42'
+down_revision = 'e4a91d6c5f08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('analysis_requests', sa.Column('stage_timings', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('analysis_requests', 'stage_timings')
@@ -0,0 +1,66 @@
+"""Reviews table and unique (source, external_id) index
+
+Revision ID: 8c1f4b2d9a7e
+Revises: 479afe9eabfe
+Create Date: 2026-10-19 10:12:31.402815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f4b2d9a7e'
+down_revision = '479afe9eabfe'
+branch_labels = None
+depends_on = None
+
+# Комментарий таблицы отмечает, что ее создала эта ревизия: downgrade удаляет только такую
+CREATED_BY_COMMENT = f'created by migration {revision}'
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'reviews' not in sa.inspect(bind).get_table_names():
+        op.create_table('reviews',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('external_id', sa.String(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=True),
+        sa.Column('product_id', sa.String(), nullable=False),
+        sa.Column('product_name', sa.String(), nullable=True),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('date', sa.String(), nullable=True),
+        sa.Column('author', sa.String(), nullable=True),
+        sa.Column('likes', sa.Integer(), nullable=True),
+        sa.Column('dislikes', sa.Integer(), nullable=True),
+        sa.Column('photos', sa.JSON(), nullable=True),
+        sa.Column('sentiment', sa.JSON(), nullable=True),
+        sa.Column('topics', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        comment=CREATED_BY_COMMENT
+        )
+        op.create_index(op.f('ix_reviews_id'), 'reviews', ['id'], unique=False)
+        op.create_index(op.f('ix_reviews_external_id'), 'reviews', ['external_id'], unique=False)
+        op.create_index(op.f('ix_reviews_product_id'), 'reviews', ['product_id'], unique=False)
+        op.create_index(op.f('ix_reviews_source'), 'reviews', ['source'], unique=False)
+    else:
+        # Таблица могла быть создана вручную: убираем дубликаты до создания уникального индекса
+        op.execute(
+            "DELETE FROM reviews a USING reviews b "
+            "WHERE a.external_id IS NOT NULL AND a.source = b.source "
+            "AND a.external_id = b.external_id AND a.id > b.id"
+        )
+
+    op.create_index('ux_reviews_source_external_id', 'reviews', ['source', 'external_id'], unique=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    comment = sa.inspect(bind).get_table_comment('reviews').get('text')
+    if comment == CREATED_BY_COMMENT:
+        op.drop_table('reviews')
+        return
+    op.drop_index('ux_reviews_source_external_id', table_name='reviews')
@@ -0,0 +1,25 @@
+"""Stored sampling profile on analysis requests
+
+Revision ID: 9b6d2e8f4a13
+Revises: 5a3f9e1c7b42
+Create Date: 2026-10-19 17:21:05.663918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9b6d2e8f4a13'
+down_revision = '5a3f9e1c7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('analysis_requests', sa.Column('profile', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('analysis_requests', 'profile')
@@ -0,0 +1,53 @@
+"""Watched products for scheduled pre-computation
+
+Revision ID: a4c8e2f6b913
+Revises: f1a7c3e9d254
+Create Date: 2026-10-19 21:27:54.118630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b913'
+down_revision = 'f1a7c3e9d254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('watched_products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.String(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('max_reviews', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('next_refresh_at', sa.DateTime(), nullable=False),
+    sa.Column('last_refreshed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('analysis_id', sa.Integer(), nullable=True),
+    sa.Column('counted_review_ids', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analysis_requests.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_watched_products_id'), 'watched_products', ['id'], unique=False)
+    op.create_index(
+        'ux_watched_products_user_product', 'watched_products', ['user_id', 'marketplace', 'product_id'], unique=True
+    )
+    op.create_index('ix_watched_products_next_refresh_at', 'watched_products', ['next_refresh_at'], unique=False)
+    op.create_index(
+        'ix_watched_products_marketplace_product_id', 'watched_products', ['marketplace', 'product_id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_watched_products_marketplace_product_id', table_name='watched_products')
+    op.drop_index('ix_watched_products_next_refresh_at', table_name='watched_products')
+    op.drop_index('ux_watched_products_user_product', table_name='watched_products')
+    op.drop_index(op.f('ix_watched_products_id'), table_name='watched_products')
+    op.drop_table('watched_products')
@@ -0,0 +1,143 @@
+"""Append-only aspect count facts for trend queries
+
+Revision ID: b5d9f3a7c168
+Revises: a4c8e2f6b913
+Create Date: 2026-10-19 22:14:41.672350
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d9f3a7c168'
+down_revision = 'a4c8e2f6b913'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 500
+
+
+def upgrade():
+    op.create_table('aspect_fact_snapshots',
+    sa.Column('analysis_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('product_id', sa.String(), nullable=False),
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('reviews', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('analysis_id')
+    )
+    op.create_index(
+        'ix_aspect_fact_snapshots_product_date', 'aspect_fact_snapshots',
+        ['marketplace', 'product_id', 'bucket_date'], unique=False
+    )
+    op.create_table('aspect_count_facts',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('product_id', sa.String(), nullable=False),
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('aspect', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('polarity', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_aspect_count_facts_product_date', 'aspect_count_facts',
+        ['marketplace', 'product_id', 'bucket_date'], unique=False
+    )
+    op.create_index(
+        'ix_aspect_count_facts_product_aspect_date', 'aspect_count_facts',
+        ['marketplace', 'product_id', 'aspect', 'bucket_date'], unique=False
+    )
+    # Проанализированные отзывы снимка: счетчик аккумулятора, у старых результатов - reviews_count
+    op.execute(
+        """
+        INSERT INTO aspect_fact_snapshots (analysis_id, marketplace, product_id, bucket_date, reviews, created_at)
+        SELECT r.id, r.marketplace, r.product_id, res.created_at::date,
+               COALESCE((res.accumulator ->> 'reviews')::int, res.reviews_count, 0), now()
+        FROM analysis_results res
+        JOIN analysis_requests r ON r.id = res.request_id AND r.reused_from_id IS NULL
+        WHERE res.created_at IS NOT NULL
+        """
+    )
+    _backfill_facts(op.get_bind())
+
+
+def _backfill_facts(bind):
+    # Факты из уже сохраненных результатов: аспект лемматизируется и сворачивается так же,
+    # как в aspect_fact_rows, иначе исторические формы ("доставки") не совпадут с запросом
+    # тренда. Копии переиспользованных анализов не учитываются
+    from app.services.analyzer.text_preprocessor import get_text_preprocessor
+    lemmatize = get_text_preprocessor().lemmatize_text
+
+    facts = sa.table(
+        'aspect_count_facts',
+        sa.column('analysis_id', sa.Integer),
+        sa.column('marketplace', sa.String),
+        sa.column('product_id', sa.String),
+        sa.column('bucket_date', sa.Date),
+        sa.column('aspect', sa.String),
+        sa.column('category', sa.String),
+        sa.column('polarity', sa.String),
+        sa.column('count', sa.Integer),
+        sa.column('created_at', sa.DateTime),
+    )
+    results = sa.text(
+        """
+        SELECT r.id, r.marketplace, r.product_id, res.created_at::date AS bucket_date, res.aspect_categories
+        FROM analysis_results res
+        JOIN analysis_requests r ON r.id = res.request_id AND r.reused_from_id IS NULL
+        WHERE res.created_at IS NOT NULL AND r.id > :last_id
+        ORDER BY r.id
+        LIMIT :limit
+        """
+    ).columns(aspect_categories=postgresql.JSONB)
+
+    last_id = 0
+    while True:
+        batch = bind.execute(results, {"last_id": last_id, "limit": BACKFILL_BATCH}).mappings().all()
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        rows = []
+        for result in batch:
+            counts = {}
+            for polarity in ("positive", "negative"):
+                for category in ((result["aspect_categories"] or {}).get(polarity) or {}).get("categories", []):
+                    for aspect in category.get("aspects", []):
+                        lemma = lemmatize((aspect.get("text") or "").lower())
+                        if not lemma:
+                            continue
+                        row = counts.setdefault((lemma, polarity), {"category": category.get("name"), "count": 0})
+                        row["count"] += aspect.get("count", 0)
+            rows.extend(
+                {
+                    "analysis_id": result["id"],
+                    "marketplace": result["marketplace"],
+                    "product_id": result["product_id"],
+                    "bucket_date": result["bucket_date"],
+                    "aspect": lemma,
+                    "category": row["category"],
+                    "polarity": polarity,
+                    "count": row["count"],
+                    "created_at": datetime.utcnow(),
+                }
+                for (lemma, polarity), row in counts.items()
+            )
+        if rows:
+            op.bulk_insert(facts, rows)
+
+
+def downgrade():
+    op.drop_index('ix_aspect_count_facts_product_aspect_date', table_name='aspect_count_facts')
+    op.drop_index('ix_aspect_count_facts_product_date', table_name='aspect_count_facts')
+    op.drop_table('aspect_count_facts')
+    op.drop_index('ix_aspect_fact_snapshots_product_date', table_name='aspect_fact_snapshots')
+    op.drop_table('aspect_fact_snapshots')
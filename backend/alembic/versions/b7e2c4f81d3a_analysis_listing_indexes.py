@@ -0,0 +1,36 @@
+"""Indexes for analysis listing and result lookup
+
+Revision ID: b7e2c4f81d3a
+Revises: 3d5e7a9c1b20
+Create Date: 2026-10-19 12:25:47.530916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c4f81d3a'
+down_revision = '3d5e7a9c1b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_analysis_requests_user_id_created_at',
+        'analysis_requests',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False
+    )
+    # save_result никогда не создает второй результат для запроса, но старые данные проверяем
+    op.execute(
+        "DELETE FROM analysis_results a USING analysis_results b "
+        "WHERE a.request_id = b.request_id AND a.id < b.id"
+    )
+    op.create_index(op.f('ix_analysis_results_request_id'), 'analysis_results', ['request_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_analysis_results_request_id'), table_name='analysis_results')
+    op.drop_index('ix_analysis_requests_user_id_created_at', table_name='analysis_requests')
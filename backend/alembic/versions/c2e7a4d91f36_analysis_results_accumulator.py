@@ -0,0 +1,25 @@
+"""Serialized aggregate accumulator on analysis results
+
+Revision ID: c2e7a4d91f36
+Revises: 9b6d2e8f4a13
+Create Date: 2026-10-19 18:34:12.480127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e7a4d91f36'
+down_revision = '9b6d2e8f4a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('analysis_results', sa.Column('accumulator', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('analysis_results', 'accumulator')
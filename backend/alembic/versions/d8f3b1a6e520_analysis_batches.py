@@ -0,0 +1,45 @@
+"""Analysis batches for multi-product submissions
+
+Revision ID: d8f3b1a6e520
+Revises: c2e7a4d91f36
+Create Date: 2026-10-19 19:52:08.314276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3b1a6e520'
+down_revision = 'c2e7a4d91f36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analysis_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_batches_id'), 'analysis_batches', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_batches_user_id'), 'analysis_batches', ['user_id'], unique=False)
+    op.add_column('analysis_requests', sa.Column('batch_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'analysis_requests_batch_id_fkey', 'analysis_requests', 'analysis_batches',
+        ['batch_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_analysis_requests_batch_id'), 'analysis_requests', ['batch_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_analysis_requests_batch_id'), table_name='analysis_requests')
+    op.drop_constraint('analysis_requests_batch_id_fkey', 'analysis_requests', type_='foreignkey')
+    op.drop_column('analysis_requests', 'batch_id')
+    op.drop_index(op.f('ix_analysis_batches_user_id'), table_name='analysis_batches')
+    op.drop_index(op.f('ix_analysis_batches_id'), table_name='analysis_batches')
+    op.drop_table('analysis_batches')
@@ -0,0 +1,41 @@
+"""JSONB analysis results and packed response blob
+
+Revision ID: e4a91d6c5f08
+Revises: b7e2c4f81d3a
+Create Date: 2026-10-19 13:52:18.904233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a91d6c5f08'
+down_revision = 'b7e2c4f81d3a'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = ['positive_aspects', 'negative_aspects', 'aspect_categories', 'sentiment_summary', 'product_info']
+
+
+def upgrade():
+    for column in JSON_COLUMNS:
+        op.alter_column('analysis_results', column,
+                   existing_type=sa.JSON(),
+                   type_=postgresql.JSONB(astext_type=sa.Text()),
+                   existing_nullable=True,
+                   postgresql_using=f'{column}::jsonb')
+    op.add_column('analysis_results', sa.Column('response_blob', sa.LargeBinary(), nullable=True))
+    op.add_column('analysis_results', sa.Column('response_etag', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('analysis_results', 'response_etag')
+    op.drop_column('analysis_results', 'response_blob')
+    for column in JSON_COLUMNS:
+        op.alter_column('analysis_results', column,
+                   existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                   type_=sa.JSON(),
+                   existing_nullable=True,
+                   postgresql_using=f'{column}::json')
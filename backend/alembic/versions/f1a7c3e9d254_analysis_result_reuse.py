@@ -0,0 +1,36 @@
+"""Result reuse link and product lookup index on analysis requests
+
+Revision ID: f1a7c3e9d254
+Revises: d8f3b1a6e520
+Create Date: 2026-10-19 20:41:36.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a7c3e9d254'
+down_revision = 'd8f3b1a6e520'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('analysis_requests', sa.Column('reused_from_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'analysis_requests_reused_from_id_fkey', 'analysis_requests', 'analysis_requests',
+        ['reused_from_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(
+        'ix_analysis_requests_product_lookup',
+        'analysis_requests',
+        ['marketplace', 'product_id', 'max_reviews', sa.text('created_at DESC')],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_analysis_requests_product_lookup', table_name='analysis_requests')
+    op.drop_constraint('analysis_requests_reused_from_id_fkey', 'analysis_requests', type_='foreignkey')
+    op.drop_column('analysis_requests', 'reused_from_id')
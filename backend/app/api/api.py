@@ -4,6 +4,8 @@ import os
 from app.api.endpoints import analysis, parsers, reviews, debug
 from app.api.endpoints import auth
 from app.api.endpoints import user_analysis
+from app.api.endpoints import watchlist
+from app.api.endpoints import trends
 
 api_router = APIRouter()
 
@@ -16,3 +18,5 @@ if os.getenv("DEBUG", "false").lower() == "true":
 
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(user_analysis.router, prefix="/analyses", tags=["analyses"])
+api_router.include_router(watchlist.router, prefix="/watchlist", tags=["watchlist"])
+api_router.include_router(trends.router, prefix="/trends", tags=["trends"])
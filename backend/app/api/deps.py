@@ -1,5 +1,5 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import JWTError
@@ -19,6 +19,14 @@ logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
+# Для эндпоинтов, где токен нужен только в отдельных случаях (профилирование)
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login",
+    auto_error=False
+)
+
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_HEADER = "X-Profile"
 
 async def get_db() -> Generator:
  
@@ -78,4 +86,25 @@ async def get_current_active_superuser(
         raise HTTPException(
             status_code=400, detail="Недостаточно прав"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+async def get_profiling_requested(
+    request: Request,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> bool:
+
+    # Без флага - ни обращения к БД, ни проверки токена
+    flag = request.query_params.get(PROFILE_QUERY_PARAM) or request.headers.get(PROFILE_HEADER)
+    if not flag or flag.lower() in ("0", "false", "no"):
+        return False
+    
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Профилирование доступно только администраторам",
+        )
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user(db=db, token=token)
+    await get_current_active_superuser(current_user=user)
+    return True
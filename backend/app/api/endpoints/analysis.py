@@ -1,17 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 import time
-from collections import Counter
 import gc
 from collections import defaultdict
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.parsers.ozon import OzonParser
-from app.services.parsers.wb import WildberriesParser
+from app.services import parsers as marketplace_parsers
 
 from app.models.analysis import AnalysisRequest, AnalysisResponse, AnalysisRequestSchema
+from app.core import encoding
 from app.core.config import settings
-from app.services.analyzer import review_analyzer
+from app.core.profiling import profile_request, torch_profiled
+from app.api.deps import get_profiling_requested
+from app.services.analyzer import AnalysisAccumulator, default_analyzer
+from app.services.analysis_stream import prepare_reviews, stream_analysis
 from app.db.database import get_db
 from app.crud.crud_analysis import analysis as crud_analysis
 from app.models.analysis import AnalysisStatus
@@ -32,20 +35,45 @@ def handle_analysis_error(func):
     return wrapper
 
 @router.post("/analyze_reviews", response_model=None)
-async def analyze_reviews(request: AnalysisRequestSchema):
-    start_time = time.time()
-    max_execution_time = 300
-
-    if review_analyzer is None:
+async def analyze_reviews(
+    request: AnalysisRequestSchema,
+    profile: bool = Depends(get_profiling_requested)
+):
+    if not profile:
+        return await _analyze_reviews(request)
+    
+    # ?profile=1 или X-Profile: 1 от администратора - профиль возвращается вместе с ответом
+    with profile_request() as session:
+        response_data = await _analyze_reviews(request)
+    return {**response_data, "profile": session.result()}
+
+@router.post("/analyze_reviews/stream")
+async def analyze_reviews_stream(request: AnalysisRequestSchema):
+    """NDJSON: событие start, событие batch с накопленными итогами после каждой
+    пачки отзывов (следующая страница грузится, пока анализируется текущая) и summary"""
+    if default_analyzer is None:
         raise HTTPException(status_code=503, detail="Сервис анализа временно недоступен")
 
-    product_info: Dict[str, Any] = {}
+    parser, product_id = _resolve_product(request)
+    max_reviews_to_parse = min(request.max_reviews, 1000)
+
+    async def events():
+        try:
+            async for event in stream_analysis(default_analyzer, parser, product_id, request.marketplace, max_reviews_to_parse):
+                yield encoding.dumps(event) + b"\n"
+        except Exception as e:
+            # Заголовки уже отправлены, поэтому ошибка приходит последним событием потока
+            yield encoding.dumps({"event": "error", "detail": f"Ошибка анализа: {str(e)}"}) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _resolve_product(request: AnalysisRequestSchema):
     parser: Any = None
 
     if request.marketplace.lower() == "ozon":
-        parser = OzonParser()
+        parser = marketplace_parsers.OzonParser()
     elif request.marketplace.lower() in ["wildberries", "wb"]:
-        parser = WildberriesParser()
+        parser = marketplace_parsers.WildberriesParser()
     else:
         raise HTTPException(status_code=400, detail=f"Неподдерживаемый маркетплейс: {request.marketplace}")
 
@@ -60,6 +88,18 @@ async def analyze_reviews(request: AnalysisRequestSchema):
         if not parser.is_valid_product_id(product_id):
             raise HTTPException(status_code=400, detail=f"Неверный формат ID товара {request.marketplace}")
 
+    return parser, product_id
+
+async def _analyze_reviews(request: AnalysisRequestSchema):
+    start_time = time.time()
+    max_execution_time = 300
+
+    if default_analyzer is None:
+        raise HTTPException(status_code=503, detail="Сервис анализа временно недоступен")
+
+    product_info: Dict[str, Any] = {}
+    parser, product_id = _resolve_product(request)
+
     raw_reviews_from_parser: List[Dict[str, Any]] = []
     max_reviews_to_parse = min(request.max_reviews, 1000)
 
@@ -108,30 +148,7 @@ async def analyze_reviews(request: AnalysisRequestSchema):
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга отзывов: {str(e)}")
 
     # Подготавливаем тексты для анализа
-    texts_for_analysis = []
-    original_ratings = []
-    for r_dict in raw_reviews_from_parser:
-        text_parts = []
-        if r_dict.get("text"): text_parts.append(str(r_dict["text"]))
-        if r_dict.get("pros"): text_parts.append("Достоинства: " + str(r_dict["pros"]))
-        if r_dict.get("cons"): text_parts.append("Недостатки: " + str(r_dict["cons"]))
-        full_text = " ".join(text_parts).strip()
-        if len(full_text) > 5:
-            texts_for_analysis.append(full_text)
-            if r_dict.get("productValuation") is not None:
-                 original_ratings.append(int(r_dict["productValuation"]))
-            elif r_dict.get("rating") is not None:
-                 original_ratings.append(int(r_dict["rating"]))
-
-    max_text_length = 10000
-    filtered_texts = []
-    for text in texts_for_analysis:
-        if len(text) > max_text_length:
-            filtered_texts.append(text[:max_text_length])
-        else:
-            filtered_texts.append(text)
-    
-    texts_for_analysis = filtered_texts
+    texts_for_analysis, original_ratings = prepare_reviews(raw_reviews_from_parser)
 
     if not texts_for_analysis:
         if not product_info and hasattr(parser, 'get_product_info'):
@@ -185,25 +202,12 @@ async def analyze_reviews(request: AnalysisRequestSchema):
         if time.time() - start_time > max_execution_time:
             raise HTTPException(status_code=408, detail="Timeout перед анализом")
 
-        topic_analysis_result = review_analyzer.analyze_topics(texts_for_analysis)
-        detailed_aspects = topic_analysis_result.get("detailed_aspects", [])
-        
-        sentiment_counts = Counter()
-        for result in detailed_aspects:
-            sentiment = result.get("sentiment", "neutral")
-            sentiment_counts[sentiment] += 1
-
-        rating_distribution = Counter(original_ratings)
-        average_rating = sum(original_ratings) / len(original_ratings) if original_ratings else 0
-
-        all_positive_aspects = []
-        all_negative_aspects = []
-        
-        for result in detailed_aspects:
-            all_positive_aspects.extend(result.get("positive_aspects", []))
-            all_negative_aspects.extend(result.get("negative_aspects", []))
+        # Один проход модели; счетчики копятся сразу, без повторного анализа тех же текстов
+        analyzed = torch_profiled(default_analyzer.analyze_reviews)(texts_for_analysis)
+        accumulator = AnalysisAccumulator().add(analyzed, original_ratings)
+        sentiment_counts = accumulator.sentiments
         
-        sentiment_analysis_result = review_analyzer.analyze_sentiment(texts_for_analysis)
+        sentiment_analysis_result = default_analyzer.summarize_aspects(accumulator.positive, accumulator.negative)
         
         positive_aspects = sentiment_analysis_result.get("positive_aspects", [])
         negative_aspects = sentiment_analysis_result.get("negative_aspects", [])
@@ -270,11 +274,7 @@ async def analyze_reviews(request: AnalysisRequestSchema):
                 }
             },
             "topic_analysis": [],
-            "rating_stats": {
-                "average": round(average_rating, 1),
-                "count": len(original_ratings),
-                "distribution": {str(i): rating_distribution.get(i, 0) for i in range(1, 6)}
-            },
+            "rating_stats": accumulator.rating_stats(),
             "marketplace": request.marketplace
         }
 
@@ -289,12 +289,12 @@ async def analyze_reviews(request: AnalysisRequestSchema):
 
 @router.post("/analyze_review_text", response_model=Dict[str, Any])
 async def analyze_review_text(text: str = Body(..., embed=True, description="Текст отзыва для анализа")):
-    if review_analyzer is None:
+    if default_analyzer is None:
         raise HTTPException(status_code=503, detail="Сервис анализа временно недоступен (RA). Повторите запрос позже.")
 
     try:
-        aspect_sentiment_result = review_analyzer.analyze_review(text)
-        topics_result = review_analyzer.analyze_topics([text])
+        aspect_sentiment_result = default_analyzer.analyze_review(text)
+        topics_result = default_analyzer.analyze_topics([text])
 
         return {
             "text": text,
@@ -310,7 +310,7 @@ async def analyze_topics(texts: List[str] = Body(...)):
     if not texts:
         return {"topic_summary": {}, "detailed_aspects": []}
 
-    result = review_analyzer.analyze_topics(texts)
+    result = default_analyzer.analyze_topics(texts)
     gc.collect()
     
     return result
@@ -334,7 +334,7 @@ async def analyze_sentiment(texts: List[str] = Body(...)):
             }
         }
 
-    result = review_analyzer.analyze_sentiment(texts)
+    result = default_analyzer.analyze_sentiment(texts)
     gc.collect()
     
     return result
@@ -342,14 +342,14 @@ async def analyze_sentiment(texts: List[str] = Body(...)):
 @router.post("/analyze_sentiment_single", response_model=Dict[str, Any]) 
 @handle_analysis_error
 async def analyze_sentiment_single(text: str = Body(..., embed=True)):
-    if not review_analyzer:
+    if not default_analyzer:
         raise HTTPException(status_code=503, detail="Сервис анализа недоступен.")
     
     if not text or not text.strip():
         raise HTTPException(status_code=400, detail="Текст для анализа не может быть пустым.")
 
     try:
-        result = review_analyzer.analyze_sentiment_single(text)
+        result = default_analyzer.analyze_sentiment_single(text)
         
         response_data = {
             "text": text,
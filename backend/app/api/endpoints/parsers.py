@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional, Dict, Any
 
-from app.services.parsers.ozon import OzonParser
-from app.services.parsers.wb import WildberriesParser
+from app.services import parsers as marketplace_parsers
 from app.models.review import ReviewModel
 
 router = APIRouter()
@@ -15,7 +14,7 @@ async def parse_reviews(
 ):
     
     if marketplace.lower() == "ozon":
-        parser = OzonParser()
+        parser = marketplace_parsers.OzonParser()
         
         if url.startswith("http"):
             product_id = parser.extract_product_id_from_url(url)
@@ -30,7 +29,7 @@ async def parse_reviews(
         return reviews
         
     elif marketplace.lower() == "wildberries" or marketplace.lower() == "wb":
-        parser = WildberriesParser()
+        parser = marketplace_parsers.WildberriesParser()
         
         if url.startswith("http"):
             product_id = parser.extract_product_id_from_url(url)
@@ -54,14 +53,14 @@ async def extract_product_id(
 ):
 
     if marketplace.lower() == "ozon":
-        parser = OzonParser()
+        parser = marketplace_parsers.OzonParser()
         product_id = parser.extract_product_id_from_url(url)
         if not product_id:
             raise HTTPException(status_code=400, detail="Не удалось извлечь ID товара из URL Ozon")
         return {"product_id": product_id}
         
     elif marketplace.lower() == "wildberries" or marketplace.lower() == "wb":
-        parser = WildberriesParser()
+        parser = marketplace_parsers.WildberriesParser()
         product_id = parser.extract_product_id_from_url(url)
         if not product_id:
             raise HTTPException(status_code=400, detail="Не удалось извлечь ID товара из URL Wildberries")
@@ -77,12 +76,12 @@ async def validate_product_id(
 ):
 
     if marketplace.lower() == "ozon":
-        parser = OzonParser()
+        parser = marketplace_parsers.OzonParser()
         is_valid = parser.is_valid_product_id(product_id)
         return {"is_valid": is_valid}
         
     elif marketplace.lower() == "wildberries" or marketplace.lower() == "wb":
-        parser = WildberriesParser()
+        parser = marketplace_parsers.WildberriesParser()
         is_valid = parser.is_valid_product_id(product_id)
         return {"is_valid": is_valid}
         
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import json
 
 from app.db.database import get_db
 from app.models.schemas_review import ReviewCreate, ReviewResponse, ReviewListResponse
@@ -8,83 +10,97 @@ from app.crud.review_crud import reviews
 
 router = APIRouter()
 
+def encode_cursor(cursor: Optional[Tuple[str, int]]) -> Optional[str]:
+
+    if cursor is None:
+        return None
+    raw = json.dumps(list(cursor), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+
+    if not cursor:
+        return None
+    try:
+        product_id, review_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(product_id), int(review_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+async def _list_reviews(
+    db: AsyncSession,
+    product_id: Optional[str],
+    source: Optional[str],
+    cursor: Optional[str],
+    limit: int
+) -> dict:
+
+    items, next_cursor = await reviews.get_with_pagination(
+        db,
+        limit=limit,
+        product_id=product_id,
+        source=source,
+        cursor=decode_cursor(cursor)
+    )
+    total, is_estimate = await reviews.count(db, product_id=product_id, source=source)
+
+    return {
+        "total": total,
+        "total_is_estimate": is_estimate,
+        "items": items,
+        "size": limit,
+        "next_cursor": encode_cursor(next_cursor)
+    }
+
 @router.post("/", response_model=ReviewResponse, status_code=201)
-def create_review(
+async def create_review(
     review_data: ReviewCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    return reviews.create(db=db, obj_in=review_data)
+    return await reviews.create(db=db, obj_in=review_data)
 
 @router.get("/", response_model=ReviewListResponse)
-def read_reviews(
+async def read_reviews(
     product_id: Optional[str] = None,
     source: Optional[str] = None,
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     limit: int = Query(20, ge=1, le=500, description="Максимальное количество записей для получения"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    filters = {}
-    if product_id:
-        filters["product_id"] = product_id
-    if source:
-        filters["source"] = source
-    
-    items = reviews.get_multi(db=db, skip=skip, limit=limit, filters=filters)
-    total = reviews.count(db=db, filters=filters)
-    
-    return {
-        "total": total,
-        "items": items,
-        "page": (skip // limit) + 1,
-        "size": limit,
-        "pages": (total + limit - 1) // limit
-    }
+    return await _list_reviews(db, product_id, source, cursor, limit)
 
 @router.get("/{review_id}", response_model=ReviewResponse)
-def read_review(
+async def read_review(
     review_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    review = reviews.get(db=db, id=review_id)
+    review = await reviews.get(db=db, id=review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Отзыв не найден")
     return review
 
 @router.delete("/{review_id}", status_code=204)
-def delete_review(
+async def delete_review(
     review_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    review = reviews.get(db=db, id=review_id)
+    review = await reviews.get(db=db, id=review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Отзыв не найден")
-    reviews.remove(db=db, id=review_id)
+    await reviews.remove(db=db, id=review_id)
     return None
 
 @router.get("/product/{product_id}", response_model=ReviewListResponse)
-def read_product_reviews(
+async def read_product_reviews(
     product_id: str,
     source: Optional[str] = None,
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     limit: int = Query(20, ge=1, le=100, description="Максимальное количество записей для получения"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    filters = {"product_id": product_id}
-    if source:
-        filters["source"] = source
-    
-    items = reviews.get_multi(db=db, skip=skip, limit=limit, filters=filters)
-    total = reviews.count(db=db, filters=filters)
-    
-    return {
-        "total": total,
-        "items": items,
-        "page": (skip // limit) + 1,
-        "size": limit,
-        "pages": (total + limit - 1) // limit
-    } 
\ No newline at end of file
+    return await _list_reviews(db, product_id, source, cursor, limit)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Path, Query
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+import datetime
+
+from app.db.database import get_db
+from app.models.user import User
+from app.api.deps import get_current_user
+from app.crud.crud_aspect_fact import aspect_facts as crud_aspect_facts
+from app.schemas.trends import AspectTrendResponse
+
+router = APIRouter()
+
+def _lemmatize(text: str) -> str:
+
+    # Общий для процесса лемматизатор, без загрузки модели анализатора
+    from app.services.analyzer.text_preprocessor import get_text_preprocessor
+    return get_text_preprocessor().lemmatize_text(text.strip().lower())
+
+@router.get("/{marketplace}/{product_id}", response_model=AspectTrendResponse)
+async def get_aspect_trends(
+    marketplace: str = Path(..., pattern="^(wb|ozon)$", description="Маркетплейс (wb, ozon)"),
+    product_id: str = Path(..., description="ID товара"),
+    period: str = Query("week", pattern="^(day|week|month)$", description="Шаг ряда"),
+    days: int = Query(90, ge=1, le=730, description="Глубина истории в днях"),
+    aspect: Optional[str] = Query(None, description="Аспект; без него ряд строится по категориям"),
+    category: Optional[str] = Query(None, description="Категория аспектов"),
+    polarity: Optional[str] = Query(None, pattern="^(positive|negative)$", description="Тональность"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    lemma = _lemmatize(aspect) if aspect else None
+    points = await crud_aspect_facts.get_trends(
+        db,
+        marketplace=marketplace,
+        product_id=product_id,
+        period=period,
+        since=datetime.date.today() - datetime.timedelta(days=days),
+        aspect=lemma,
+        category=category,
+        polarity=polarity
+    )
+    return AspectTrendResponse(
+        marketplace=marketplace,
+        product_id=product_id,
+        period=period,
+        aspect=lemma,
+        points=points
+    )
@@ -1,33 +1,80 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Body, Path, Request, BackgroundTasks
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Path, Request, BackgroundTasks, Response
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 import re
 import datetime
 import asyncio
+import time
 
 from app.db.database import get_db
+from app.core.config import settings
 from app.models.user import User
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_active_superuser, get_profiling_requested
 from app.crud.crud_analysis import analysis as crud_analysis
+from app.crud.crud_analysis_batch import analysis_batch as crud_analysis_batch
+from app.crud.crud_watched_product import watched_product as crud_watched_product
 from app.schemas.analysis import (
     AnalysisRequestCreate, 
     AnalysisRequestResponse, 
     AnalysisResultResponse,
-    AnalysisRequestWithResults
+    AnalysisRequestWithResults,
+    AnalysisBatchCreate,
+    AnalysisBatchResponse
 )
 from app.models.analysis import AnalysisStatus
-from app.services.parsers.wb import WildberriesParser
-from app.services.parsers.ozon import OzonParser
-from app.services.analyzer import review_analyzer
+from app.core import encoding, metrics
+from app.core.metrics import stage_timer
+from app.core.profiling import profile_request
+from app.services import parsers as marketplace_parsers
+from app.services.analyzer import default_analyzer
+from app.services.analysis_pipeline import (
+    AnalysisPipeline,
+    BatchAnalysisPipeline,
+    BatchItem,
+    PipelineCancelled
+)
+from app.services.analysis_results import save_analysis_result
+from app.services.rate_limiter import get_rate_limiter
 
 router = APIRouter()
 
 cancelled_analyses = set()
 
-async def process_analysis_background(analysis_id: int):
+async def process_analysis_background(analysis_id: int, profile: bool = False):
+
+    # Все замеры стадий внутри задачи, включая парсер и модель, суммируются в stage_timings
+    stage_timings: Dict[str, float] = {}
+    with metrics.collect_stages(stage_timings):
+        if not profile:
+            await _run_analysis(analysis_id, stage_timings)
+            return
+        
+        # Задача выполняется в потоке event loop, поэтому в профиль попадают и
+        # обработчики других запросов, выполнявшиеся в это время
+        with profile_request() as session:
+            await _run_analysis(analysis_id, stage_timings)
+        await _save_profile(analysis_id, session.result())
+
+async def _save_profile(analysis_id: int, profile: dict):
+
+    from app.db.database import get_async_session
+    
+    async for db in get_async_session():
+        try:
+            analysis = await crud_analysis.get(db, id=analysis_id)
+            if analysis:
+                await crud_analysis.save_profile(db, db_obj=analysis, profile=profile)
+        finally:
+            await db.close()
+        break
+
+async def _run_analysis(analysis_id: int, stage_timings: Dict[str, float]):
 
     from app.db.database import get_async_session
     
+    started = time.perf_counter()
+    
     async for db in get_async_session():
         try:
             analysis = await crud_analysis.get(db, id=analysis_id)
@@ -59,12 +106,7 @@ async def process_analysis_background(analysis_id: int):
             )
             await db.commit()
             
-            if analysis.marketplace == "wb":
-                parser = WildberriesParser()
-            elif analysis.marketplace == "ozon":
-                parser = OzonParser()
-            else:
-                raise ValueError(f"Неподдерживаемый маркетплейс: {analysis.marketplace}")
+            parser = marketplace_parsers.create_parser(analysis.marketplace)
             
             await crud_analysis.update_progress(
                 db, 
@@ -76,20 +118,43 @@ async def process_analysis_background(analysis_id: int):
             )
             await db.commit()
             
-            reviews = parser.parse_reviews(analysis.product_id, max_reviews=analysis.max_reviews)
-            product_info = parser.get_product_info(int(analysis.product_id))
+            async def report_progress(processed: int, expected: int):
+                progress = min(80, 10 + int(processed / max(1, expected) * 70))  # 10-80%
+                await crud_analysis.update_progress(
+                    db, 
+                    db_obj=analysis, 
+                    progress_percentage=float(progress),
+                    current_stage="sentiment_analysis",
+                    processed_reviews=processed,
+                    total_reviews=expected
+                )
+                await db.commit()
             
-            await crud_analysis.update_progress(
-                db, 
-                db_obj=analysis, 
-                progress_percentage=30.0,
-                current_stage="sentiment_analysis",
-                processed_reviews=0,
-                total_reviews=len(reviews)
+            # Загрузка страниц, нормализация, батчи, инференс и агрегация идут одновременно
+            pipeline = AnalysisPipeline(
+                default_analyzer,
+                parser,
+                analysis.product_id,
+                analysis.max_reviews,
+                on_progress=report_progress,
+                is_cancelled=lambda: analysis_id in cancelled_analyses,
+                rate_limiter=get_rate_limiter(analysis.marketplace)
             )
-            await db.commit()
+            try:
+                with stage_timer("pipeline", marketplace=analysis.marketplace):
+                    pipeline_result = await pipeline.run()
+            except PipelineCancelled:
+                await crud_analysis.update_status(
+                    db, 
+                    db_obj=analysis, 
+                    status=AnalysisStatus.CANCELLED, 
+                    error_message="Анализ отменен пользователем"
+                )
+                await db.commit()
+                cancelled_analyses.discard(analysis_id)  
+                return
             
-            if not reviews:
+            if not pipeline_result.fetched_reviews:
                 await crud_analysis.update_status(
                     db, 
                     db_obj=analysis, 
@@ -99,45 +164,7 @@ async def process_analysis_background(analysis_id: int):
                 await db.commit()
                 return
             
-            
-            review_texts = [review.get("text", "") for review in reviews if review.get("text")]
-            
-            analyzed_reviews = []
-            total_texts = len(review_texts)
-            
-            for i, text in enumerate(review_texts):
-                if analysis_id in cancelled_analyses:
-                    await crud_analysis.update_status(
-                        db, 
-                        db_obj=analysis, 
-                        status=AnalysisStatus.CANCELLED, 
-                        error_message="Анализ отменен пользователем"
-                    )
-                    await db.commit()
-                    cancelled_analyses.discard(analysis_id)  
-                    return
-                
-                try:
-                    result = review_analyzer.analyze_review(text)
-                    analyzed_reviews.append(result)
-                    
-                    if (i + 1) % 3 == 0 or (i + 1) == total_texts:
-                        progress = min(80, 30 + int((i + 1) / total_texts * 50))  # 30-80%
-                        stage = "sentiment_analysis" if progress < 70 else "aspect_analysis"
-                        stage_name = "Анализ тональности" if progress < 70 else "Анализ аспектов"
-                        
-                        await crud_analysis.update_progress(
-                            db, 
-                            db_obj=analysis, 
-                            progress_percentage=float(progress),
-                            current_stage=stage,
-                            processed_reviews=i + 1,
-                            total_reviews=total_texts
-                        )
-                        await db.commit()
-                        
-                except Exception as e:
-                    continue
+            total_texts = pipeline_result.accumulator.reviews
             
             await crud_analysis.update_progress(
                 db, 
@@ -149,119 +176,186 @@ async def process_analysis_background(analysis_id: int):
             )
             await db.commit()
             
-            stats = review_analyzer.get_summary_statistics(analyzed_reviews)
+            await save_analysis_result(db, analysis, pipeline_result)
             
-            sentiment_results = review_analyzer.analyze_sentiment(review_texts[:500])
+            if metrics.is_enabled():
+                stage_timings["total"] = time.perf_counter() - started
+                await crud_analysis.save_stage_timings(db, db_obj=analysis, stage_timings=stage_timings)
             
-            await crud_analysis.update_progress(
-                db, 
-                db_obj=analysis, 
-                progress_percentage=95.0,
-                current_stage="finalizing",
-                processed_reviews=total_texts,
-                total_reviews=total_texts
-            )
-            await db.commit()
-            
-            categorized_positive = sentiment_results.get("categorized_positive", {})
-            categorized_negative = sentiment_results.get("categorized_negative", {})
+        except Exception as e:
+            try:
+                analysis = await crud_analysis.get(db, id=analysis_id)
+                if analysis:
+                    await crud_analysis.update_status(
+                        db, 
+                        db_obj=analysis, 
+                        status=AnalysisStatus.FAILED, 
+                        error_message=str(e)
+                    )
+                    await db.commit()
+                    if metrics.is_enabled():
+                        stage_timings["total"] = time.perf_counter() - started
+                        await crud_analysis.save_stage_timings(db, db_obj=analysis, stage_timings=stage_timings)
+            except Exception as update_error:
+                pass
+        finally:
+            await db.close()
+        break  
+
+async def process_batch_background(batch_id: int):
+
+    from app.db.database import get_async_session
+    
+    async for db in get_async_session():
+        try:
+            batch = await crud_analysis_batch.get(db, id=batch_id)
+            if not batch:
+                return
             
-            flat_positive_aspects = []
-            flat_negative_aspects = []
+            await crud_analysis_batch.update_status(db, db_obj=batch, status=AnalysisStatus.PROCESSING)
+            analyses = {analysis.id: analysis for analysis in await crud_analysis_batch.get_analyses(db, batch_id=batch_id)}
             
-            for aspect_tuple in sentiment_results.get("positive_aspects", []):
-                if isinstance(aspect_tuple, tuple) and len(aspect_tuple) >= 2:
-                    flat_positive_aspects.append({"text": aspect_tuple[0], "count": aspect_tuple[1]})
-                elif isinstance(aspect_tuple, dict):
-                    flat_positive_aspects.append({"text": aspect_tuple.get("text", ""), "count": aspect_tuple.get("count", 1)})
+            items = []
+            for analysis in analyses.values():
+                await crud_analysis.update_status(db, db_obj=analysis, status=AnalysisStatus.PROCESSING)
+                await crud_analysis.update_progress(
+                    db, 
+                    db_obj=analysis, 
+                    progress_percentage=10.0,
+                    current_stage="parsing",
+                    processed_reviews=0,
+                    total_reviews=analysis.max_reviews
+                )
+                items.append(BatchItem(
+                    key=analysis.id,
+                    parser=marketplace_parsers.create_parser(analysis.marketplace),
+                    product_id=analysis.product_id,
+                    marketplace=analysis.marketplace,
+                    max_reviews=analysis.max_reviews
+                ))
             
-            for aspect_tuple in sentiment_results.get("negative_aspects", []):
-                if isinstance(aspect_tuple, tuple) and len(aspect_tuple) >= 2:
-                    flat_negative_aspects.append({"text": aspect_tuple[0], "count": aspect_tuple[1]})
-                elif isinstance(aspect_tuple, dict):
-                    flat_negative_aspects.append({"text": aspect_tuple.get("text", ""), "count": aspect_tuple.get("count", 1)})
+            # Колбэки вызываются по очереди из стадии инференса, поэтому одна сессия на пакет
+            async def report_progress(item: BatchItem):
+                expected = max(item.max_reviews, item.result.fetched_reviews)
+                processed = item.result.accumulator.reviews
+                progress = min(80, 10 + int(processed / max(1, expected) * 70))  # 10-80%
+                await crud_analysis.update_progress(
+                    db, 
+                    db_obj=analyses[item.key], 
+                    progress_percentage=float(progress),
+                    current_stage="sentiment_analysis",
+                    processed_reviews=processed,
+                    total_reviews=expected
+                )
             
-            def build_categories_structure(categorized_aspects):
-                categories = []
-                total_mentions = 0
-                
-                for category_name, aspects_list in categorized_aspects.items():
-                    if not aspects_list:
-                        continue
-                    
-                    category_aspects = []
-                    category_mentions = 0
-                    
-                    for aspect_item in aspects_list:
-                        if isinstance(aspect_item, tuple) and len(aspect_item) >= 2:
-                            text, count = aspect_item[0], aspect_item[1]
-                        elif isinstance(aspect_item, dict):
-                            text, count = aspect_item.get("text", ""), aspect_item.get("count", 1)
-                        else:
-                            continue
-                        
-                        category_aspects.append({"text": text, "count": count})
-                        category_mentions += count
-                    
-                    if category_aspects:
-                        categories.append({
-                            "name": category_name,
-                            "aspects": category_aspects,
-                            "total_mentions_in_category": category_mentions
-                        })
-                        total_mentions += category_mentions
-                
-                return {"categories": categories, "total_aspect_mentions": total_mentions}
+            async def finish_item(item: BatchItem):
+                analysis = analyses[item.key]
+                if item.cancelled:
+                    await crud_analysis.update_status(
+                        db, 
+                        db_obj=analysis, 
+                        status=AnalysisStatus.CANCELLED, 
+                        error_message="Анализ отменен пользователем"
+                    )
+                    cancelled_analyses.discard(item.key)
+                elif not item.result.fetched_reviews:
+                    await crud_analysis.update_status(
+                        db, 
+                        db_obj=analysis, 
+                        status=AnalysisStatus.FAILED, 
+                        error_message="Не удалось получить отзывы"
+                    )
+                else:
+                    await save_analysis_result(db, analysis, item.result)
             
-            structured_aspect_categories = {
-                "positive": build_categories_structure(categorized_positive),
-                "negative": build_categories_structure(categorized_negative)
-            }
+            pipeline = BatchAnalysisPipeline(
+                default_analyzer,
+                items,
+                on_item_done=finish_item,
+                on_progress=report_progress,
+                is_cancelled=lambda item: item.key in cancelled_analyses
+            )
+            with stage_timer("batch_pipeline"):
+                await pipeline.run()
             
-            total_reviews = len(reviews)
-            positive_count = len([r for r in analyzed_reviews if r.get("sentiment") == "positive"])
-            negative_count = len([r for r in analyzed_reviews if r.get("sentiment") == "negative"])
-            neutral_count = total_reviews - positive_count - negative_count
+            await crud_analysis_batch.update_status(db, db_obj=batch, status=AnalysisStatus.COMPLETED)
             
-            results_data = {
-                "positive_aspects": flat_positive_aspects,
-                "negative_aspects": flat_negative_aspects,
-                "aspect_categories": structured_aspect_categories,
-                "reviews_count": total_reviews,
-                "sentiment_summary": {
-                    "total": total_reviews,
-                    "positive": positive_count,
-                    "negative": negative_count,
-                    "neutral": neutral_count,
-                    "positive_percent": round((positive_count / max(1, total_reviews)) * 100, 1),
-                    "negative_percent": round((negative_count / max(1, total_reviews)) * 100, 1),
-                    "neutral_percent": round((neutral_count / max(1, total_reviews)) * 100, 1),
-                },
-                "product_info": product_info
-            }
+        except Exception as e:
+            try:
+                await db.rollback()
+                for analysis in await crud_analysis_batch.get_analyses(db, batch_id=batch_id):
+                    if analysis.status in (AnalysisStatus.PENDING, AnalysisStatus.PROCESSING):
+                        await crud_analysis.update_status(
+                            db, 
+                            db_obj=analysis, 
+                            status=AnalysisStatus.FAILED, 
+                            error_message=str(e)
+                        )
+                batch = await crud_analysis_batch.get(db, id=batch_id)
+                if batch:
+                    await crud_analysis_batch.update_status(db, db_obj=batch, status=AnalysisStatus.FAILED)
+            except Exception as update_error:
+                pass
+        finally:
+            await db.close()
+        break  
+
+REUSE_POLL_INTERVAL = 2.0
+
+async def wait_for_reused_analysis(analysis_id: int, source_id: int):
+
+    from app.db.database import get_async_session
+    
+    # Источник может выполняться в другом воркере, поэтому состояние читается из БД
+    deadline = time.monotonic() + settings.RESULT_REUSE_WAIT_SECONDS
+    async for db in get_async_session():
+        try:
+            analysis = await crud_analysis.get(db, id=analysis_id)
+            if not analysis:
+                return
             
-            await crud_analysis.save_result(
-                db,
-                request_id=analysis_id,
-                positive_aspects=results_data["positive_aspects"],
-                negative_aspects=results_data["negative_aspects"],
-                aspect_categories=results_data["aspect_categories"],
-                reviews_count=results_data["reviews_count"],
-                sentiment_summary=results_data["sentiment_summary"],
-                product_info=results_data["product_info"]
-            )
+            while True:
+                if analysis_id in cancelled_analyses:
+                    await crud_analysis.update_status(
+                        db, 
+                        db_obj=analysis, 
+                        status=AnalysisStatus.CANCELLED, 
+                        error_message="Анализ отменен пользователем"
+                    )
+                    cancelled_analyses.discard(analysis_id)
+                    return
+                
+                source = await crud_analysis.get_state(db, id=source_id)
+                if source is None or source["status"] in (AnalysisStatus.FAILED, AnalysisStatus.CANCELLED):
+                    break
+                if source["status"] == AnalysisStatus.COMPLETED:
+                    await crud_analysis.copy_result(db, source_id=source_id, target_id=analysis_id)
+                    await crud_analysis.update_status(db, db_obj=analysis, status=AnalysisStatus.COMPLETED)
+                    await crud_analysis.update_progress(
+                        db, 
+                        db_obj=analysis, 
+                        progress_percentage=100.0,
+                        current_stage="completed",
+                        processed_reviews=source["processed_reviews"],
+                        total_reviews=source["total_reviews"]
+                    )
+                    return
+                if time.monotonic() > deadline:
+                    break
+                
+                await crud_analysis.update_progress(
+                    db, 
+                    db_obj=analysis, 
+                    progress_percentage=source["progress_percentage"] or 0.0,
+                    current_stage=source["current_stage"] or "pending",
+                    processed_reviews=source["processed_reviews"] or 0,
+                    total_reviews=source["total_reviews"] or 0
+                )
+                await asyncio.sleep(REUSE_POLL_INTERVAL)
             
-            await crud_analysis.update_status(db, db_obj=analysis, status=AnalysisStatus.COMPLETED)
-            await crud_analysis.update_progress(
-                db, 
-                db_obj=analysis, 
-                progress_percentage=100.0,
-                current_stage="completed",
-                processed_reviews=total_texts,
-                total_reviews=total_texts
-            )
+            # Источник не завершился: анализ выполняется заново и больше не ссылается на него
+            analysis.reused_from_id = None
             await db.commit()
-            
         except Exception as e:
             try:
                 analysis = await crud_analysis.get(db, id=analysis_id)
@@ -272,12 +366,14 @@ async def process_analysis_background(analysis_id: int):
                         status=AnalysisStatus.FAILED, 
                         error_message=str(e)
                     )
-                    await db.commit()
             except Exception as update_error:
                 pass
+            return
         finally:
             await db.close()
-        break  
+        break
+    
+    await process_analysis_background(analysis_id)
 
 @router.get("/", response_model=List[AnalysisRequestResponse])
 async def get_user_analyses(
@@ -289,38 +385,7 @@ async def get_user_analyses(
 ):
     
     try:
-        analyses = await crud_analysis.get_multi_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-        
-        response_analyses = []
-        for analysis in analyses:
-            analysis_dict = {
-                "id": analysis.id,
-                "user_id": analysis.user_id,
-                "product_id": analysis.product_id,
-                "marketplace": analysis.marketplace,
-                "status": analysis.status,
-                "error_message": analysis.error_message,
-                "created_at": analysis.created_at,
-                "updated_at": analysis.updated_at,
-                "url": analysis.url,
-                "max_reviews": analysis.max_reviews,
-                "results": None
-            }
-            
-            if analysis.results:
-                analysis_dict["product_name"] = (
-                    analysis.results.product_info.get("name") 
-                    if analysis.results.product_info and isinstance(analysis.results.product_info, dict)
-                    else None
-                )
-                analysis_dict["reviews_count"] = analysis.results.reviews_count
-            else:
-                analysis_dict["product_name"] = None
-                analysis_dict["reviews_count"] = 0
-            
-            response_analyses.append(AnalysisRequestResponse(**analysis_dict))
-        
-        return response_analyses
+        return await crud_analysis.get_summaries_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
@@ -343,7 +408,8 @@ async def create_analysis(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     analysis_in: AnalysisRequestCreate,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    profile: bool = Depends(get_profiling_requested)
 ):
 
     try:
@@ -355,9 +421,35 @@ async def create_analysis(
         else:
             analysis_obj = analysis_in
             
-        analysis = await crud_analysis.create_with_user(db, obj_in=analysis_obj, user_id=current_user.id)
+        source = None
+        # Профилирование просят ради настоящего прогона, поэтому без переиспользования
+        if not profile and settings.RESULT_REUSE_TTL_MINUTES > 0:
+            fresh_since = datetime.datetime.utcnow() - datetime.timedelta(minutes=settings.RESULT_REUSE_TTL_MINUTES)
+            await crud_analysis.lock_product(db, marketplace=analysis_obj.marketplace, product_id=analysis_obj.product_id)
+            source = await crud_analysis.find_reusable(
+                db,
+                marketplace=analysis_obj.marketplace,
+                product_id=analysis_obj.product_id,
+                max_reviews=analysis_obj.max_reviews,
+                fresh_since=fresh_since
+            )
+            if source is None:
+                # Предрасчет отслеживаемого товара, обновляемый воркером по ночам
+                source = await crud_watched_product.find_precomputed(
+                    db,
+                    marketplace=analysis_obj.marketplace,
+                    product_id=analysis_obj.product_id,
+                    max_reviews=analysis_obj.max_reviews,
+                    fresh_since=datetime.datetime.utcnow() - datetime.timedelta(hours=settings.WATCHLIST_RESULT_MAX_AGE_HOURS)
+                )
         
-        background_tasks.add_task(process_analysis_background, analysis.id)
+        if source is not None:
+            analysis = await crud_analysis.create_reused(db, obj_in=analysis_obj, user_id=current_user.id, source=source)
+            if analysis.status != AnalysisStatus.COMPLETED:
+                background_tasks.add_task(wait_for_reused_analysis, analysis.id, source.id)
+        else:
+            analysis = await crud_analysis.create_with_user(db, obj_in=analysis_obj, user_id=current_user.id)
+            background_tasks.add_task(process_analysis_background, analysis.id, profile)
         
         return AnalysisRequestResponse(
             id=analysis.id,
@@ -370,22 +462,138 @@ async def create_analysis(
             updated_at=analysis.updated_at,
             url=analysis.url,
             max_reviews=analysis.max_reviews,
+            reused_from_id=analysis.reused_from_id,
             results=None
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Не удалось создать анализ: {str(e)}")
 
+@router.post("/batch", response_model=AnalysisBatchResponse)
+async def create_analysis_batch(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    batch_in: AnalysisBatchCreate,
+    background_tasks: BackgroundTasks
+):
+
+    if len(batch_in.items) > settings.MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"В пакете не больше {settings.MAX_BATCH_ITEMS} товаров"
+        )
+    unsupported = {item.marketplace for item in batch_in.items} - {"wb", "ozon"}
+    if unsupported:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Неподдерживаемый маркетплейс: {', '.join(sorted(unsupported))}"
+        )
+    
+    items = []
+    for item in batch_in.items:
+        item_dict = item.model_dump()
+        if not item.product_id:
+            item_dict["product_id"] = extract_product_id(item.url, item.marketplace)
+        items.append(AnalysisRequestCreate(**item_dict))
+    
+    try:
+        batch, analyses = await crud_analysis_batch.create_with_items(db, items=items, user_id=current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Не удалось создать пакет анализов: {str(e)}")
+    
+    # Один фоновый процесс на пакет: общие батчи инференса для всех товаров
+    background_tasks.add_task(process_batch_background, batch.id)
+    
+    return await _batch_response(db, batch)
+
+@router.get("/batch/{batch_id}", response_model=AnalysisBatchResponse)
+async def get_analysis_batch(
+    batch_id: int = Path(..., description="ID пакета"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    batch = await crud_analysis_batch.get_by_user(db, id=batch_id, user_id=current_user.id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Пакет анализов не найден")
+    
+    return await _batch_response(db, batch)
+
+async def _batch_response(db: AsyncSession, batch) -> AnalysisBatchResponse:
+
+    items = await crud_analysis_batch.get_item_summaries(db, batch_id=batch.id)
+    status_counts: Dict[str, int] = {}
+    for item in items:
+        status_counts[item["status"]] = status_counts.get(item["status"], 0) + 1
+    
+    return AnalysisBatchResponse(
+        id=batch.id,
+        status=batch.status,
+        created_at=batch.created_at,
+        updated_at=batch.updated_at,
+        total=len(items),
+        status_counts=status_counts,
+        items=items
+    )
+
 @router.get("/{analysis_id}", response_model=AnalysisRequestWithResults)
 async def get_analysis(
+    request: Request,
     analysis_id: int = Path(..., description="ID анализа"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
 
-    analysis = await crud_analysis.get_with_result(db, id=analysis_id, user_id=current_user.id)
+    analysis = await crud_analysis.get_packed(db, id=analysis_id, user_id=current_user.id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Анализ не найден")
-    return analysis
+    
+    result_id = analysis.pop("result_id")
+    blob = analysis.pop("response_blob")
+    result_etag = analysis.pop("response_etag")
+    if result_id is not None and blob is None:
+        # Результат сохранен до появления готовых ответов: упаковываем его один раз
+        packed = await crud_analysis.pack_result(db, request_id=analysis_id)
+        blob, result_etag = packed.response_blob, packed.response_etag
+    
+    updated_at = analysis["updated_at"]
+    version = f"{updated_at.timestamp():.6f}" if updated_at else "0"
+    etag = f'"{analysis_id}-{version}-{result_etag or "none"}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    analysis["product_name"] = None
+    analysis["reviews_count"] = 0
+    results_json = encoding.unpack(blob) if blob else b"null"
+    body = encoding.dumps(analysis)[:-1] + b',"results":' + results_json + b"}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+@router.get("/{analysis_id}/profile")
+async def get_analysis_profile(
+    analysis_id: int = Path(..., description="ID анализа"),
+    format: str = Query("json", pattern="^(json|folded)$", description="json или свернутые стеки для flamegraph"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+
+    profile = await crud_analysis.get_profile(db, id=analysis_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Профиль анализа не найден")
+    
+    if format == "folded":
+        return PlainTextResponse(profile.get("folded", ""))
+    return profile
 
 @router.delete("/{analysis_id}", response_model=dict)
 async def delete_analysis(
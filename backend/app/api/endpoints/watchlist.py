@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException, Depends, Path
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+import datetime
+
+from app.db.database import get_db
+from app.core.config import settings
+from app.models.user import User
+from app.models.watchlist import WatchedProduct
+from app.api.deps import get_current_user
+from app.api.endpoints.user_analysis import extract_product_id
+from app.crud.crud_watched_product import watched_product as crud_watched_product
+from app.schemas.watchlist import WatchedProductCreate, WatchedProductResponse
+from app.services.watchlist import next_refresh_at
+
+router = APIRouter()
+
+@router.get("/", response_model=List[WatchedProductResponse])
+async def get_watchlist(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    return await crud_watched_product.get_multi_by_user(db, user_id=current_user.id)
+
+@router.post("/", response_model=WatchedProductResponse)
+async def add_watched_product(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    watch_in: WatchedProductCreate
+):
+
+    if watch_in.marketplace not in ("wb", "ozon"):
+        raise HTTPException(status_code=400, detail=f"Неподдерживаемый маркетплейс: {watch_in.marketplace}")
+    if await crud_watched_product.count_by_user(db, user_id=current_user.id) >= settings.WATCHLIST_MAX_ITEMS_PER_USER:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Можно отслеживать не больше {settings.WATCHLIST_MAX_ITEMS_PER_USER} товаров"
+        )
+    
+    product_id = extract_product_id(watch_in.url, watch_in.marketplace)
+    existing = await crud_watched_product.get_by_product(
+        db, user_id=current_user.id, marketplace=watch_in.marketplace, product_id=product_id
+    )
+    if existing:
+        raise HTTPException(status_code=409, detail="Товар уже отслеживается")
+    
+    # Первое обновление - в ближайшем ночном окне, в слоте этого товара
+    watch = WatchedProduct(
+        user_id=current_user.id,
+        product_id=product_id,
+        marketplace=watch_in.marketplace,
+        url=watch_in.url,
+        max_reviews=watch_in.max_reviews,
+        next_refresh_at=next_refresh_at(watch_in.marketplace, product_id, datetime.datetime.utcnow())
+    )
+    db.add(watch)
+    await db.commit()
+    await db.refresh(watch)
+    return watch
+
+@router.delete("/{watch_id}", response_model=dict)
+async def delete_watched_product(
+    watch_id: int = Path(..., description="ID отслеживаемого товара"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    watch = await crud_watched_product.get(db, id=watch_id)
+    if not watch:
+        raise HTTPException(status_code=404, detail="Отслеживаемый товар не найден")
+    if watch.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этому товару")
+    
+    await crud_watched_product.remove(db, id=watch_id)
+    return {"status": "success", "message": "Товар больше не отслеживается"}
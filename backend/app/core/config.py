@@ -40,9 +40,31 @@ class Settings(BaseSettings):
     
     MODEL_DIR: str = os.getenv("MODEL_DIR", "../saved_model")
     MAX_REVIEWS: int = 1000
+    # Загрузить и прогреть модель при старте; до окончания прогрева /ready отвечает 503
+    ANALYZER_WARMUP_ON_STARTUP: bool = False
+    # Гистограммы стадий для /metrics и stage_timings анализов; выключенные почти ничего не стоят
+    METRICS_ENABLED: bool = True
     
     PARSER_TIMEOUT: int = 10
     PARSER_RETRIES: int = 3
+    # Общие для всех задач процесса лимиты загрузки отзывов с маркетплейса
+    WB_MAX_CONCURRENT_FETCHES: int = 4
+    OZON_MAX_CONCURRENT_FETCHES: int = 2
+    PARSER_MIN_INTERVAL: float = 0.5
+    MAX_BATCH_ITEMS: int = 100
+    # Свежий анализ того же товара с тем же max_reviews переиспользуется другими
+    # пользователями в течение этого окна; 0 отключает переиспользование
+    RESULT_REUSE_TTL_MINUTES: int = 30
+    # Сколько ждать чужой незавершенный анализ, прежде чем запустить свой
+    RESULT_REUSE_WAIT_SECONDS: int = 900
+    # Отслеживаемые товары обновляет воркер (python -m app.worker) раз в сутки в окне
+    # часов UTC [START, END); слоты товаров равномерно распределены по окну
+    WATCHLIST_WINDOW_START_HOUR: int = 1
+    WATCHLIST_WINDOW_END_HOUR: int = 6
+    WATCHLIST_CONCURRENCY: int = 4
+    WATCHLIST_MAX_ITEMS_PER_USER: int = 200
+    # Предрасчет старше этого не отдается вместо нового анализа
+    WATCHLIST_RESULT_MAX_AGE_HOURS: int = 48
 
     CORS_ORIGINS: List[str] = [
         "http://localhost", 
@@ -0,0 +1,24 @@
+import hashlib
+import zlib
+from typing import Any, Tuple
+
+import orjson
+
+# Готовые ответы хранятся сжатыми: JSON аспектов хорошо жмется, а распаковка почти бесплатна
+COMPRESSION_LEVEL = 6
+
+
+def dumps(obj: Any) -> bytes:
+
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def pack(obj: Any) -> Tuple[bytes, str]:
+
+    raw = dumps(obj)
+    return zlib.compress(raw, COMPRESSION_LEVEL), hashlib.md5(raw).hexdigest()
+
+
+def unpack(blob: bytes) -> bytes:
+
+    return zlib.decompress(blob)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Границы корзин гистограмм в секундах: от токенизации батча до парсинга сотен страниц
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+STAGE_METRIC = "feedbacklab_stage_duration_seconds"
+
+_enabled = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+# Словарь длительностей стадий текущей задачи анализа (см. collect_stages)
+_stage_sink: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_sink", default=None)
+_sink_lock = threading.Lock()
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Гистограммы по имени метрики и набору меток; наблюдения из любых потоков"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: Tuple[Tuple[str, str], ...] = ()) -> None:
+
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        with self._lock:
+            snapshot = sorted(
+                (key, list(histogram.counts), histogram.total, histogram.count, histogram.buckets)
+                for key, histogram in self._histograms.items()
+            )
+
+        lines: List[str] = []
+        current_name = None
+        for (name, labels), counts, total, count, buckets in snapshot:
+            if name != current_name:
+                lines.append(f"# TYPE {name} histogram")
+                current_name = name
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = f"{label_text}," if label_text else ""
+
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{name}_sum{suffix} {total}")
+            lines.append(f"{name}_count{suffix} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def _escape(value: str) -> str:
+
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _StageTimer:
+    __slots__ = ("stage", "labels", "started")
+
+    def __init__(self, stage: str, labels: Tuple[Tuple[str, str], ...]):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        observe_stage(self.stage, time.perf_counter() - self.started, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def set_enabled(enabled: bool) -> None:
+
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+
+    return _enabled
+
+
+def stage_timer(stage: str, **labels: str):
+    """Замер стадии: `with stage_timer("inference"): ...`. Выключенные метрики - общий пустой объект"""
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(stage, tuple(sorted(labels.items())))
+
+
+def observe_stage(stage: str, seconds: float, labels: Tuple[Tuple[str, str], ...] = ()) -> None:
+
+    registry.observe(STAGE_METRIC, seconds, (("stage", stage),) + labels)
+    sink = _stage_sink.get()
+    if sink is not None:
+        with _sink_lock:
+            sink[stage] = sink.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def collect_stages(sink: Dict[str, float]) -> Iterator[Dict[str, float]]:
+    """Суммирует в sink длительности всех стадий, замеренных внутри блока (и в потоках,
+    запущенных с копией контекста)"""
+    token = _stage_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _stage_sink.reset(token)
+
+
+def render_metrics() -> str:
+
+    return registry.render()
@@ -0,0 +1,199 @@
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 200 Гц: заметно дешевле запроса и достаточно, чтобы увидеть стадии длиннее ~50 мс
+DEFAULT_INTERVAL = 0.005
+MAX_STACK_DEPTH = 96
+TORCH_TOP_OPS = 25
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик на sys._current_frames без внешних зависимостей.
+
+    Снимает стеки потока, запустившего профилирование, и потоков, созданных после
+    старта (воркеры экстрактора). Результат - свернутые стеки в формате
+    flamegraph.pl / speedscope: `кадр;кадр;кадр количество`.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.duration = 0.0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._preexisting = {thread.ident for thread in threading.enumerate()}
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if ident == self._target:
+                    root = "request"
+                elif ident not in self._preexisting:
+                    root = "worker"
+                else:
+                    continue
+                self._stacks[self._fold(root, frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _fold(root: str, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(root)
+        return ";".join(reversed(stack))
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+
+def _new_torch_profiler():
+    try:
+        import torch
+        return torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+    except Exception as e:
+        logger.warning(f"Профилировщик torch недоступен: {e}")
+        return None
+
+
+# torch.profiler (kineto) один на процесс: второй запущенный профилировщик обрывает
+# трассу первого. Торч-профилирование получает одна сессия за раз
+_torch_session_lock = threading.Lock()
+
+
+class _TorchProfile:
+    """torch.profiler видит только поток, в котором его включили, поэтому он включается
+    вокруг вызовов, обернутых в torch_profiled (в любом потоке), и операторы всех
+    вызовов сливаются в общую сводку. Одновременно активен один профилировщик:
+    параллельный вызов той же сессии выполняется без него"""
+
+    def __init__(self):
+        self.enabled = False
+        self.skipped_calls = 0
+        self._ops: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    def run(self, func: Callable, *args, **kwargs):
+        if not self.enabled or not self._active.acquire(blocking=False):
+            if self.enabled:
+                with self._lock:
+                    self.skipped_calls += 1
+            return func(*args, **kwargs)
+        try:
+            profiler = _new_torch_profiler()
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler:
+                result = func(*args, **kwargs)
+            self._merge(profiler)
+            return result
+        finally:
+            self._active.release()
+
+    def _merge(self, profiler) -> None:
+        events = profiler.key_averages()
+        with self._lock:
+            for event in events:
+                totals = self._ops.setdefault(event.key, [0, 0.0, 0.0])
+                totals[0] += event.count
+                totals[1] += event.self_cpu_time_total
+                totals[2] += event.cpu_time_total
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Самые дорогие операторы по собственному времени CPU"""
+        with self._lock:
+            ops = sorted(self._ops.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "name": name,
+                "calls": calls,
+                "self_cpu_ms": round(self_cpu / 1000, 3),
+                "cpu_total_ms": round(cpu_total / 1000, 3),
+            }
+            for name, (calls, self_cpu, cpu_total) in ops[:TORCH_TOP_OPS]
+        ]
+
+
+class ProfileSession:
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.sampler = SamplingProfiler(interval)
+        self.torch = _TorchProfile()
+
+    def result(self) -> Dict[str, Any]:
+        result = {
+            "interval_ms": self.sampler.interval * 1000,
+            "duration_seconds": round(self.sampler.duration, 3),
+            "samples": self.sampler.samples,
+            "folded": self.sampler.folded(),
+            # Операторы torch из вызовов, обернутых в torch_profiled
+            "torch_ops": self.torch.summary(),
+        }
+        if not self.torch.enabled:
+            result["torch_ops_skipped"] = "Профилировщик torch занят другим запросом"
+        elif self.torch.skipped_calls:
+            result["torch_ops_skipped"] = f"Без профилировщика torch выполнено вызовов: {self.torch.skipped_calls}"
+        return result
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+@contextmanager
+def profile_request(interval: float = DEFAULT_INTERVAL) -> Iterator[ProfileSession]:
+    """Профилирует блок: `with profile_request() as session: ...; session.result()`"""
+    session = ProfileSession(interval)
+    # Занятый профилировщик torch не ждем: сессия идет только с сэмплером
+    session.torch.enabled = _torch_session_lock.acquire(blocking=False)
+    token = _current_session.set(session)
+    session.sampler.start()
+    try:
+        yield session
+    finally:
+        session.sampler.stop()
+        _current_session.reset(token)
+        if session.torch.enabled:
+            _torch_session_lock.release()
+
+
+def torch_profiled(func: Callable) -> Callable:
+    """Включает torch.profiler вокруг вызова, если он идет внутри profile_request.
+
+    Контекст должен дойти до потока пула (copy_context().run), иначе сессия не видна.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _current_session.get()
+        if session is None:
+            return func(*args, **kwargs)
+        return session.torch.run(func, *args, **kwargs)
+    return wrapper
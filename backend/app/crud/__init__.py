@@ -1,9 +1,15 @@
 from app.crud.crud_user import CRUDUser
 from app.crud.crud_analysis import CRUDAnalysis  
+from app.crud.crud_analysis_batch import CRUDAnalysisBatch
+from app.crud.crud_watched_product import CRUDWatchedProduct
 from app.crud.review_crud import reviews
+from app.crud.crud_aspect_fact import aspect_facts
 
 from app.models.user import User
-from app.models.analysis import AnalysisRequest
+from app.models.analysis import AnalysisBatch, AnalysisRequest
+from app.models.watchlist import WatchedProduct
 
 user = CRUDUser(User)
-analysis = CRUDAnalysis(AnalysisRequest) 
\ No newline at end of file
+analysis = CRUDAnalysis(AnalysisRequest)
+analysis_batch = CRUDAnalysisBatch(AnalysisBatch)
+watched_product = CRUDWatchedProduct(WatchedProduct) 
\ No newline at end of file
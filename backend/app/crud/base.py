@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, delete
 
+from app.core.metrics import stage_timer
 from app.db.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -57,8 +58,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
-        await db.commit()
-        await db.refresh(db_obj)
+        with stage_timer("db_commit"):
+            await db.commit()
+            await db.refresh(db_obj)
         return db_obj
     
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
@@ -1,13 +1,16 @@
-from typing import List, Optional, Dict, Any
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, case, desc, func, insert, literal, or_
 from sqlalchemy.orm import selectinload
 import logging
 
 from app.crud.base import CRUDBase
 from app.models.analysis import AnalysisRequest, AnalysisResult, AnalysisStatus
-from app.schemas.analysis import AnalysisRequestCreate, AnalysisRequestResponse
+from app.schemas.analysis import AnalysisRequestCreate, AnalysisRequestResponse, AnalysisResultResponse
+from app.core import encoding
+from app.core.metrics import stage_timer
 
 
 class CRUDAnalysis(CRUDBase[AnalysisRequest, AnalysisRequestCreate, AnalysisRequestResponse]):
@@ -25,6 +28,99 @@ class CRUDAnalysis(CRUDBase[AnalysisRequest, AnalysisRequestCreate, AnalysisRequ
         await db.refresh(db_obj)
         return db_obj
     
+    async def lock_product(self, db: AsyncSession, *, marketplace: str, product_id: str) -> None:
+
+        # Блокировка до конца транзакции: одновременные запросы одного товара не запускают два анализа
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"{marketplace}:{product_id}"))))
+    
+    async def find_reusable(
+        self, db: AsyncSession, *, marketplace: str, product_id: str, max_reviews: int, fresh_since: datetime
+    ) -> Optional[AnalysisRequest]:
+
+        # Готовый результат важнее незавершенного анализа, среди них - самый свежий
+        query = (
+            select(AnalysisRequest)
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(
+                and_(
+                    AnalysisRequest.marketplace == marketplace,
+                    AnalysisRequest.product_id == product_id,
+                    AnalysisRequest.max_reviews == max_reviews,
+                    AnalysisRequest.created_at >= fresh_since,
+                    AnalysisRequest.reused_from_id.is_(None),
+                    or_(
+                        and_(AnalysisRequest.status == AnalysisStatus.COMPLETED, AnalysisResult.id.isnot(None)),
+                        AnalysisRequest.status.in_([AnalysisStatus.PENDING, AnalysisStatus.PROCESSING]),
+                    ),
+                )
+            )
+            .order_by(
+                case((AnalysisRequest.status == AnalysisStatus.COMPLETED, 0), else_=1),
+                desc(AnalysisRequest.created_at)
+            )
+            .limit(1)
+        )
+        result = await db.execute(query)
+        return result.scalars().first()
+    
+    async def create_reused(
+        self, db: AsyncSession, *, obj_in: AnalysisRequestCreate, user_id: int, source: AnalysisRequest
+    ) -> AnalysisRequest:
+
+        db_obj = AnalysisRequest(**obj_in.model_dump(), user_id=user_id, reused_from_id=source.id)
+        if source.status == AnalysisStatus.COMPLETED:
+            db_obj.status = AnalysisStatus.COMPLETED
+            db_obj.progress_percentage = 100.0
+            db_obj.current_stage = "completed"
+        else:
+            db_obj.status = AnalysisStatus.PROCESSING
+            db_obj.progress_percentage = source.progress_percentage
+            db_obj.current_stage = source.current_stage
+        db_obj.processed_reviews = source.processed_reviews
+        db_obj.total_reviews = source.total_reviews
+        db.add(db_obj)
+        await db.flush()
+        
+        if source.status == AnalysisStatus.COMPLETED:
+            await self.copy_result(db, source_id=source.id, target_id=db_obj.id)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+    
+    async def copy_result(self, db: AsyncSession, *, source_id: int, target_id: int) -> None:
+
+        # INSERT ... SELECT: JSON результата не проходят через Python. Готовый ответ не
+        # копируется - в нем id и request_id источника; он упакуется при первом чтении
+        columns = [
+            "positive_aspects",
+            "negative_aspects",
+            "aspect_categories",
+            "reviews_count",
+            "sentiment_summary",
+            "product_info",
+            "accumulator",
+        ]
+        source = select(
+            literal(target_id),
+            literal(datetime.utcnow()),
+            *[getattr(AnalysisResult, column) for column in columns]
+        ).where(AnalysisResult.request_id == source_id)
+        await db.execute(insert(AnalysisResult).from_select(["request_id", "created_at", *columns], source))
+    
+    async def get_state(self, db: AsyncSession, *, id: int) -> Optional[Dict[str, Any]]:
+
+        # Колонки, а не объект: identity map сессии не вернет устаревшие значения
+        query = select(
+            AnalysisRequest.status,
+            AnalysisRequest.progress_percentage,
+            AnalysisRequest.current_stage,
+            AnalysisRequest.processed_reviews,
+            AnalysisRequest.total_reviews,
+        ).where(AnalysisRequest.id == id)
+        result = await db.execute(query)
+        row = result.mappings().first()
+        return dict(row) if row else None
+    
     async def get_multi_by_user(
         self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[AnalysisRequest]:
@@ -40,6 +136,35 @@ class CRUDAnalysis(CRUDBase[AnalysisRequest, AnalysisRequestCreate, AnalysisRequ
         result = await db.execute(query)
         return result.scalars().all()
     
+    async def get_summaries_by_user(
+        self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+
+        # Только колонки для списка: тяжелые JSON с аспектами не читаются и не декодируются
+        query = (
+            select(
+                AnalysisRequest.id,
+                AnalysisRequest.user_id,
+                AnalysisRequest.product_id,
+                AnalysisRequest.marketplace,
+                AnalysisRequest.status,
+                AnalysisRequest.error_message,
+                AnalysisRequest.created_at,
+                AnalysisRequest.updated_at,
+                AnalysisRequest.url,
+                AnalysisRequest.max_reviews,
+                AnalysisResult.product_info["name"].as_string().label("product_name"),
+                func.coalesce(AnalysisResult.reviews_count, 0).label("reviews_count"),
+            )
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(AnalysisRequest.user_id == user_id)
+            .order_by(desc(AnalysisRequest.created_at))
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return [dict(row) for row in result.mappings()]
+    
     async def get_with_result(
         self, db: AsyncSession, *, id: int, user_id: Optional[int] = None
     ) -> Optional[AnalysisRequest]:
@@ -94,39 +219,112 @@ class CRUDAnalysis(CRUDBase[AnalysisRequest, AnalysisRequestCreate, AnalysisRequ
         aspect_categories: Dict[str, Any],
         reviews_count: int,
         sentiment_summary: Dict[str, Any],
-        product_info: Optional[Dict[str, Any]] = None
+        product_info: Optional[Dict[str, Any]] = None,
+        accumulator: Optional[Dict[str, Any]] = None
     ) -> AnalysisResult:
 
 
         query = select(AnalysisResult).where(AnalysisResult.request_id == request_id)
         existing = await db.execute(query)
-        existing_result = existing.scalars().first()
+        result = existing.scalars().first()
         
-        if existing_result:
-            existing_result.positive_aspects = positive_aspects
-            existing_result.negative_aspects = negative_aspects
-            existing_result.aspect_categories = aspect_categories
-            existing_result.reviews_count = reviews_count
-            existing_result.sentiment_summary = sentiment_summary
-            existing_result.product_info = product_info
-            db.add(existing_result)
-            await db.commit()
-            await db.refresh(existing_result)
-            return existing_result
-        else:
-            result = AnalysisResult(
-                request_id=request_id,
-                positive_aspects=positive_aspects,
-                negative_aspects=negative_aspects,
-                aspect_categories=aspect_categories,
-                reviews_count=reviews_count,
-                sentiment_summary=sentiment_summary,
-                product_info=product_info
-            )
-            db.add(result)
+        if result is None:
+            result = AnalysisResult(request_id=request_id)
+        
+        result.positive_aspects = positive_aspects
+        result.negative_aspects = negative_aspects
+        result.aspect_categories = aspect_categories
+        result.reviews_count = reviews_count
+        result.sentiment_summary = sentiment_summary
+        result.product_info = product_info
+        result.accumulator = accumulator
+        db.add(result)
+        
+        # id и created_at появляются только после flush, а они входят в готовый ответ
+        with stage_timer("db_save_result"):
+            await db.flush()
+            self._pack_result(result)
             await db.commit()
             await db.refresh(result)
-            return result
+        return result
+    
+    async def save_stage_timings(
+        self, db: AsyncSession, *, db_obj: AnalysisRequest, stage_timings: Dict[str, float]
+    ) -> AnalysisRequest:
+
+        db_obj.stage_timings = {stage: round(seconds, 4) for stage, seconds in stage_timings.items()}
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+    
+    async def save_profile(
+        self, db: AsyncSession, *, db_obj: AnalysisRequest, profile: Dict[str, Any]
+    ) -> AnalysisRequest:
+
+        db_obj.profile = profile
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+    
+    async def get_profile(self, db: AsyncSession, *, id: int) -> Optional[Dict[str, Any]]:
+
+        result = await db.execute(select(AnalysisRequest.profile).where(AnalysisRequest.id == id))
+        return result.scalar_one_or_none()
+    
+    async def get_packed(
+        self, db: AsyncSession, *, id: int, user_id: int
+    ) -> Optional[Dict[str, Any]]:
+
+        query = (
+            select(
+                AnalysisRequest.id,
+                AnalysisRequest.user_id,
+                AnalysisRequest.product_id,
+                AnalysisRequest.marketplace,
+                AnalysisRequest.status,
+                AnalysisRequest.error_message,
+                AnalysisRequest.created_at,
+                AnalysisRequest.updated_at,
+                AnalysisRequest.url,
+                AnalysisRequest.max_reviews,
+                AnalysisRequest.stage_timings,
+                AnalysisRequest.reused_from_id,
+                AnalysisResult.id.label("result_id"),
+                AnalysisResult.response_blob,
+                AnalysisResult.response_etag,
+            )
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(and_(AnalysisRequest.id == id, AnalysisRequest.user_id == user_id))
+        )
+        result = await db.execute(query)
+        row = result.mappings().first()
+        return dict(row) if row else None
+    
+    async def pack_result(self, db: AsyncSession, *, request_id: int) -> Optional[AnalysisResult]:
+
+        result = await self.get_result(db, request_id=request_id)
+        if result is None:
+            return None
+        self._pack_result(result)
+        await db.commit()
+        return result
+    
+    @staticmethod
+    def _pack_result(result: AnalysisResult) -> None:
+
+        payload = AnalysisResultResponse.model_validate(result).model_dump()
+        result.response_blob, result.response_etag = encoding.pack(payload)
+    
+    async def get_accumulator(self, db: AsyncSession, *, request_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+
+        # Счетчики результата и число отзывов, из которых он собран, без остальных JSON
+        result = await db.execute(
+            select(AnalysisResult.accumulator, AnalysisResult.reviews_count).where(AnalysisResult.request_id == request_id)
+        )
+        row = result.first()
+        if row is None:
+            return None, 0
+        return row.accumulator, row.reviews_count or 0
     
     async def get_result(self, db: AsyncSession, *, request_id: int) -> Optional[AnalysisResult]:
 
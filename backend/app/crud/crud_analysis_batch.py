@@ -0,0 +1,69 @@
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, func
+
+from app.crud.base import CRUDBase
+from app.models.analysis import AnalysisBatch, AnalysisRequest, AnalysisResult, AnalysisStatus
+from app.schemas.analysis import AnalysisBatchCreate, AnalysisBatchResponse, AnalysisRequestCreate
+
+
+class CRUDAnalysisBatch(CRUDBase[AnalysisBatch, AnalysisBatchCreate, AnalysisBatchResponse]):
+
+    async def create_with_items(
+        self, db: AsyncSession, *, items: List[AnalysisRequestCreate], user_id: int
+    ) -> Tuple[AnalysisBatch, List[AnalysisRequest]]:
+
+        # Пакет и все его анализы создаются одной транзакцией
+        batch = AnalysisBatch(user_id=user_id, status=AnalysisStatus.PENDING)
+        analyses = [AnalysisRequest(**item.model_dump(), user_id=user_id, batch=batch) for item in items]
+        db.add(batch)
+        db.add_all(analyses)
+        await db.commit()
+        await db.refresh(batch)
+        return batch, analyses
+    
+    async def get_by_user(self, db: AsyncSession, *, id: int, user_id: int) -> Optional[AnalysisBatch]:
+
+        result = await db.execute(
+            select(AnalysisBatch).where(and_(AnalysisBatch.id == id, AnalysisBatch.user_id == user_id))
+        )
+        return result.scalars().first()
+    
+    async def get_analyses(self, db: AsyncSession, *, batch_id: int) -> List[AnalysisRequest]:
+
+        result = await db.execute(
+            select(AnalysisRequest).where(AnalysisRequest.batch_id == batch_id).order_by(AnalysisRequest.id)
+        )
+        return result.scalars().all()
+    
+    async def get_item_summaries(self, db: AsyncSession, *, batch_id: int) -> List[Dict[str, Any]]:
+
+        # Статусы товаров без тяжелых JSON результатов, как в списке анализов
+        query = (
+            select(
+                AnalysisRequest.id,
+                AnalysisRequest.product_id,
+                AnalysisRequest.marketplace,
+                AnalysisRequest.url,
+                AnalysisRequest.status,
+                func.coalesce(AnalysisRequest.progress_percentage, 0.0).label("progress_percentage"),
+                AnalysisRequest.error_message,
+                AnalysisResult.product_info["name"].as_string().label("product_name"),
+                func.coalesce(AnalysisResult.reviews_count, 0).label("reviews_count"),
+            )
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(AnalysisRequest.batch_id == batch_id)
+            .order_by(AnalysisRequest.id)
+        )
+        result = await db.execute(query)
+        return [dict(row) for row in result.mappings()]
+    
+    async def update_status(
+        self, db: AsyncSession, *, db_obj: AnalysisBatch, status: AnalysisStatus
+    ) -> AnalysisBatch:
+
+        return await super().update(db, db_obj=db_obj, obj_in={"status": status})
+
+
+analysis_batch = CRUDAnalysisBatch(AnalysisBatch)
@@ -0,0 +1,116 @@
+from datetime import date
+from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import DateTime, and_, cast, desc, func, insert, literal_column
+
+from app.models.aspect_fact import AspectCountFact, AspectFactSnapshot
+
+TREND_PERIODS = ("day", "week", "month")
+
+
+class CRUDAspectFact:
+
+    async def add_snapshot(self, db: AsyncSession, snapshot: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+
+        # Без commit: факты фиксируются в одной транзакции с результатом анализа. Снимок
+        # пишется и без фактов - его отзывы входят в знаменатель трендов
+        await db.execute(insert(AspectFactSnapshot), [snapshot])
+        if rows:
+            await db.execute(insert(AspectCountFact), rows)
+    
+    async def get_trends(
+        self,
+        db: AsyncSession,
+        *,
+        marketplace: str,
+        product_id: str,
+        period: str,
+        since: date,
+        aspect: Optional[str] = None,
+        category: Optional[str] = None,
+        polarity: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+
+        if period not in TREND_PERIODS:
+            raise ValueError(f"Неподдерживаемый период: {period}")
+        
+        # Литерал, а не параметр: иначе date_trunc в SELECT и GROUP BY - разные выражения
+        def bucket(column):
+            return func.date_trunc(literal_column(f"'{period}'"), cast(column, DateTime))
+        
+        product_filter = and_(
+            AspectCountFact.marketplace == marketplace,
+            AspectCountFact.product_id == product_id,
+            AspectCountFact.bucket_date >= since,
+        )
+        
+        # Знаменатель - все снимки товара за период и их отзывы, а не только снимки,
+        # упомянувшие аспект: дельта обновления и полная выборка сравнимы на отзыв
+        snapshots = (
+            select(
+                bucket(AspectFactSnapshot.bucket_date).label("period"),
+                func.count().label("snapshots"),
+                func.sum(AspectFactSnapshot.reviews).label("reviews"),
+            )
+            .where(
+                and_(
+                    AspectFactSnapshot.marketplace == marketplace,
+                    AspectFactSnapshot.product_id == product_id,
+                    AspectFactSnapshot.bucket_date >= since,
+                )
+            )
+            .group_by(bucket(AspectFactSnapshot.bucket_date))
+            .subquery()
+        )
+        
+        # С фильтром по аспекту ряд строится по нему, иначе - по категориям
+        name_column = AspectCountFact.aspect if aspect else AspectCountFact.category
+        filters = [product_filter]
+        if aspect:
+            filters.append(AspectCountFact.aspect == aspect)
+        if category:
+            filters.append(AspectCountFact.category == category)
+        if polarity:
+            filters.append(AspectCountFact.polarity == polarity)
+        
+        mentions = (
+            select(
+                bucket(AspectCountFact.bucket_date).label("period"),
+                AspectCountFact.polarity,
+                name_column.label("name"),
+                func.sum(AspectCountFact.count).label("mentions"),
+            )
+            .where(and_(*filters))
+            .group_by(bucket(AspectCountFact.bucket_date), AspectCountFact.polarity, name_column)
+            .subquery()
+        )
+        
+        query = (
+            select(
+                mentions.c.period,
+                mentions.c.polarity,
+                mentions.c.name,
+                mentions.c.mentions,
+                snapshots.c.snapshots,
+                snapshots.c.reviews,
+            )
+            .join(snapshots, snapshots.c.period == mentions.c.period)
+            .order_by(mentions.c.period, mentions.c.polarity, desc(mentions.c.mentions))
+        )
+        result = await db.execute(query)
+        return [
+            {
+                "period": row["period"].date(),
+                "polarity": row["polarity"],
+                "name": row["name"],
+                "mentions": row["mentions"],
+                "snapshots": row["snapshots"],
+                "reviews": row["reviews"],
+                "mentions_per_review": round(row["mentions"] / max(1, row["reviews"]), 4),
+            }
+            for row in result.mappings()
+        ]
+
+
+aspect_facts = CRUDAspectFact()
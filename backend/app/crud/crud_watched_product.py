@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, desc, func
+from sqlalchemy.orm import undefer
+
+from app.crud.base import CRUDBase
+from app.models.analysis import AnalysisRequest, AnalysisStatus
+from app.models.watchlist import WatchedProduct
+from app.schemas.watchlist import WatchedProductCreate, WatchedProductResponse
+
+
+class CRUDWatchedProduct(CRUDBase[WatchedProduct, WatchedProductCreate, WatchedProductResponse]):
+
+    async def get_multi_by_user(self, db: AsyncSession, *, user_id: int) -> List[WatchedProduct]:
+
+        result = await db.execute(
+            select(WatchedProduct).where(WatchedProduct.user_id == user_id).order_by(WatchedProduct.id)
+        )
+        return result.scalars().all()
+    
+    async def count_by_user(self, db: AsyncSession, *, user_id: int) -> int:
+
+        result = await db.execute(select(func.count(WatchedProduct.id)).where(WatchedProduct.user_id == user_id))
+        return result.scalar_one()
+    
+    async def get_by_product(
+        self, db: AsyncSession, *, user_id: int, marketplace: str, product_id: str
+    ) -> Optional[WatchedProduct]:
+
+        result = await db.execute(
+            select(WatchedProduct).where(
+                and_(
+                    WatchedProduct.user_id == user_id,
+                    WatchedProduct.marketplace == marketplace,
+                    WatchedProduct.product_id == product_id,
+                )
+            )
+        )
+        return result.scalars().first()
+    
+    async def get_due(self, db: AsyncSession, *, now: datetime, limit: int = 100) -> List[WatchedProduct]:
+
+        result = await db.execute(
+            select(WatchedProduct)
+            .where(WatchedProduct.next_refresh_at <= now)
+            .order_by(WatchedProduct.next_refresh_at)
+            .limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def get_latest_refreshed(
+        self, db: AsyncSession, *, marketplace: str, product_id: str, max_reviews: int
+    ) -> Optional[WatchedProduct]:
+
+        # Цепочка предрасчетов общая для отслеживаний товара с одинаковым max_reviews,
+        # кто бы из пользователей его ни отслеживал
+        result = await db.execute(
+            select(WatchedProduct)
+            .options(undefer(WatchedProduct.counted_review_ids))
+            .where(
+                and_(
+                    WatchedProduct.marketplace == marketplace,
+                    WatchedProduct.product_id == product_id,
+                    WatchedProduct.max_reviews == max_reviews,
+                    WatchedProduct.analysis_id.isnot(None),
+                    WatchedProduct.last_refreshed_at.isnot(None),
+                )
+            )
+            .order_by(desc(WatchedProduct.last_refreshed_at))
+            .limit(1)
+        )
+        return result.scalars().first()
+    
+    async def find_precomputed(
+        self, db: AsyncSession, *, marketplace: str, product_id: str, max_reviews: int, fresh_since: datetime
+    ) -> Optional[AnalysisRequest]:
+
+        # Предрасчет по max_reviews отзывов подходит и для запросов поменьше; сравнивается
+        # max_reviews самого анализа - именно по нему собраны его счетчики
+        query = (
+            select(AnalysisRequest)
+            .join(WatchedProduct, WatchedProduct.analysis_id == AnalysisRequest.id)
+            .where(
+                and_(
+                    WatchedProduct.marketplace == marketplace,
+                    WatchedProduct.product_id == product_id,
+                    AnalysisRequest.max_reviews >= max_reviews,
+                    WatchedProduct.last_refreshed_at >= fresh_since,
+                    AnalysisRequest.status == AnalysisStatus.COMPLETED,
+                )
+            )
+            .order_by(desc(WatchedProduct.last_refreshed_at))
+            .limit(1)
+        )
+        result = await db.execute(query)
+        return result.scalars().first()
+
+
+watched_product = CRUDWatchedProduct(WatchedProduct)
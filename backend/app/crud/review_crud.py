@@ -1,13 +1,54 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Union
+from collections import OrderedDict
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, func
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.sql import text
 from sqlalchemy.orm import selectinload
 
 from app.models.review import ReviewModel
 from app.crud.base import CRUDBase
 
+# asyncpg ограничивает запрос 32767 параметрами: 1000 строк по 12 колонок укладываются
+UPSERT_CHUNK_SIZE = 1000
+UPSERT_CONFLICT_COLUMNS = ["source", "external_id"]
+UPSERT_UPDATE_COLUMNS = ["text", "rating", "product_name", "date", "author", "likes", "dislikes", "photos"]
+
+# Сколько секунд переиспользуем посчитанное количество отзывов для пагинации
+COUNT_CACHE_TTL = 60
+# Сколько разных фильтров (product_id, source) держим в кэше, лишние вытесняем по LRU
+COUNT_CACHE_MAX_SIZE = 1024
+
 class CRUDReview(CRUDBase[ReviewModel, Dict[str, Any], Dict[str, Any]]):
+
+    def __init__(self, model):
+
+        super().__init__(model)
+        self._count_cache: "OrderedDict[Tuple[Optional[str], Optional[str]], Tuple[float, int, bool]]" = OrderedDict()
+
+    async def create(self, db: AsyncSession, *, obj_in: Dict[str, Any]) -> ReviewModel:
+
+        db_obj = await super().create(db, obj_in=obj_in)
+        self.invalidate_counts([(db_obj.product_id, db_obj.source)])
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> ReviewModel:
+
+        obj = await super().remove(db, id=id)
+        if obj:
+            self.invalidate_counts([(obj.product_id, obj.source)])
+        return obj
+
+    def invalidate_counts(self, keys: Iterable[Tuple[Optional[str], Optional[str]]]) -> None:
+
+        # Запись по (product_id, source) меняет и счетчики с частичными фильтрами
+        stale = set()
+        for product_id, source in keys:
+            stale.update({(product_id, source), (product_id, None), (None, source), (None, None)})
+        for key in stale:
+            self._count_cache.pop(key, None)
+
     async def get_by_product_id(self, db: AsyncSession, product_id: str) -> List[ReviewModel]:
      
         result = await db.execute(select(self.model).where(self.model.product_id == product_id))
@@ -21,29 +62,74 @@ class CRUDReview(CRUDBase[ReviewModel, Dict[str, Any], Dict[str, Any]]):
     async def get_with_pagination(
         self, 
         db: AsyncSession, 
-        skip: int = 0, 
         limit: int = 100,
         product_id: Optional[str] = None,
-        source: Optional[str] = None
-    ) -> tuple[List[ReviewModel], int]:
+        source: Optional[str] = None,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[ReviewModel], Optional[Tuple[str, int]]]:
 
         query = select(self.model)
-        count_query = select(func.count()).select_from(self.model)
         
         if product_id:
             query = query.where(self.model.product_id == product_id)
-            count_query = count_query.where(self.model.product_id == product_id)
         
         if source:
             query = query.where(self.model.source == source)
-            count_query = count_query.where(self.model.source == source)
         
-        query = query.offset(skip).limit(limit)
+        if cursor:
+            query = query.where(tuple_(self.model.product_id, self.model.id) > tuple_(*cursor))
+        
+        query = query.order_by(self.model.product_id, self.model.id).limit(limit + 1)
         
         result = await db.execute(query)
-        count_result = await db.execute(count_query)
+        items = result.scalars().all()
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = (items[-1].product_id, items[-1].id)
+        
+        return items, next_cursor
+
+    async def count(
+        self,
+        db: AsyncSession,
+        product_id: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> Tuple[int, bool]:
+
+        key = (product_id, source)
+        cached = self._count_cache.get(key)
+        if cached:
+            if time.monotonic() - cached[0] < COUNT_CACHE_TTL:
+                self._count_cache.move_to_end(key)
+                return cached[1], cached[2]
+            del self._count_cache[key]
+        
+        total, is_estimate = None, False
+        if not product_id and not source:
+            # Для всей таблицы точный COUNT(*) - полный проход, берем оценку планировщика
+            estimate = await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+                {"table": self.model.__tablename__}
+            )
+            value = estimate.scalar()
+            if value is not None and value >= 0:
+                total, is_estimate = int(value), True
+        
+        if total is None:
+            count_query = select(func.count()).select_from(self.model)
+            if product_id:
+                count_query = count_query.where(self.model.product_id == product_id)
+            if source:
+                count_query = count_query.where(self.model.source == source)
+            count_result = await db.execute(count_query)
+            total = count_result.scalar()
         
-        return result.scalars().all(), count_result.scalar()
+        self._count_cache[key] = (time.monotonic(), total, is_estimate)
+        while len(self._count_cache) > COUNT_CACHE_MAX_SIZE:
+            self._count_cache.popitem(last=False)
+        return total, is_estimate
 
     async def create_from_parser(
         self, 
@@ -51,42 +137,89 @@ class CRUDReview(CRUDBase[ReviewModel, Dict[str, Any], Dict[str, Any]]):
         parsed_reviews: List[Dict[str, Any]]
     ) -> List[ReviewModel]:
 
-        reviews_to_create = []
+        created = []
+        for chunk in self._chunks(self._prepare_rows(parsed_reviews)):
+            stmt = (
+                pg_insert(self.model)
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=UPSERT_CONFLICT_COLUMNS)
+                .returning(self.model)
+            )
+            result = await db.scalars(stmt, execution_options={"populate_existing": True})
+            created.extend(result.all())
+        
+        if created:
+            await db.commit()
+            self.invalidate_counts({(review.product_id, review.source) for review in created})
         
-        for review_data in parsed_reviews:
-            if review_data.get("external_id"):
-                existing = await db.execute(
-                    select(self.model).where(
-                        self.model.external_id == review_data["external_id"],
-                        self.model.source == review_data["source"]
-                    )
+        return created
+
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        parsed_reviews: List[Dict[str, Any]],
+        *,
+        update_existing: bool = False,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        commit: bool = True
+    ) -> List[int]:
+
+        ids = []
+        rows = self._prepare_rows(parsed_reviews)
+        for chunk in self._chunks(rows, chunk_size):
+            stmt = pg_insert(self.model).values(chunk)
+            if update_existing:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=UPSERT_CONFLICT_COLUMNS,
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in UPSERT_UPDATE_COLUMNS
+                    }
                 )
-                if existing.scalar_one_or_none():
-                    continue
-            
-            review = ReviewModel(
-                text=review_data["text"],
-                rating=review_data.get("rating"),
-                product_id=review_data["product_id"],
-                product_name=review_data.get("product_name"),
-                source=review_data["source"],
-                external_id=review_data.get("external_id"),
-                date=review_data.get("date"),
-                author=review_data.get("author"),
-                likes=review_data.get("likes", 0),
-                dislikes=review_data.get("dislikes", 0),
-                photos=review_data.get("photos", [])
-            )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=UPSERT_CONFLICT_COLUMNS)
             
-            reviews_to_create.append(review)
+            result = await db.execute(stmt.returning(self.model.id))
+            ids.extend(result.scalars().all())
         
-        if reviews_to_create:
-            db.add_all(reviews_to_create)
+        # commit=False - запись уходит в транзакции вызывающего вместе с его изменениями;
+        # кэш счетчиков он сбрасывает сам после commit через invalidate_counts, иначе
+        # параллельный count() успеет закэшировать старое значение
+        if commit:
             await db.commit()
-            for review in reviews_to_create:
-                await db.refresh(review)
-        
-        return reviews_to_create
+            self.invalidate_counts({(row["product_id"], row["source"]) for row in rows})
+        return ids
+
+    @staticmethod
+    def _prepare_rows(parsed_reviews: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+        # Один INSERT ... ON CONFLICT DO UPDATE не может затронуть строку дважды,
+        # поэтому повторы (source, external_id) внутри пачки схлопываем заранее
+        rows: Dict[Any, Dict[str, Any]] = {}
+        for index, review_data in enumerate(parsed_reviews):
+            row = {
+                "text": review_data["text"],
+                "rating": review_data.get("rating"),
+                "product_id": review_data["product_id"],
+                "product_name": review_data.get("product_name"),
+                "source": review_data["source"],
+                "external_id": review_data.get("external_id"),
+                "date": review_data.get("date"),
+                "author": review_data.get("author"),
+                "likes": review_data.get("likes", 0),
+                "dislikes": review_data.get("dislikes", 0),
+                "photos": review_data.get("photos", []),
+                "topics": [],
+            }
+            key = (row["source"], row["external_id"]) if row["external_id"] else index
+            rows[key] = row
+        return list(rows.values())
+
+    @staticmethod
+    def _chunks(rows: List[Dict[str, Any]], size: int = UPSERT_CHUNK_SIZE):
+
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
 
     async def update_sentiment(
         self, 
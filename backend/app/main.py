@@ -1,13 +1,18 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.core import metrics
+from app.services.analyzer.warmup import get_warmup_status, is_ready, mark_warmup_pending, warm_up_analyzer
 
 os.makedirs("app/static/avatars", exist_ok=True)
+metrics.set_enabled(settings.METRICS_ENABLED)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -36,6 +41,13 @@ app.add_middleware(
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def start_analyzer_warmup():
+    if settings.ANALYZER_WARMUP_ON_STARTUP:
+        # Прогрев в отдельном потоке: /health отвечает сразу, /ready - после прогрева
+        mark_warmup_pending()
+        app.state.warmup = asyncio.get_running_loop().run_in_executor(None, warm_up_analyzer)
+
 @app.get("/")
 async def root():
     return {
@@ -47,5 +59,19 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check():
+    status = get_warmup_status()
+    if is_ready():
+        return {"status": "ready", **status}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "failed" if status["error"] else "warming_up", **status}
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -1,2 +1,5 @@
 from app.models.user import User
-from app.models.analysis import AnalysisRequest, AnalysisRequestSchema, AnalysisResult, AnalysisStatus, Marketplace 
\ No newline at end of file
+from app.models.analysis import AnalysisBatch, AnalysisRequest, AnalysisRequestSchema, AnalysisResult, AnalysisStatus, Marketplace
+from app.models.review import ReviewModel
+from app.models.watchlist import WatchedProduct
+from app.models.aspect_fact import AspectCountFact, AspectFactSnapshot
@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum, Boolean, Float, BigInteger
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Float, BigInteger, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, deferred
 import enum
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field, HttpUrl
@@ -19,6 +20,18 @@ class Marketplace(str, enum.Enum):
     WILDBERRIES = "wb"
     OZON = "ozon"
 
+class AnalysisBatch(Base):
+    __tablename__ = "analysis_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("user.id"), index=True)
+    status = Column(String, default=AnalysisStatus.PENDING)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = relationship("User", back_populates="analysis_batches")
+    analyses = relationship("AnalysisRequest", back_populates="batch")
+
 class AnalysisRequest(Base):
     __tablename__ = "analysis_requests"
     
@@ -39,22 +52,41 @@ class AnalysisRequest(Base):
     current_stage = Column(String, default="pending")  
     processed_reviews = Column(Integer, default=0)  
     total_reviews = Column(Integer, default=0)  
+    # Суммарное время стадий задачи в секундах: парсинг, токенизация, инференс, запись в БД
+    stage_timings = Column(JSONB, nullable=True)
+    # Профиль задачи, запущенной администратором с флагом профилирования
+    profile = deferred(Column(JSONB, nullable=True))
+    # Пакет, в составе которого запущен анализ; у одиночных анализов пусто
+    batch_id = Column(Integer, ForeignKey("analysis_batches.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Анализ, чей результат скопирован вместо повторного парсинга и инференса
+    reused_from_id = Column(Integer, ForeignKey("analysis_requests.id", ondelete="SET NULL"), nullable=True)
     
     user = relationship("User", back_populates="analysis_requests")
+    batch = relationship("AnalysisBatch", back_populates="analyses")
     results = relationship("AnalysisResult", back_populates="request", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_analysis_requests_user_id_created_at", user_id, created_at.desc()),
+        Index("ix_analysis_requests_product_lookup", marketplace, product_id, max_reviews, created_at.desc()),
+    )
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
     
     id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(Integer, ForeignKey("analysis_requests.id"))
-    positive_aspects = Column(JSON, nullable=True)  
-    negative_aspects = Column(JSON, nullable=True)  
-    aspect_categories = Column(JSON, nullable=True)  
+    request_id = Column(Integer, ForeignKey("analysis_requests.id"), unique=True, index=True)
+    positive_aspects = Column(JSONB, nullable=True)  
+    negative_aspects = Column(JSONB, nullable=True)  
+    aspect_categories = Column(JSONB, nullable=True)  
     reviews_count = Column(Integer, default=0)  
-    sentiment_summary = Column(JSON, nullable=True)  
-    product_info = Column(JSON, nullable=True)  
+    sentiment_summary = Column(JSONB, nullable=True)  
+    product_info = Column(JSONB, nullable=True)  
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Сжатый сериализованный AnalysisResultResponse, отдается без повторной сериализации
+    response_blob = deferred(Column(LargeBinary, nullable=True))
+    response_etag = Column(String, nullable=True)
+    # AnalysisAccumulator.to_dict(): счетчики, из которых собран результат, для дозаписи и слияния
+    accumulator = deferred(Column(JSONB, nullable=True))
     
     request = relationship("AnalysisRequest", back_populates="results")
 
@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Index
+
+from app.db.database import Base
+
+class AspectFactSnapshot(Base):
+    """Снимок анализа товара для трендов: сколько отзывов стоит за его фактами. Полный
+    анализ - вся выборка, обновление отслеживания - только новые отзывы; упоминания
+    на отзыв сравнимы между ними"""
+    __tablename__ = "aspect_fact_snapshots"
+    
+    # Без внешнего ключа: история товара переживает удаление анализа пользователем
+    analysis_id = Column(Integer, primary_key=True, autoincrement=False)
+    marketplace = Column(String, nullable=False)
+    product_id = Column(String, nullable=False)
+    bucket_date = Column(Date, nullable=False)
+    reviews = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_aspect_fact_snapshots_product_date", marketplace, product_id, bucket_date),
+    )
+
+class AspectCountFact(Base):
+    """Упоминания аспекта в одном снимке анализа товара. Таблица только дописывается:
+    тренды считаются агрегатами SQL без чтения JSON результатов"""
+    __tablename__ = "aspect_count_facts"
+    
+    id = Column(BigInteger, primary_key=True)
+    # Снимок в aspect_fact_snapshots
+    analysis_id = Column(Integer, nullable=False)
+    marketplace = Column(String, nullable=False)
+    product_id = Column(String, nullable=False)
+    bucket_date = Column(Date, nullable=False)
+    # Лемма аспекта: разные формы одного аспекта складываются между снимками
+    aspect = Column(String, nullable=False)
+    category = Column(String, nullable=True)
+    polarity = Column(String, nullable=False)
+    count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_aspect_count_facts_product_date", marketplace, product_id, bucket_date),
+        Index("ix_aspect_count_facts_product_aspect_date", marketplace, product_id, aspect, bucket_date),
+    )
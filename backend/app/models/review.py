@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
-from app.db.base_class import Base
+from app.db.database import Base
 
 class ReviewModel(Base):
     __tablename__ = "reviews"
@@ -22,4 +22,9 @@ class ReviewModel(Base):
     sentiment = Column(JSON, nullable=True)
     topics = Column(JSON, nullable=True, default=list)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ux_reviews_source_external_id", "source", "external_id", unique=True),
+        Index("ix_reviews_product_id_id", "product_id", "id"),
+    )
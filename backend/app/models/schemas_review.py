@@ -34,15 +34,15 @@ class ReviewResponse(ReviewBase):
     updated_at: Optional[datetime] = Field(None, description="Дата обновления записи")
     
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 # Модель для списка отзывов 
 class ReviewListResponse(BaseModel):
     total: int = Field(..., description="Общее количество отзывов")
+    total_is_estimate: bool = Field(False, description="Количество является оценкой планировщика")
     items: List[ReviewResponse] = Field(..., description="Список отзывов")
-    page: int = Field(1, description="Текущая страница")
     size: int = Field(20, description="Размер страницы")
-    pages: int = Field(..., description="Общее количество страниц")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (None - страниц больше нет)")
 
 # Модель для результатов анализа тональности отзыва
 class SentimentResult(BaseModel):
@@ -17,4 +17,6 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     avatar = Column(String, nullable=True)
     
-    analysis_requests = relationship("AnalysisRequest", back_populates="user") 
\ No newline at end of file
+    analysis_requests = relationship("AnalysisRequest", back_populates="user")
+    analysis_batches = relationship("AnalysisBatch", back_populates="user")
+    watched_products = relationship("WatchedProduct", back_populates="user", cascade="all, delete-orphan") 
\ No newline at end of file
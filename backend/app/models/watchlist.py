@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, deferred
+
+from app.db.database import Base
+
+class WatchedProduct(Base):
+    __tablename__ = "watched_products"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    product_id = Column(String, nullable=False)
+    marketplace = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    # Сколько последних отзывов загружать при каждом обновлении
+    max_reviews = Column(Integer, default=300)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Слот обновления внутри ночного окна, см. app.services.watchlist.next_refresh_at
+    next_refresh_at = Column(DateTime, nullable=False)
+    last_refreshed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    # Последний предрасчитанный анализ; новые отзывы дописываются к его счетчикам
+    analysis_id = Column(Integer, ForeignKey("analysis_requests.id", ondelete="SET NULL"), nullable=True)
+    # Внешние ID отзывов, уже учтенных в счетчиках этого предрасчета
+    counted_review_ids = deferred(Column(JSONB, nullable=True))
+    
+    user = relationship("User", back_populates="watched_products")
+    analysis = relationship("AnalysisRequest")
+
+    __table_args__ = (
+        Index("ux_watched_products_user_product", user_id, marketplace, product_id, unique=True),
+        Index("ix_watched_products_next_refresh_at", next_refresh_at),
+        Index("ix_watched_products_marketplace_product_id", marketplace, product_id),
+    )
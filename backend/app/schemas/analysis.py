@@ -51,6 +51,8 @@ class AnalysisRequestResponse(AnalysisRequestBase):
     results: Optional[AnalysisResultResponse] = None
     product_name: Optional[str] = None  
     reviews_count: Optional[int] = 0  
+    stage_timings: Optional[Dict[str, float]] = None
+    reused_from_id: Optional[int] = None
     class Config:
         from_attributes = True
         populate_by_name = True
@@ -58,4 +60,30 @@ class AnalysisRequestResponse(AnalysisRequestBase):
 
 
 class AnalysisRequestWithResults(AnalysisRequestResponse):
-    results: Optional[AnalysisResultResponse] = None 
\ No newline at end of file
+    results: Optional[AnalysisResultResponse] = None 
+
+
+class AnalysisBatchCreate(BaseModel):
+    items: List[AnalysisRequestCreate] = Field(..., min_length=1, description="Товары пакета: URL или ID и маркетплейс")
+
+
+class AnalysisBatchItem(BaseModel):
+    id: int
+    product_id: str
+    marketplace: str
+    url: str
+    status: str
+    progress_percentage: float = 0.0
+    error_message: Optional[str] = None
+    product_name: Optional[str] = None
+    reviews_count: int = 0
+
+
+class AnalysisBatchResponse(BaseModel):
+    id: int
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    total: int = 0
+    status_counts: Dict[str, int] = {}
+    items: List[AnalysisBatchItem] = []
@@ -0,0 +1,21 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class AspectTrendPoint(BaseModel):
+    period: date = Field(..., description="Начало периода")
+    polarity: str = Field(..., description="Тональность (positive, negative)")
+    name: Optional[str] = Field(None, description="Лемма аспекта или категория")
+    mentions: int = Field(0, description="Упоминания во всех снимках периода")
+    snapshots: int = Field(0, description="Снимков анализа товара за период")
+    reviews: int = Field(0, description="Проанализированных отзывов во всех снимках периода")
+    mentions_per_review: float = Field(0.0, description="Упоминаний на проанализированный отзыв")
+
+
+class AspectTrendResponse(BaseModel):
+    marketplace: str
+    product_id: str
+    period: str
+    aspect: Optional[str] = None
+    points: List[AspectTrendPoint] = []
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class WatchedProductCreate(BaseModel):
+    url: str = Field(..., description="URL товара или ID товара")
+    marketplace: str = Field(..., description="Маркетплейс (wb, ozon)")
+    max_reviews: int = Field(300, description="Сколько последних отзывов загружать при обновлении", ge=1, le=1000)
+
+
+class WatchedProductResponse(BaseModel):
+    id: int
+    product_id: str
+    marketplace: str
+    url: str
+    max_reviews: int
+    created_at: datetime
+    next_refresh_at: datetime
+    last_refreshed_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    analysis_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,358 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.core.metrics import stage_timer
+from app.core.profiling import torch_profiled
+from app.services.analysis_stream import iterate_in_thread
+from app.services.analyzer.accumulator import AnalysisAccumulator
+from app.services.rate_limiter import RateLimiter, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 4
+
+_END = object()
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+@dataclass
+class PipelineResult:
+    fetched_reviews: int = 0
+    accumulator: AnalysisAccumulator = field(default_factory=AnalysisAccumulator)
+    product_info: Optional[Dict[str, Any]] = None
+
+
+class AnalysisPipeline:
+    """Конвейер задачи анализа: загрузка страниц -> нормализация и дедупликация ->
+    батчи -> инференс -> агрегация. Стадии - отдельные задачи asyncio, связанные
+    ограниченными очередями: пока модель обрабатывает батч, парсер качает следующую
+    страницу, а переполненная очередь притормаживает загрузку. Время задачи стремится
+    к max(загрузка, инференс) вместо их суммы.
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        parser,
+        product_id: str,
+        max_reviews: int,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        queue_size: int = QUEUE_SIZE,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.analyzer = analyzer
+        self.parser = parser
+        self.product_id = product_id
+        self.max_reviews = max_reviews
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.rate_limiter = rate_limiter
+        self.batch_size = analyzer.config.batch_size
+        self.result = PipelineResult()
+
+        self._pages: asyncio.Queue = asyncio.Queue(queue_size)
+        self._texts: asyncio.Queue = asyncio.Queue(queue_size * self.batch_size)
+        self._batches: asyncio.Queue = asyncio.Queue(queue_size)
+        self._analyzed: asyncio.Queue = asyncio.Queue(queue_size)
+
+    async def run(self) -> PipelineResult:
+        loop = asyncio.get_running_loop()
+        # Свой поток под инференс: батчи одной задачи идут строго по очереди
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-infer")
+        # Информация о товаре загружается параллельно с отзывами
+        product_info = loop.run_in_executor(
+            None, _with_context(self.parser.get_product_info, _parser_product_id(self.product_id))
+        )
+        tasks = [
+            asyncio.ensure_future(self._fetch()),
+            asyncio.ensure_future(self._normalize()),
+            asyncio.ensure_future(self._batch()),
+            asyncio.ensure_future(self._infer()),
+            asyncio.ensure_future(self._aggregate()),
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        except BaseException:
+            product_info.cancel()
+            raise
+        finally:
+            # Отмена или ошибка одной стадии останавливает остальные; текущий батч
+            # инференса дорабатывает в фоне, не блокируя event loop
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._executor.shutdown(wait=False)
+
+        self.result.product_info = await product_info
+        return self.result
+
+    async def _fetch(self) -> None:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        pages = iterate_in_thread(
+            self.parser.iter_review_batches(self.product_id, self.max_reviews, self.batch_size)
+        )
+        try:
+            async for reviews in pages:
+                # Отмена проверяется на каждой странице: иначе загрузка идет до конца,
+                # пока агрегатор не получит очередной батч
+                if self.is_cancelled():
+                    raise PipelineCancelled()
+                self.result.fetched_reviews += len(reviews)
+                await self._pages.put(reviews)
+        except PipelineCancelled:
+            raise
+        except Exception as e:
+            # Как и parse_reviews: ошибка парсера обрывает загрузку, а не задачу целиком
+            logger.error(f"Ошибка при загрузке отзывов товара {self.product_id}: {e}")
+        finally:
+            # При отмене останавливает поток парсера и закрывает драйвер
+            await pages.aclose()
+            if self.rate_limiter is not None:
+                self.rate_limiter.release()
+        await self._pages.put(_END)
+
+    async def _normalize(self) -> None:
+        seen_ids = set()
+        while True:
+            reviews = await self._pages.get()
+            if reviews is _END:
+                break
+            for text in _review_texts(reviews, seen_ids):
+                await self._texts.put(text)
+        await self._texts.put(_END)
+
+    async def _batch(self) -> None:
+        batch: List[str] = []
+        while True:
+            text = await self._texts.get()
+            if text is _END:
+                break
+            batch.append(text)
+            if len(batch) >= self.batch_size:
+                await self._batches.put(batch)
+                batch = []
+        if batch:
+            await self._batches.put(batch)
+        await self._batches.put(_END)
+
+    async def _infer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._batches.get()
+            if batch is _END:
+                break
+            try:
+                with stage_timer("analyze_batch"):
+                    analyzed = await loop.run_in_executor(
+                        self._executor, _with_context(torch_profiled(self.analyzer.analyze_reviews), batch)
+                    )
+            except Exception as e:
+                logger.error(f"Ошибка анализа батча из {len(batch)} отзывов: {e}")
+                continue
+            await self._analyzed.put(analyzed)
+        await self._analyzed.put(_END)
+
+    async def _aggregate(self) -> None:
+        accumulator = self.result.accumulator
+        while True:
+            analyzed = await self._analyzed.get()
+            if analyzed is _END:
+                break
+            if self.is_cancelled():
+                raise PipelineCancelled()
+
+            accumulator.add(analyzed)
+            if self.on_progress is not None:
+                await self.on_progress(accumulator.reviews, max(self.max_reviews, self.result.fetched_reviews))
+
+
+@dataclass
+class BatchItem:
+    """Товар пакета; key - id анализа, под которым сохраняется результат"""
+    key: int
+    parser: Any
+    product_id: str
+    marketplace: str
+    max_reviews: int
+    result: PipelineResult = field(default_factory=PipelineResult)
+    cancelled: bool = False
+
+
+class BatchAnalysisPipeline:
+    """Пакетный анализ нескольких товаров. Загрузки идут параллельно под общим
+    лимитом маркетплейса, а тексты всех товаров копятся в общем буфере, из которого
+    единственный поток инференса берет до batch_size текстов за раз: модель получает
+    полные батчи даже от товаров с парой десятков отзывов и не простаивает между
+    товарами. Товар завершается (on_item_done), как только проанализированы все его
+    отзывы, не дожидаясь остальных.
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        items: List[BatchItem],
+        on_item_done: Callable[[BatchItem], Awaitable[None]],
+        on_progress: Optional[Callable[[BatchItem], Awaitable[None]]] = None,
+        is_cancelled: Optional[Callable[[BatchItem], bool]] = None,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.analyzer = analyzer
+        self.items = items
+        self.on_item_done = on_item_done
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled or (lambda item: False)
+        self.batch_size = analyzer.config.batch_size
+
+        # (товар, текст) или (товар, _END) после последнего текста товара
+        self._buffer: Deque[Tuple[BatchItem, Any]] = deque()
+        self._buffer_limit = queue_size * self.batch_size
+        self._changed = asyncio.Condition()
+        self._fetched_all = False
+
+    async def run(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-infer")
+        tasks = [
+            asyncio.ensure_future(self._fetch_all()),
+            asyncio.ensure_future(self._infer()),
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._executor.shutdown(wait=False)
+
+    async def _put(self, entries: List[Tuple[BatchItem, Any]]) -> None:
+        # Страница кладется целиком; переполненный буфер притормаживает загрузки
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self._buffer) < self._buffer_limit)
+            self._buffer.extend(entries)
+            self._changed.notify_all()
+
+    async def _fetch_all(self) -> None:
+        await asyncio.gather(*(self._fetch(item) for item in self.items))
+        async with self._changed:
+            self._fetched_all = True
+            self._changed.notify_all()
+
+    async def _fetch(self, item: BatchItem) -> None:
+        loop = asyncio.get_running_loop()
+        async with get_rate_limiter(item.marketplace):
+            product_info = loop.run_in_executor(
+                None, _with_context(item.parser.get_product_info, _parser_product_id(item.product_id))
+            )
+            pages = iterate_in_thread(
+                item.parser.iter_review_batches(item.product_id, item.max_reviews, self.batch_size)
+            )
+            seen_ids = set()
+            try:
+                async for reviews in pages:
+                    if self.is_cancelled(item):
+                        item.cancelled = True
+                        break
+                    item.result.fetched_reviews += len(reviews)
+                    entries = [(item, text) for text in _review_texts(reviews, seen_ids)]
+                    if entries:
+                        await self._put(entries)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке отзывов товара {item.product_id}: {e}")
+            finally:
+                await pages.aclose()
+
+            try:
+                item.result.product_info = await product_info
+            except Exception as e:
+                logger.warning(f"Не удалось получить информацию о товаре {item.product_id}: {e}")
+        await self._put([(item, _END)])
+
+    def _take_batch(self) -> Tuple[List[Tuple[BatchItem, str]], List[BatchItem]]:
+        entries: List[Tuple[BatchItem, str]] = []
+        finished: List[BatchItem] = []
+        while self._buffer and len(entries) < self.batch_size:
+            item, text = self._buffer.popleft()
+            if text is _END:
+                finished.append(item)
+            elif not item.cancelled:
+                entries.append((item, text))
+        while self._buffer and self._buffer[0][1] is _END:
+            finished.append(self._buffer.popleft()[0])
+        return entries, finished
+
+    async def _infer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Пока модель занята, буфер наполняется, и следующий батч набирается полным
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._buffer or self._fetched_all)
+                if not self._buffer:
+                    break
+                entries, finished = self._take_batch()
+                self._changed.notify_all()
+
+            analyzed = []
+            if entries:
+                try:
+                    with stage_timer("analyze_batch"):
+                        analyzed = await loop.run_in_executor(
+                            self._executor,
+                            _with_context(torch_profiled(self.analyzer.analyze_reviews), [text for _, text in entries])
+                        )
+                except Exception as e:
+                    logger.error(f"Ошибка анализа батча из {len(entries)} отзывов: {e}")
+
+            by_item: Dict[int, Tuple[BatchItem, List[Dict[str, Any]]]] = {}
+            for (item, _), result in zip(entries, analyzed):
+                by_item.setdefault(item.key, (item, []))[1].append(result)
+            for item, results in by_item.values():
+                item.result.accumulator.add(results)
+                if self.on_progress is not None:
+                    await self.on_progress(item)
+
+            # Все тексты этих товаров были в этом или предыдущих батчах
+            for item in finished:
+                if self.is_cancelled(item):
+                    item.cancelled = True
+                try:
+                    await self.on_item_done(item)
+                except Exception as e:
+                    logger.error(f"Ошибка при завершении анализа товара {item.product_id}: {e}")
+
+
+def _review_texts(reviews: List[Dict[str, Any]], seen_ids: set) -> Iterator[str]:
+    """Непустые тексты страницы без повторов: страницы парсера могут пересекаться"""
+    for review in reviews:
+        review_id = review.get("id")
+        if review_id is not None:
+            if review_id in seen_ids:
+                continue
+            seen_ids.add(review_id)
+        text = (review.get("text") or "").strip()
+        if text:
+            yield text
+
+
+def _parser_product_id(product_id: str):
+    # WildberriesParser.get_product_info принимает числовой root_id, у Ozon id может быть строкой
+    return int(product_id) if product_id.isdigit() else product_id
+
+
+def _with_context(func, *args):
+    # run_in_executor не переносит contextvars: без этого замеры стадий в потоке
+    # не попадут в stage_timings задачи
+    return functools.partial(contextvars.copy_context().run, func, *args)
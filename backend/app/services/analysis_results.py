@@ -0,0 +1,190 @@
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import stage_timer
+from app.crud.crud_analysis import analysis as crud_analysis
+from app.crud.crud_aspect_fact import aspect_facts as crud_aspect_facts
+from app.models.analysis import AnalysisStatus
+from app.services.analysis_pipeline import PipelineResult
+from app.services.analyzer import default_analyzer
+from app.services.analyzer.accumulator import AnalysisAccumulator
+from app.services.analyzer.text_preprocessor import get_text_preprocessor
+
+
+async def save_analysis_result(
+    db: AsyncSession,
+    analysis,
+    pipeline_result: PipelineResult,
+    before_save: Optional[Callable[[], Awaitable[None]]] = None,
+    snapshot: Optional[AnalysisAccumulator] = None
+):
+    """Сводка по накопленным счетчикам, сохранение результата и завершение анализа.
+    before_save дописывает свои изменения без commit: они фиксируются вместе с результатом.
+    snapshot - счетчики для трендов, если результат накопительный: только новые отзывы"""
+    
+    product_info = pipeline_result.product_info
+    accumulator = pipeline_result.accumulator
+    total_texts = accumulator.reviews
+    
+    with stage_timer("summary"):
+        sentiment_results = default_analyzer.summarize_aspects(accumulator.positive, accumulator.negative)
+    
+    await crud_analysis.update_progress(
+        db, 
+        db_obj=analysis, 
+        progress_percentage=95.0,
+        current_stage="finalizing",
+        processed_reviews=total_texts,
+        total_reviews=total_texts
+    )
+    await db.commit()
+    
+    categorized_positive = sentiment_results.get("categorized_positive", {})
+    categorized_negative = sentiment_results.get("categorized_negative", {})
+    
+    flat_positive_aspects = []
+    flat_negative_aspects = []
+    
+    for aspect_tuple in sentiment_results.get("positive_aspects", []):
+        if isinstance(aspect_tuple, tuple) and len(aspect_tuple) >= 2:
+            flat_positive_aspects.append({"text": aspect_tuple[0], "count": aspect_tuple[1]})
+        elif isinstance(aspect_tuple, dict):
+            flat_positive_aspects.append({"text": aspect_tuple.get("text", ""), "count": aspect_tuple.get("count", 1)})
+    
+    for aspect_tuple in sentiment_results.get("negative_aspects", []):
+        if isinstance(aspect_tuple, tuple) and len(aspect_tuple) >= 2:
+            flat_negative_aspects.append({"text": aspect_tuple[0], "count": aspect_tuple[1]})
+        elif isinstance(aspect_tuple, dict):
+            flat_negative_aspects.append({"text": aspect_tuple.get("text", ""), "count": aspect_tuple.get("count", 1)})
+    
+    structured_aspect_categories = {
+        "positive": _categories_structure(categorized_positive),
+        "negative": _categories_structure(categorized_negative)
+    }
+    
+    total_reviews = pipeline_result.fetched_reviews
+    
+    results_data = {
+        "positive_aspects": flat_positive_aspects,
+        "negative_aspects": flat_negative_aspects,
+        "aspect_categories": structured_aspect_categories,
+        "reviews_count": total_reviews,
+        # Отзывы без текста считаются нейтральными: проценты от всех полученных отзывов
+        "sentiment_summary": accumulator.sentiment_summary(total=total_reviews),
+        "product_info": product_info
+    }
+    
+    if before_save is not None:
+        await before_save()
+    snapshot_categories, snapshot_reviews = results_data["aspect_categories"], accumulator.reviews
+    if snapshot is not None:
+        # Иначе упоминания старых отзывов попадали бы в снимок каждого обновления
+        snapshot_results = default_analyzer.summarize_aspects(snapshot.positive, snapshot.negative)
+        snapshot_categories = {
+            "positive": _categories_structure(snapshot_results.get("categorized_positive", {})),
+            "negative": _categories_structure(snapshot_results.get("categorized_negative", {}))
+        }
+        snapshot_reviews = snapshot.reviews
+    # Снимок для трендов уходит в той же транзакции, что и результат
+    await crud_aspect_facts.add_snapshot(
+        db, aspect_snapshot_row(analysis, snapshot_reviews), aspect_fact_rows(analysis, snapshot_categories)
+    )
+    await crud_analysis.save_result(
+        db,
+        request_id=analysis.id,
+        positive_aspects=results_data["positive_aspects"],
+        negative_aspects=results_data["negative_aspects"],
+        aspect_categories=results_data["aspect_categories"],
+        reviews_count=results_data["reviews_count"],
+        sentiment_summary=results_data["sentiment_summary"],
+        product_info=results_data["product_info"],
+        accumulator=accumulator.to_dict()
+    )
+    
+    await crud_analysis.update_status(db, db_obj=analysis, status=AnalysisStatus.COMPLETED)
+    await crud_analysis.update_progress(
+        db, 
+        db_obj=analysis, 
+        progress_percentage=100.0,
+        current_stage="completed",
+        processed_reviews=total_texts,
+        total_reviews=total_texts
+    )
+    await db.commit()
+
+
+def _categories_structure(categorized_aspects: Dict[str, Any]) -> Dict[str, Any]:
+    categories = []
+    total_mentions = 0
+    
+    for category_name, aspects_list in categorized_aspects.items():
+        if not aspects_list:
+            continue
+        
+        category_aspects = []
+        category_mentions = 0
+        
+        for aspect_item in aspects_list:
+            if isinstance(aspect_item, tuple) and len(aspect_item) >= 2:
+                text, count = aspect_item[0], aspect_item[1]
+            elif isinstance(aspect_item, dict):
+                text, count = aspect_item.get("text", ""), aspect_item.get("count", 1)
+            else:
+                continue
+            
+            category_aspects.append({"text": text, "count": count})
+            category_mentions += count
+        
+        if category_aspects:
+            categories.append({
+                "name": category_name,
+                "aspects": category_aspects,
+                "total_mentions_in_category": category_mentions
+            })
+            total_mentions += category_mentions
+    
+    return {"categories": categories, "total_aspect_mentions": total_mentions}
+
+
+def aspect_snapshot_row(analysis, reviews: int) -> Dict[str, Any]:
+
+    return {
+        "analysis_id": analysis.id,
+        "marketplace": analysis.marketplace,
+        "product_id": analysis.product_id,
+        "bucket_date": datetime.utcnow().date(),
+        "reviews": reviews,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def aspect_fact_rows(analysis, aspect_categories: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Строки aspect_count_facts из структуры категорий результата: по строке на лемму
+    аспекта и тональность"""
+    counts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for polarity in ("positive", "negative"):
+        for category in aspect_categories.get(polarity, {}).get("categories", []):
+            for aspect in category["aspects"]:
+                lemma = get_text_preprocessor().lemmatize_text(aspect["text"].lower())
+                if not lemma:
+                    continue
+                row = counts.setdefault((lemma, polarity), {"category": category["name"], "count": 0})
+                row["count"] += aspect["count"]
+    
+    bucket_date = datetime.utcnow().date()
+    return [
+        {
+            "analysis_id": analysis.id,
+            "marketplace": analysis.marketplace,
+            "product_id": analysis.product_id,
+            "bucket_date": bucket_date,
+            "aspect": lemma,
+            "category": row["category"],
+            "polarity": polarity,
+            "count": row["count"],
+            "created_at": datetime.utcnow(),
+        }
+        for (lemma, polarity), row in counts.items()
+    ]
@@ -0,0 +1,157 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.services.analyzer.accumulator import AnalysisAccumulator
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_LENGTH = 10000
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(iterator: Iterator, maxsize: int = 2) -> AsyncIterator:
+    """Блокирующий итератор (парсер) в отдельном потоке: следующая страница
+    загружается, пока обрабатывается текущая. Очередь ограничена maxsize, поэтому
+    парсер не убегает вперед, а при отключении клиента останавливается"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stop.is_set():
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, name="review-fetcher", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def review_text(review: Dict[str, Any]) -> str:
+    """Текст отзыва вместе с достоинствами и недостатками"""
+    text_parts = []
+    if review.get("text"): text_parts.append(str(review["text"]))
+    if review.get("pros"): text_parts.append("Достоинства: " + str(review["pros"]))
+    if review.get("cons"): text_parts.append("Недостатки: " + str(review["cons"]))
+    return " ".join(text_parts).strip()[:MAX_TEXT_LENGTH]
+
+
+def review_rating(review: Dict[str, Any]) -> Optional[int]:
+
+    if review.get("productValuation") is not None:
+        return int(review["productValuation"])
+    if review.get("rating") is not None:
+        return int(review["rating"])
+    return None
+
+
+def prepare_reviews(reviews: List[Dict[str, Any]]) -> Tuple[List[str], List[int]]:
+
+    texts = []
+    ratings = []
+    for review in reviews:
+        text = review_text(review)
+        if len(text) > 5:
+            texts.append(text)
+            rating = review_rating(review)
+            if rating is not None:
+                ratings.append(rating)
+    return texts, ratings
+
+
+async def stream_analysis(
+    analyzer,
+    parser,
+    product_id: str,
+    marketplace: str,
+    max_reviews: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """События анализа: start, batch с накопленными итогами после каждой пачки, summary"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    batch_size = analyzer.config.batch_size
+    # Только счетчики, а не сами отзывы: память не растет с max_reviews
+    accumulator = AnalysisAccumulator()
+
+    yield {"event": "start", "product_id": product_id, "marketplace": marketplace, "max_reviews": max_reviews}
+
+    batch_number = 0
+    async for reviews in iterate_in_thread(parser.iter_review_batches(product_id, max_reviews, batch_size)):
+        texts, ratings = prepare_reviews(reviews)
+        analyzed_reviews = await loop.run_in_executor(None, analyzer.analyze_reviews, texts) if texts else []
+        accumulator.add(analyzed_reviews, ratings)
+        batch_number += 1
+        top_aspects = accumulator.top_aspects()
+        yield {
+            "event": "batch",
+            "batch": batch_number,
+            "reviews_in_batch": len(texts),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "processed_reviews": accumulator.reviews,
+            "sentiment_analysis": accumulator.sentiment_summary(),
+            "top_positive_aspects": top_aspects["positive"],
+            "top_negative_aspects": top_aspects["negative"],
+            "rating_stats": accumulator.rating_stats(),
+        }
+
+    summary = await loop.run_in_executor(None, analyzer.summarize_aspects, accumulator.positive, accumulator.negative)
+    try:
+        product_info = await loop.run_in_executor(None, parser.get_product_info, product_id)
+    except Exception as e:
+        logger.warning(f"Не удалось получить информацию о товаре {product_id}: {e}")
+        product_info = None
+    if not product_info:
+        product_info = {"name": f"Товар {marketplace} {product_id}", "id": product_id, "source": marketplace}
+
+    yield {
+        "event": "summary",
+        "product_id": product_id,
+        "product_info": product_info,
+        "reviews_count": accumulator.reviews,
+        "batches": batch_number,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "sentiment_analysis": accumulator.sentiment_summary(),
+        "positive_aspects": [{"text": text, "count": count} for text, count in summary["positive_aspects"]],
+        "negative_aspects": [{"text": text, "count": count} for text, count in summary["negative_aspects"]],
+        "categorized_positive": summary["categorized_positive"],
+        "categorized_negative": summary["categorized_negative"],
+        "rating_stats": accumulator.rating_stats(),
+        "marketplace": marketplace,
+    }
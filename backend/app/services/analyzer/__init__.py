@@ -1,13 +1,21 @@
-from .review_analyzer import ReviewAnalyzer
+import importlib
+from .accumulator import AnalysisAccumulator
 from .config import AnalyzerConfig
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-_review_analyzer: Optional[ReviewAnalyzer] = None
+if TYPE_CHECKING:
+    from .review_analyzer import ReviewAnalyzer
 
-def get_review_analyzer() -> ReviewAnalyzer:
+# torch, transformers и pymorphy2 загружаются только при первом обращении к анализатору
+_review_analyzer: Optional["ReviewAnalyzer"] = None
+
+def _load_review_analyzer_class():
+    return importlib.import_module(".review_analyzer", __name__).ReviewAnalyzer
+
+def get_review_analyzer() -> "ReviewAnalyzer":
     global _review_analyzer
     if _review_analyzer is None:
-        _review_analyzer = ReviewAnalyzer()
+        _review_analyzer = _load_review_analyzer_class()()
     return _review_analyzer
 
 class LazyAnalyzer:
@@ -15,6 +23,12 @@ class LazyAnalyzer:
         analyzer = get_review_analyzer()
         return getattr(analyzer, name)
 
-review_analyzer = LazyAnalyzer()
+# Имя отличается от подмодуля review_analyzer: его импорт перезаписывает атрибут пакета
+default_analyzer = LazyAnalyzer()
+
+def __getattr__(name):
+    if name == "ReviewAnalyzer":
+        return _load_review_analyzer_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ["ReviewAnalyzer", "AnalyzerConfig", "review_analyzer", "get_review_analyzer"] 
\ No newline at end of file
+__all__ = ["ReviewAnalyzer", "AnalyzerConfig", "AnalysisAccumulator", "default_analyzer", "get_review_analyzer"]
@@ -0,0 +1,85 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+TOP_ASPECTS = 10
+
+
+@dataclass
+class AnalysisAccumulator:
+    """Накопительные итоги анализа: обновляются по батчам, складываются между воркерами
+    и сохраняются в БД, поэтому сводку не нужно пересчитывать по полному списку отзывов"""
+    reviews: int = 0
+    sentiments: Counter = field(default_factory=Counter)
+    ratings: Counter = field(default_factory=Counter)
+    positive: Counter = field(default_factory=Counter)
+    negative: Counter = field(default_factory=Counter)
+
+    def add(self, analyzed_reviews: Iterable[Dict[str, Any]], ratings: Iterable[int] = ()) -> "AnalysisAccumulator":
+        for result in analyzed_reviews:
+            self.sentiments[result.get("sentiment", "neutral")] += 1
+            self.positive.update(result.get("positive_aspects", []))
+            self.negative.update(result.get("negative_aspects", []))
+            self.reviews += 1
+        self.ratings.update(ratings)
+        return self
+
+    def merge(self, other: "AnalysisAccumulator") -> "AnalysisAccumulator":
+        self.reviews += other.reviews
+        self.sentiments.update(other.sentiments)
+        self.ratings.update(other.ratings)
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        return self
+
+    def sentiment_summary(self, total: Optional[int] = None) -> Dict[str, Any]:
+        """total - знаменатель процентов, если отзывов было больше, чем проанализировано"""
+        total = self.reviews if total is None else total
+        positive = self.sentiments.get("positive", 0)
+        negative = self.sentiments.get("negative", 0)
+        neutral = total - positive - negative
+        return {
+            "total": total,
+            "positive": positive,
+            "negative": negative,
+            "neutral": neutral,
+            "positive_percent": round((positive / max(1, total)) * 100, 1),
+            "negative_percent": round((negative / max(1, total)) * 100, 1),
+            "neutral_percent": round((neutral / max(1, total)) * 100, 1),
+        }
+
+    def rating_stats(self) -> Dict[str, Any]:
+        count = sum(self.ratings.values())
+        total = sum(rating * times for rating, times in self.ratings.items())
+        return {
+            "average": round(total / count, 1) if count else 0,
+            "count": count,
+            "distribution": {str(i): self.ratings.get(i, 0) for i in range(1, 6)}
+        }
+
+    def top_aspects(self, limit: int = TOP_ASPECTS) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "positive": [{"text": text, "count": count} for text, count in self.positive.most_common(limit)],
+            "negative": [{"text": text, "count": count} for text, count in self.negative.most_common(limit)],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reviews": self.reviews,
+            "sentiments": dict(self.sentiments),
+            "ratings": {str(rating): count for rating, count in self.ratings.items()},
+            "positive": dict(self.positive),
+            "negative": dict(self.negative),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "AnalysisAccumulator":
+        if not data:
+            return cls()
+        return cls(
+            reviews=data.get("reviews", 0),
+            sentiments=Counter(data.get("sentiments", {})),
+            ratings=Counter({int(rating): count for rating, count in data.get("ratings", {}).items()}),
+            positive=Counter(data.get("positive", {})),
+            negative=Counter(data.get("negative", {})),
+        )
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 from .text_preprocessor import TextPreprocessor
+from .keyword_matcher import KeywordMatcher
 
 class AspectCategorizer:
     
@@ -50,6 +51,15 @@ class AspectCategorizer:
                 'пвз', 'постамат', 'магазин', 'пришел', 'пришл', 'задержк', 'быстро'
             ]
         }
+        
+        # Аспект относится к первой по порядку категории, чье слово в нем нашлось
+        self._category_names = list(self._categories)
+        self._keyword_categories = []
+        keywords = []
+        for category_index, category_keywords in enumerate(self._categories.values()):
+            keywords.extend(category_keywords)
+            self._keyword_categories.extend([category_index] * len(category_keywords))
+        self._matcher = KeywordMatcher(keywords)
     
     def categorize_aspects(self, aspects: List[Tuple[str, int]]) -> Dict[str, List[Tuple[str, int]]]:
         result = {category: [] for category in self._categories}
@@ -57,15 +67,13 @@ class AspectCategorizer:
         
         for aspect, count in aspects:
             lemma = self.preprocessor.lemmatize_text(aspect.lower())
-            categorized = False
-            
-            for category, keywords in self._categories.items():
-                if any(keyword in lemma for keyword in keywords):
-                    result[category].append((aspect, count))
-                    categorized = True
-                    break
+            category_indices = [
+                self._keyword_categories[index] for _, index in self._matcher.iter_matches(lemma)
+            ]
             
-            if not categorized:
+            if category_indices:
+                result[self._category_names[min(category_indices)]].append((aspect, count))
+            else:
                 result['другое'].append((aspect, count))
         
         return {k: v for k, v in result.items() if v} 
\ No newline at end of file
@@ -1,5 +1,6 @@
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from .text_preprocessor import TextPreprocessor
+from .keyword_matcher import KeywordMatcher
 
 class AspectClassifier:
     
@@ -28,6 +29,10 @@ class AspectClassifier:
             'просто', 'интуитивн', 'рекоменд', 'советую', 'покупайте',
             'без косяков', 'без дефектов' 
         ]
+        
+        # Один автомат на оба списка: индексы меньше _positive_count - позитивные маркеры
+        self._positive_count = len(self._positive_indicators)
+        self._matcher = KeywordMatcher(self._positive_indicators + self._negative_indicators)
     
     def classify_sentiment(self, aspect: str) -> Optional[str]:
         """Определяет тональность аспекта"""
@@ -35,19 +40,19 @@ class AspectClassifier:
         
         is_negated = self._check_negation(lemmatized)
         
-        has_positive = any(pos in lemmatized for pos in self._positive_indicators)
-        has_negative = any(neg in lemmatized for neg in self._negative_indicators)
+        found = self._matcher.last_starts(lemmatized)
+        pos_count, neg_count = self._count_indicators(found)
+        has_positive = pos_count > 0
+        has_negative = neg_count > 0
         
         if is_negated:
-            return self._handle_negated_sentiment(lemmatized, has_positive, has_negative)
+            return self._handle_negated_sentiment(lemmatized, found)
         
         if has_negative and not has_positive:
             return 'negative'
         elif has_positive and not has_negative:
             return 'positive'
         elif has_negative and has_positive:
-            neg_count = sum(1 for neg in self._negative_indicators if neg in lemmatized)
-            pos_count = sum(1 for pos in self._positive_indicators if pos in lemmatized)
             return 'negative' if neg_count >= pos_count else 'positive'
         
         return None
@@ -76,11 +81,20 @@ class AspectClassifier:
     def _check_negation(self, lemmatized: str) -> bool:
         return lemmatized.startswith('не ') or lemmatized.startswith('без ')
     
-    def _handle_negated_sentiment(self, lemmatized: str, has_positive: bool, has_negative: bool) -> Optional[str]:
+    def _count_indicators(self, found: Dict[int, int], min_start: int = 0) -> Tuple[int, int]:
+        pos_count = neg_count = 0
+        for index, start in found.items():
+            if start < min_start:
+                continue
+            if index < self._positive_count:
+                pos_count += 1
+            else:
+                neg_count += 1
+        return pos_count, neg_count
+    
+    def _handle_negated_sentiment(self, lemmatized: str, found: Dict[int, int]) -> Optional[str]:
         if lemmatized.startswith('не '):
-            text_after_negation = lemmatized[3:]
-            pos_in_remainder = any(pos in text_after_negation for pos in self._positive_indicators)
-            neg_in_remainder = any(neg in text_after_negation for neg in self._negative_indicators)
+            pos_in_remainder, neg_in_remainder = self._count_indicators(found, min_start=3)
             
             if neg_in_remainder and not pos_in_remainder:  # "не плохой"
                 return 'positive'
@@ -88,8 +102,8 @@ class AspectClassifier:
                 return 'negative'
         
         elif lemmatized.startswith('без '):
-            text_after_negation = lemmatized[4:]
-            if any(neg in text_after_negation for neg in self._negative_indicators):  # "без дефектов"
+            _, neg_in_remainder = self._count_indicators(found, min_start=4)
+            if neg_in_remainder:  # "без дефектов"
                 return 'positive'
         
-        return None 
\ No newline at end of file
+        return None
@@ -1,10 +1,25 @@
+import numpy as np
 import torch
 import string
-from typing import List, Tuple, Optional
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from app.core.metrics import stage_timer
 from .model_loader import ModelLoader
 from .text_preprocessor import TextPreprocessor
 from .config import AnalyzerConfig
 
+# Вид BIO-метки токена; токены с прочими метками отбрасываются, не прерывая аспект
+_OUTSIDE, _BEGIN, _INSIDE, _UNKNOWN = 0, 1, 2, -1
+
+
+@dataclass
+class EncodedTexts:
+    """Результат одного пакетного вызова токенизатора: по массиву на текст"""
+    texts: List[str]
+    input_ids: List[np.ndarray]
+    offsets: List[np.ndarray]
+
 class AspectExtractor:
     
     def __init__(self, model_loader: ModelLoader, preprocessor: TextPreprocessor, config: AnalyzerConfig):
@@ -12,124 +27,178 @@ class AspectExtractor:
         self.preprocessor = preprocessor
         self.config = config
         self.model, self.tokenizer, self.device, self.id2label = model_loader.load_model()
+        self._label_kinds, self._label_positive = self._build_label_tables(self.id2label)
+        # Быстрый токенизатор меняет настройки усечения при вызове и не терпит
+        # одновременных вызовов из воркеров
+        self._tokenizer_lock = threading.Lock()
     
     def extract_aspects(self, text: str) -> Tuple[List[str], List[str]]:
-        if not text.strip():
-            return [], []
-        
-        if len(text) > self.config.max_len * 2:
-            return self._extract_with_sliding_window(text)
-        
-        if len(text) > self.config.max_text_length:
-            text = text[:self.config.max_text_length]
+        return self.extract_aspects_batch([text])[0]
+    
+    def extract_aspects_batch(self, texts: List[str]) -> List[Tuple[List[str], List[str]]]:
+        results = [([], []) for _ in texts]
+        
+        window_texts, owners = self.expand_windows(texts)
+        if not window_texts:
+            return results
+        
+        with stage_timer("tokenize"):
+            encoded = self.encode(window_texts)
+        for batch in self.batch_order(encoded):
+            batch_texts = [window_texts[i] for i in batch]
+            with stage_timer("inference"):
+                predictions = self._get_model_predictions(
+                    [encoded.input_ids[i] for i in batch],
+                    [encoded.offsets[i] for i in batch]
+                )
+            with stage_timer("bio_decode"):
+                batch_aspects = self._process_bio_predictions(batch_texts, *predictions)
+            
+            for i, (pos_aspects, neg_aspects) in zip(batch, batch_aspects):
+                results[owners[i]][0].extend(pos_aspects)
+                results[owners[i]][1].extend(neg_aspects)
+        
+        return [
+            (sorted(set(positive_aspects)), sorted(set(negative_aspects)))
+            for positive_aspects, negative_aspects in results
+        ]
+    
+    def expand_windows(self, texts: List[str]) -> Tuple[List[str], List[int]]:
+        """Длинные тексты разворачиваются в окна; возвращает окна и номер исходного текста каждого"""
+        window_texts = []
+        owners = []
+        for index, text in enumerate(texts):
+            if not text.strip():
+                continue
+            
+            if len(text) > self.config.max_len * 2:
+                windows = self._sliding_windows(text)
+            else:
+                windows = [text[:self.config.max_text_length]]
+            
+            window_texts.extend(windows)
+            owners.extend([index] * len(windows))
         
-        predictions, confidences, offsets = self._get_model_predictions(text)
-        return self._process_bio_predictions(text, predictions, confidences, offsets)
+        return window_texts, owners
+    
+    def batch_order(self, encoded: EncodedTexts) -> List[np.ndarray]:
+        # Близкие по длине тексты в одном батче - меньше паддинга
+        order = np.argsort([len(ids) for ids in encoded.input_ids], kind='stable')
+        return [
+            order[batch_start:batch_start + self.config.batch_size]
+            for batch_start in range(0, len(order), self.config.batch_size)
+        ]
+    
+    def encode(self, texts: List[str]) -> EncodedTexts:
+        """Токенизирует весь корпус одним вызовом быстрого токенизатора"""
+        with self._tokenizer_lock:
+            encodings = self.tokenizer(
+                texts,
+                max_length=self.config.max_len,
+                truncation=True,
+                return_offsets_mapping=True,
+                return_attention_mask=False
+            )
+        
+        input_ids = [np.asarray(ids, dtype=np.int64) for ids in encodings['input_ids']]
+        offsets = [
+            np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+            for offsets in encodings['offset_mapping']
+        ]
+        
+        return EncodedTexts(texts=texts, input_ids=input_ids, offsets=offsets)
     
-    def _get_model_predictions(self, text: str) -> Tuple[List[str], List[float], List[tuple]]:
-        inputs = self.tokenizer(
-            text,
-            max_length=self.config.max_len,
-            padding='max_length',
-            truncation=True,
-            return_tensors='pt',
-            return_offsets_mapping=True
-        )
-        
-        offset_mapping = inputs.pop('offset_mapping').numpy()[0]
-        input_ids = inputs['input_ids'].to(self.device)
-        attention_mask = inputs['attention_mask'].to(self.device)
+    @staticmethod
+    def _build_label_tables(id2label: Dict[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+        size = max(id2label) + 1
+        kinds = np.full(size, _UNKNOWN, dtype=np.int8)
+        positive = np.zeros(size, dtype=bool)
+        
+        for label_id, label in id2label.items():
+            if label.startswith('B-'):
+                kinds[label_id] = _BEGIN
+                positive[label_id] = label == 'B-positive'
+            elif label.startswith('I-'):
+                kinds[label_id] = _INSIDE
+                positive[label_id] = label == 'I-positive'
+            elif label == 'O':
+                kinds[label_id] = _OUTSIDE
+        
+        return kinds, positive
+    
+    def _get_model_predictions(self, input_ids: List[np.ndarray],
+                               offsets: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Значимые токены всего батча подряд: номер текста, вид метки, позитивность, уверенность, смещения"""
+        batch_size = len(input_ids)
+        seq_len = max(len(ids) for ids in input_ids)
+        
+        ids_matrix = np.full((batch_size, seq_len), self.tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((batch_size, seq_len), dtype=np.int64)
+        offset_mapping = np.zeros((batch_size, seq_len, 2), dtype=np.int64)
+        for row, (ids, text_offsets) in enumerate(zip(input_ids, offsets)):
+            ids_matrix[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+            offset_mapping[row, :len(ids)] = text_offsets
         
         with torch.no_grad():
-            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            outputs = self.model(
+                input_ids=torch.from_numpy(ids_matrix).to(self.device),
+                attention_mask=torch.from_numpy(attention_mask).to(self.device)
+            )
             logits = outputs.logits
             probabilities = torch.softmax(logits, dim=2)
             confidence, predictions = torch.max(probabilities, dim=2)
         
-        predicted_labels = [self.id2label[label_id.item()] for label_id in predictions[0]]
-        confidences = confidence[0].cpu().numpy()
-        
-        filtered_predictions = []
-        filtered_confidences = []
-        filtered_offsets = []
+        # Одна пересылка с устройства на весь батч вместо .item() на каждый токен
+        predictions = predictions.cpu().numpy()
+        confidences = confidence.cpu().numpy()
+        kinds = self._label_kinds[predictions]
         
-        for i, (pred, conf, offset) in enumerate(zip(predicted_labels, confidences, offset_mapping)):
-            if offset[0] == 0 and offset[1] == 0:  
-                continue
-            if attention_mask[0][i].item() == 0:  
-                continue
-            
-            filtered_predictions.append(pred)
-            filtered_confidences.append(conf)
-            filtered_offsets.append(offset)
+        keep = attention_mask.astype(bool)
+        keep &= offset_mapping.any(axis=2)
+        keep &= kinds != _UNKNOWN
         
-        return filtered_predictions, filtered_confidences, filtered_offsets
+        rows = np.nonzero(keep)[0]
+        return rows, kinds[keep], self._label_positive[predictions][keep], confidences[keep], offset_mapping[keep]
     
-    def _process_bio_predictions(self, text: str, predictions: List[str], 
-                                confidences: List[float], offsets: List[tuple]) -> Tuple[List[str], List[str]]:
-        positive_aspects = []
-        negative_aspects = []
-        
-        current_tokens = []
-        current_offsets = []
-        current_confidences = []
-        current_type = None
-        
-        for pred, conf, offset in zip(predictions, confidences, offsets):
-            if pred.startswith('B-'):
-                self._finalize_aspect(text, current_offsets, current_confidences, 
-                                    current_type, positive_aspects, negative_aspects)
-                
-                current_tokens = [pred]
-                current_offsets = [offset]
-                current_confidences = [conf]
-                current_type = 'positive' if pred == 'B-positive' else 'negative'
+    def _process_bio_predictions(self, texts: List[str], rows: np.ndarray, kinds: np.ndarray,
+                                positive: np.ndarray, confidences: np.ndarray,
+                                offsets: np.ndarray) -> List[Tuple[List[str], List[str]]]:
+        results = [([], []) for _ in texts]
+        token_count = len(kinds)
+        
+        if token_count:
+            # I- продолжает аспект, если предыдущий токен того же текста - B- или I- той же
+            # тональности. Аспект - цепочка таких продолжений, начатая с B-; цепочки,
+            # начатые с I-, отбрасываются, как и при прежнем обходе по токенам
+            continues = np.zeros(token_count, dtype=bool)
+            continues[1:] = (
+                (kinds[1:] == _INSIDE)
+                & (kinds[:-1] != _OUTSIDE)
+                & (positive[1:] == positive[:-1])
+                & (rows[1:] == rows[:-1])
+            )
             
-            elif pred.startswith('I-') and current_tokens:
-                expected_type = 'positive' if pred == 'I-positive' else 'negative'
-                if current_type == expected_type:
-                    current_tokens.append(pred)
-                    current_offsets.append(offset)
-                    current_confidences.append(conf)
-                else:
-                    self._finalize_aspect(text, current_offsets, current_confidences, 
-                                        current_type, positive_aspects, negative_aspects)
-                    current_tokens = []
-                    current_offsets = []
-                    current_confidences = []
-                    current_type = None
+            starts = np.flatnonzero(~continues)
+            lengths = np.diff(np.append(starts, token_count))
+            ends = starts + lengths - 1
+            mean_confidences = np.add.reduceat(confidences, starts) / lengths
             
-            elif pred == 'O':
-                self._finalize_aspect(text, current_offsets, current_confidences, 
-                                    current_type, positive_aspects, negative_aspects)
-                current_tokens = []
-                current_offsets = []
-                current_confidences = []
-                current_type = None
-        
-        self._finalize_aspect(text, current_offsets, current_confidences, 
-                            current_type, positive_aspects, negative_aspects)
-        
-        return sorted(list(set(positive_aspects))), sorted(list(set(negative_aspects)))
-    
-    def _finalize_aspect(self, text: str, offsets: List[tuple], confidences: List[float], 
-                        aspect_type: Optional[str], positive_aspects: List[str], 
-                        negative_aspects: List[str]) -> None:
-        if not offsets or not confidences or not aspect_type:
-            return
-        
-        start_idx = offsets[0][0]
-        end_idx = offsets[-1][1]
-        raw_text = text[start_idx:end_idx]
-        cleaned_text = self.preprocessor.clean_aspect(raw_text)
-        
-        if self._is_valid_aspect(cleaned_text, confidences):
-            if aspect_type == 'positive':
-                positive_aspects.append(cleaned_text)
-            elif aspect_type == 'negative':
-                negative_aspects.append(cleaned_text)
+            is_aspect = kinds[starts] == _BEGIN
+            for start, end, avg_confidence in zip(starts[is_aspect], ends[is_aspect], mean_confidences[is_aspect]):
+                row = rows[start]
+                raw_text = texts[row][offsets[start, 0]:offsets[end, 1]]
+                cleaned_text = self.preprocessor.clean_aspect(raw_text)
+                
+                if self._is_valid_aspect(cleaned_text, avg_confidence):
+                    results[row][0 if positive[start] else 1].append(cleaned_text)
+        
+        return [
+            (sorted(set(positive_aspects)), sorted(set(negative_aspects)))
+            for positive_aspects, negative_aspects in results
+        ]
     
-    def _is_valid_aspect(self, aspect: str, confidences: List[float]) -> bool:
+    def _is_valid_aspect(self, aspect: str, avg_confidence: float) -> bool:
         if len(aspect) < self.config.min_aspect_length:
             return False
         
@@ -139,7 +208,6 @@ class AspectExtractor:
         if aspect.strip() in string.punctuation:
             return False
         
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
         if avg_confidence < self.config.confidence_threshold:
             return False
         
@@ -150,19 +218,13 @@ class AspectExtractor:
         
         return True
     
-    def _extract_with_sliding_window(self, text: str) -> Tuple[List[str], List[str]]:
-        all_positive = []
-        all_negative = []
-        
+    def _sliding_windows(self, text: str) -> List[str]:
         step_size = self.config.max_len // 2
+        windows = []
         
         for start in range(0, len(text), step_size):
             window_text = text[start:start + self.config.max_len]
-            if len(window_text.strip()) < 10:
-                continue
-            
-            pos_aspects, neg_aspects = self.extract_aspects(window_text)
-            all_positive.extend(pos_aspects)
-            all_negative.extend(neg_aspects)
+            if len(window_text.strip()) >= 10:
+                windows.append(window_text)
         
-        return sorted(list(set(all_positive))), sorted(list(set(all_negative))) 
\ No newline at end of file
+        return windows
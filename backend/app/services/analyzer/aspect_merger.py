@@ -1,4 +1,5 @@
-from typing import List, Tuple, Set
+from bisect import bisect_right
+from typing import Dict, List, Tuple, Set
 from .text_preprocessor import TextPreprocessor
 from .config import AnalyzerConfig
 
@@ -17,6 +18,14 @@ class AspectMerger:
             for aspect, count in aspects
         ]
         
+        token_sets = [set(lemma.split()) for lemma, _, _ in lemma_aspects]
+        # Схожесть ненулевая только у аспектов с общим словом, поэтому сравниваются
+        # лишь такие пары. При нулевом пороге сливается все подряд - тогда полный перебор
+        if self.config.similarity_threshold > 0:
+            postings = self._build_postings(token_sets)
+        else:
+            postings = None
+        
         merged_aspects_dict = {}
         used_indices: Set[int] = set()
         
@@ -28,12 +37,18 @@ class AspectMerger:
             merged_count = count_i
             used_indices.add(i)
             
-            for j, (lemma_j, aspect_j, count_j) in enumerate(lemma_aspects):
-                if j <= i or j in used_indices:
+            if postings is None:
+                candidates = range(i + 1, len(lemma_aspects))
+            else:
+                candidates = self._candidate_indices(i, token_sets[i], postings)
+            
+            for j in candidates:
+                if j in used_indices:
                     continue
                 
-                similarity_score = self._calculate_similarity(lemma_i, lemma_j)
+                similarity_score = self._calculate_similarity(token_sets[i], token_sets[j])
                 if similarity_score >= self.config.similarity_threshold:
+                    aspect_j, count_j = lemma_aspects[j][1], lemma_aspects[j][2]
                     if len(aspect_j) > len(merged_aspect_base) * 1.2:
                         merged_aspect_base = aspect_j
                     merged_count += count_j
@@ -44,10 +59,25 @@ class AspectMerger:
         result = sorted(merged_aspects_dict.items(), key=lambda x: x[1], reverse=True)
         return result
     
-    def _calculate_similarity(self, lemma1: str, lemma2: str) -> float:
-        words1 = set(lemma1.split())
-        words2 = set(lemma2.split())
-        
+    @staticmethod
+    def _build_postings(token_sets: List[Set[str]]) -> Dict[str, List[int]]:
+        postings: Dict[str, List[int]] = {}
+        for index, tokens in enumerate(token_sets):
+            for token in tokens:
+                postings.setdefault(token, []).append(index)
+        return postings
+    
+    @staticmethod
+    def _candidate_indices(i: int, tokens: Set[str], postings: Dict[str, List[int]]) -> List[int]:
+        candidates: Set[int] = set()
+        for token in tokens:
+            indices = postings[token]
+            # Списки возрастают: берем только аспекты после i, как в исходном переборе
+            candidates.update(indices[bisect_right(indices, i):])
+        return sorted(candidates)
+    
+    @staticmethod
+    def _calculate_similarity(words1: Set[str], words2: Set[str]) -> float:
         if not words1 or not words2:
             return 0.0
         
@@ -19,8 +19,9 @@ class AspectCache:
     def set(self, text: str, result: Tuple[List[str], List[str]]) -> None:
         if len(self._cache) >= self.max_size:
             keys_to_remove = list(self._cache.keys())[:len(self._cache) // 2]
+            # pop: анализ может идти одновременно из потоков потокового эндпоинта
             for key in keys_to_remove:
-                del self._cache[key]
+                self._cache.pop(key, None)
         
         key = self._hash_text(text)
         self._cache[key] = result
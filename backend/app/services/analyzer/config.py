@@ -1,22 +1,54 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 import os
 
+from .cpu import available_cpus, parse_cpu_list
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
 @dataclass
 class AnalyzerConfig:
     """Конфигурация для анализатора отзывов"""
     model_path: Optional[str] = None
     max_len: int = 192
     confidence_threshold: float = 0.75
-    max_workers: int = 4
+    # Параллелизм инференса: не заданные явно значения берутся из переменных
+    # окружения ANALYZER_WORKERS, TORCH_INTRA_OP_THREADS, TORCH_INTER_OP_THREADS,
+    # ANALYZER_CPU_AFFINITY, а иначе выводятся из квоты CPU контейнера так, чтобы
+    # max_workers * intra_op_threads не превышало число доступных ядер
+    max_workers: Optional[int] = None
+    intra_op_threads: Optional[int] = None
+    inter_op_threads: Optional[int] = None
+    cpu_affinity: Optional[List[int]] = None
+    batch_size: int = 32
     cache_size: int = 1000
     max_text_length: int = 10000
     min_aspect_length: int = 2
     similarity_threshold: float = 0.8
-    
+    lemma_cache_size: int = 50000
+    aspect_lemma_cache_size: int = 20000
+
     def __post_init__(self):
         if self.model_path is None:
             self.model_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), 
+                os.path.dirname(os.path.abspath(__file__)),
                 'saved_model'
-            ) 
\ No newline at end of file
+            )
+
+        if self.cpu_affinity is None and os.getenv("ANALYZER_CPU_AFFINITY"):
+            self.cpu_affinity = parse_cpu_list(os.getenv("ANALYZER_CPU_AFFINITY"))
+
+        cpus = available_cpus()
+        if self.cpu_affinity:
+            cpus = min(cpus, len(self.cpu_affinity))
+
+        if self.max_workers is None:
+            self.max_workers = _env_int("ANALYZER_WORKERS") or 1
+        if self.intra_op_threads is None:
+            self.intra_op_threads = _env_int("TORCH_INTRA_OP_THREADS") or max(1, cpus // self.max_workers)
+        if self.inter_op_threads is None:
+            self.inter_op_threads = _env_int("TORCH_INTER_OP_THREADS") or 1
@@ -0,0 +1,64 @@
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+class KeywordMatcher:
+    """Автомат Ахо-Корасик: все вхождения набора ключевых слов за один проход по тексту"""
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self._lengths = [len(keyword) for keyword in self.keywords]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        self._build_fail_links()
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Слова, оканчивающиеся в суффиксном состоянии, тоже найдены здесь
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Пары (позиция начала, индекс ключевого слова) для всех вхождений"""
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield position - lengths[index] + 1, index
+
+    def last_starts(self, text: str) -> Dict[int, int]:
+        """Индекс ключевого слова -> позиция его последнего вхождения.
+
+        `keyword in text[k:]` равносильно `last_starts(text).get(i, -1) >= k`.
+        """
+        found = {}
+        for start, index in self.iter_matches(text):
+            found[index] = start
+        return found
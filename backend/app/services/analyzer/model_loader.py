@@ -1,4 +1,5 @@
 import logging
+import os
 import torch
 from typing import Tuple, Dict
 from transformers import XLMRobertaTokenizerFast, XLMRobertaForTokenClassification
@@ -20,6 +21,7 @@ class ModelLoader:
             return self.model, self.tokenizer, self.device, self.id2label
         
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self._configure_threads()
         
         try:
             self.tokenizer = XLMRobertaTokenizerFast.from_pretrained(self.config.model_path)
@@ -36,6 +38,22 @@ class ModelLoader:
             logger.error(f"Ошибка при загрузке модели: {e}")
             raise RuntimeError(f"Не удалось загрузить модель из {self.config.model_path}") from e
     
+    def _configure_threads(self) -> None:
+        if self.config.cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, self.config.cpu_affinity)
+        
+        torch.set_num_threads(self.config.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.config.inter_op_threads)
+        except RuntimeError:
+            # Меняется только до первой параллельной операции torch в процессе
+            logger.warning("Число inter-op потоков torch уже зафиксировано, настройка пропущена")
+        
+        logger.info(
+            f"Инференс: {self.config.max_workers} воркеров, "
+            f"intra-op {torch.get_num_threads()}, inter-op {torch.get_num_interop_threads()}"
+        )
+    
     def _adapt_labels(self, original_labels: Dict[int, str]) -> Dict[int, str]:
         adapted_labels = {}
         
@@ -1,11 +1,15 @@
+import contextvars
 import logging
+import math
 from collections import Counter
 from typing import List, Dict, Any, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
+from app.core.metrics import stage_timer
+from .accumulator import AnalysisAccumulator
 from .config import AnalyzerConfig
 from .model_loader import ModelLoader
-from .text_preprocessor import TextPreprocessor
+from .text_preprocessor import TextPreprocessor, get_text_preprocessor
 from .aspect_extractor import AspectExtractor
 from .aspect_classifier import AspectClassifier
 from .aspect_categorizer import AspectCategorizer
@@ -21,7 +25,10 @@ class ReviewAnalyzer:
             confidence_threshold=confidence_threshold
         )
         
-        self.preprocessor = TextPreprocessor()
+        self.preprocessor = TextPreprocessor(
+            word_cache_size=self.config.lemma_cache_size,
+            aspect_cache_size=self.config.aspect_lemma_cache_size
+        )
         self.model_loader = ModelLoader(self.config)
         self.extractor = AspectExtractor(self.model_loader, self.preprocessor, self.config)
         self.classifier = AspectClassifier(self.preprocessor)
@@ -67,43 +74,86 @@ class ReviewAnalyzer:
                 "clean_text": clean_text
             }
     
+    def analyze_reviews(self, review_texts: List[str]) -> List[Dict[str, Any]]:
+        """Пакетный analyze_review: все некэшированные тексты идут в модель одним батчем"""
+        clean_texts = []
+        # Кэш может вытеснить записи посреди большого батча, поэтому результаты собираются здесь
+        aspects_by_text: Dict[str, Tuple[List[str], List[str]]] = {}
+        pending: List[str] = []
+        
+        with stage_timer("preprocess"):
+            for review_text in review_texts:
+                if not review_text or not isinstance(review_text, str) or len(review_text.strip()) < 5:
+                    clean_text = ""
+                else:
+                    clean_text = self.preprocessor.preprocess_review(review_text)
+                clean_texts.append(clean_text)
+                
+                if not clean_text or clean_text in aspects_by_text:
+                    continue
+                cached_result = self.cache.get(clean_text)
+                if cached_result is None:
+                    pending.append(clean_text)
+                    # Заглушка до ответа модели, чтобы повторы не попали в батч дважды
+                    cached_result = ([], [])
+                aspects_by_text[clean_text] = cached_result
+        
+        if pending:
+            try:
+                extracted = self._extract_parallel(pending)
+            except Exception as e:
+                logger.error(f"Ошибка при пакетном анализе отзывов: {e}")
+                extracted = [self._extract_or_none(text) for text in pending]
+            
+            for text, aspects in zip(pending, extracted):
+                if aspects is not None:
+                    self.cache.set(text, aspects)
+                    aspects_by_text[text] = aspects
+        
+        results = []
+        for clean_text in clean_texts:
+            positive_aspects, negative_aspects = aspects_by_text.get(clean_text, ([], []))
+            results.append({
+                "sentiment": self._determine_sentiment(positive_aspects, negative_aspects),
+                "positive_aspects": positive_aspects,
+                "negative_aspects": negative_aspects,
+                "clean_text": clean_text
+            })
+        
+        return results
+    
     def analyze_topics(self, texts: List[str]) -> Dict[str, Any]:
         if not texts:
             return {"topic_summary": {}, "detailed_aspects": []}
         
-        def process_text(text_content):
-            return self.analyze_review(text_content)
-        
-        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            analyzed_results = list(executor.map(process_text, texts))
-        
-        return self._build_topic_summary(analyzed_results)
+        analyzed_results = self.analyze_reviews(texts)
+        return self._build_topic_summary(analyzed_results, AnalysisAccumulator().add(analyzed_results))
     
     def analyze_sentiment(self, texts: List[str]) -> Dict[str, Any]:
-        results = self.analyze_topics(texts)
-        
-        pos_aspects = []
-        neg_aspects = []
-        
-        for detail in results.get("detailed_aspects", []):
-            pos_aspects.extend(detail.get("positive_aspects", []))
-            neg_aspects.extend(detail.get("negative_aspects", []))
+        accumulator = AnalysisAccumulator().add(self.analyze_reviews(texts))
+        return self.summarize_aspects(accumulator.positive, accumulator.negative)
+    
+    def summarize_aspects(self, pos_counter: Counter, neg_counter: Counter) -> Dict[str, Any]:
+        """Слияние, коррекция и категоризация по уже подсчитанным упоминаниям аспектов"""
+        with stage_timer("merge"):
+            pos_aspects_counted = self.merger.merge_similar_aspects(list(pos_counter.items()))
+            neg_aspects_counted = self.merger.merge_similar_aspects(list(neg_counter.items()))
         
-        pos_counter = Counter(pos_aspects)
-        neg_counter = Counter(neg_aspects)
+        with stage_timer("correct"):
+            corrected_pros, corrected_cons = self.classifier.correct_aspects(
+                pos_aspects_counted, neg_aspects_counted
+            )
+        logger.debug(f"Кэш лемм: {self.preprocessor.cache_stats()}")
         
-        pos_aspects_counted = self.merger.merge_similar_aspects(list(pos_counter.items()))
-        neg_aspects_counted = self.merger.merge_similar_aspects(list(neg_counter.items()))
-        
-        corrected_pros, corrected_cons = self.classifier.correct_aspects(
-            pos_aspects_counted, neg_aspects_counted
-        )
+        with stage_timer("categorize"):
+            categorized_positive = self.categorizer.categorize_aspects(corrected_pros)
+            categorized_negative = self.categorizer.categorize_aspects(corrected_cons)
         
         return {
             "positive_aspects": corrected_pros,
             "negative_aspects": corrected_cons,
-            "categorized_positive": self.categorizer.categorize_aspects(corrected_pros),
-            "categorized_negative": self.categorizer.categorize_aspects(corrected_cons)
+            "categorized_positive": categorized_positive,
+            "categorized_negative": categorized_negative
         }
     
     def analyze_sentiment_single(self, text: str) -> Dict[str, Any]:
@@ -128,29 +178,23 @@ class ReviewAnalyzer:
         }
     
     def get_summary_statistics(self, analyzed_reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
-        if not analyzed_reviews:
+        return self.get_accumulator_statistics(AnalysisAccumulator().add(analyzed_reviews))
+    
+    def get_accumulator_statistics(self, accumulator: AnalysisAccumulator) -> Dict[str, Any]:
+        if not accumulator.reviews:
             return self._empty_statistics()
         
-        sentiments = [review.get("sentiment", "neutral") for review in analyzed_reviews]
-        sentiment_counts = Counter(sentiments)
-        
-        total_reviews = len(analyzed_reviews)
-        
-        all_positive_aspects = []
-        all_negative_aspects = []
-        
-        for review in analyzed_reviews:
-            all_positive_aspects.extend(review.get("positive_aspects", []))
-            all_negative_aspects.extend(review.get("negative_aspects", []))
-        
-        pos_counter = Counter(all_positive_aspects)
-        neg_counter = Counter(all_negative_aspects)
+        sentiment_counts = accumulator.sentiments
+        total_reviews = accumulator.reviews
+        pos_counter = accumulator.positive
+        neg_counter = accumulator.negative
         
         top_positive = pos_counter.most_common(10)
         top_negative = neg_counter.most_common(10)
         
-        merged_positive = self.merger.merge_similar_aspects(list(pos_counter.items()))[:10]
-        merged_negative = self.merger.merge_similar_aspects(list(neg_counter.items()))[:10]
+        with stage_timer("merge"):
+            merged_positive = self.merger.merge_similar_aspects(list(pos_counter.items()))[:10]
+            merged_negative = self.merger.merge_similar_aspects(list(neg_counter.items()))[:10]
         
         return {
             "total_reviews": total_reviews,
@@ -176,15 +220,16 @@ class ReviewAnalyzer:
     def classify_and_correct_aspects(self, pros: List[Tuple[str, int]], cons: List[Tuple[str, int]]) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
         return self.classifier.correct_aspects(pros, cons)
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {"lemmas": self.preprocessor.cache_stats()}
+    
     @staticmethod
     def preprocess_review(review: str) -> str:
-        preprocessor = TextPreprocessor()
-        return preprocessor.preprocess_review(review)
+        return get_text_preprocessor().preprocess_review(review)
     
     @staticmethod
     def lemmatize_text(text: str) -> str:
-        preprocessor = TextPreprocessor()
-        return preprocessor.lemmatize_text(text)
+        return get_text_preprocessor().lemmatize_text(text)
     
     def _get_aspects_with_cache(self, text: str) -> tuple:
         cached_result = self.cache.get(text)
@@ -195,6 +240,31 @@ class ReviewAnalyzer:
         self.cache.set(text, result)
         return result
     
+    def _extract_parallel(self, texts: List[str]) -> List[Tuple[List[str], List[str]]]:
+        # Воркеры делят ядра поровну (см. AnalyzerConfig), поэтому потоков torch
+        # в сумме не больше, чем ядер в квоте контейнера
+        workers = self.config.max_workers
+        if workers <= 1 or len(texts) <= self.config.batch_size:
+            return self.extractor.extract_aspects_batch(texts)
+        
+        chunk_size = math.ceil(len(texts) / workers)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        # Копия контекста на каждый чанк: замеры стадий в воркерах попадают в сводку задачи
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda context, chunk: context.run(self.extractor.extract_aspects_batch, chunk),
+                contexts, chunks
+            )
+            return [aspects for chunk in results for aspects in chunk]
+    
+    def _extract_or_none(self, text: str) -> Optional[Tuple[List[str], List[str]]]:
+        try:
+            return self.extractor.extract_aspects(text)
+        except Exception as e:
+            logger.error(f"Ошибка при анализе отзыва: {e}")
+            return None
+    
     def _determine_sentiment(self, positive_aspects: List[str], negative_aspects: List[str]) -> str:
         pos_count = len(positive_aspects)
         neg_count = len(negative_aspects)
@@ -208,16 +278,9 @@ class ReviewAnalyzer:
         else:
             return "mixed"
     
-    def _build_topic_summary(self, analyzed_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        all_positive = []
-        all_negative = []
-        
-        for result in analyzed_results:
-            all_positive.extend(result.get("positive_aspects", []))
-            all_negative.extend(result.get("negative_aspects", []))
-        
-        pos_counter = Counter(all_positive)
-        neg_counter = Counter(all_negative)
+    def _build_topic_summary(self, analyzed_results: List[Dict[str, Any]], accumulator: AnalysisAccumulator) -> Dict[str, Any]:
+        pos_counter = accumulator.positive
+        neg_counter = accumulator.negative
         
         final_topic_summary = {
             "positive_aspects": dict(pos_counter.most_common(20)),
@@ -1,12 +1,90 @@
 import re
 import string
+import threading
 import unicodedata
-from typing import Dict
-import pymorphy2
+from functools import lru_cache
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pymorphy2
+
+# Объединение прежних диапазонов эмодзи: все они, кроме четырех одиночных символов,
+# укладываются в U+24C2..U+1F9FF, а короткий класс регулярка проверяет в разы быстрее
+_EMOJI_RE = re.compile(u"[\u200d\u231a\u23cf\u23e9\u24c2-\U0001F9FF]+")
+
+# Повторяет последовательные str.replace: "&amp;lt;" дает "<", а "&amp;amp;" - "&amp;"
+_HTML_ENTITY_RE = re.compile(r"&(?:amp;)?(lt|gt|quot|#39);|&amp;")
+_HTML_ENTITIES = {"lt": "<", "gt": ">", "quot": '"', "#39": "'", None: "&"}
+
+# Серия одинаковых знаков схлопывается, после знака добавляется пробел:
+# следующая за знаком серия других знаков тоже схлопывается до одного.
+# _PUNCTUATION_FIX_RE находит только места, где текст действительно меняется
+_PUNCTUATION_RE = re.compile(r"([!?,.;:])\1*(?:([!?,.;:])\2*|(\S))?")
+_PUNCTUATION_FIX_RE = re.compile(r"[!?,.;:]\S")
+
+_MULTI_SPACE_RE = re.compile(r"\s+")
+_REPEATED_PUNCTUATION_RE = re.compile(r"([!?.,:;])\1+")
+_STRIP_CHARS = string.punctuation + " "
+
+
+_morph_analyzer: Optional["pymorphy2.MorphAnalyzer"] = None
+_morph_lock = threading.Lock()
+_default_preprocessor: Optional["TextPreprocessor"] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_morph_analyzer() -> "pymorphy2.MorphAnalyzer":
+    # Словари pymorphy2 грузятся сотни миллисекунд и занимают десятки мегабайт,
+    # поэтому на процесс создается один анализатор при первом обращении
+    global _morph_analyzer
+    if _morph_analyzer is None:
+        with _morph_lock:
+            if _morph_analyzer is None:
+                import pymorphy2
+                _morph_analyzer = pymorphy2.MorphAnalyzer()
+    return _morph_analyzer
+
+
+def get_text_preprocessor() -> "TextPreprocessor":
+    global _default_preprocessor
+    if _default_preprocessor is None:
+        with _preprocessor_lock:
+            if _default_preprocessor is None:
+                _default_preprocessor = TextPreprocessor()
+    return _default_preprocessor
+
+
+def _replace_html_entity(match: "re.Match") -> str:
+    return _HTML_ENTITIES[match.group(1)]
+
+
+def _replace_punctuation(match: "re.Match") -> str:
+    following = match.group(2) or match.group(3)
+    if following:
+        return match.group(1) + " " + following
+    return match.group(1)
+
+
+def normalize_review(review: str) -> str:
+    review = unicodedata.normalize('NFKC', review).lower()
+    review = _EMOJI_RE.sub(' ', review)
+    if '&' in review:
+        review = _HTML_ENTITY_RE.sub(_replace_html_entity, review)
+    # str.split() и \s в re считают пробельными одни и те же символы, а крайние
+    # пробелы все равно срезаются в конце
+    review = ' '.join(review.split())
+    if _PUNCTUATION_FIX_RE.search(review):
+        review = _PUNCTUATION_RE.sub(_replace_punctuation, review)
+    return review.strip(_STRIP_CHARS)
+
 
 class TextPreprocessor:
-    def __init__(self):
-        self.morph = pymorphy2.MorphAnalyzer()
+    def __init__(self, word_cache_size: int = 50000, aspect_cache_size: int = 20000):
+        # Один экземпляр разделяют классификатор, мержер и категоризатор, поэтому
+        # одинаковые аспекты разбираются морфологически один раз. lru_cache
+        # потокобезопасен и ограничен по размеру
+        self._lemmatize_word = lru_cache(maxsize=word_cache_size)(self._parse_normal_form)
+        self._lemmatize_aspect = lru_cache(maxsize=aspect_cache_size)(self._lemmatize_words)
         self._russian_endings = {
             'отличн': 'ый', 'хорош': 'ий', 'плох': 'ой', 'красив': 'ый',
             'наклей': 'ка', 'размер': '', 'приятн': 'ый', 'интересн': 'ый',
@@ -15,33 +93,53 @@ class TextPreprocessor:
             'вс': 'ё', 'больш': 'ой', 'маленьк': 'ий', 'удобн': 'ый'
         }
     
+    @property
+    def morph(self) -> "pymorphy2.MorphAnalyzer":
+        return get_morph_analyzer()
+    
     def preprocess_review(self, review: str) -> str:
         if not review or not isinstance(review, str):
             return ""
         
-        review = unicodedata.normalize('NFKC', review).lower()
-        review = self._remove_emojis(review)
-        review = self._decode_html_entities(review)
-        review = self._normalize_whitespace(review)
-        review = self._normalize_punctuation(review)
-        
-        return review.strip(string.punctuation + ' ')
+        return normalize_review(review)
     
     def lemmatize_text(self, text: str) -> str:
         if not text:
             return ""
         
-        words = text.split()
+        return self._lemmatize_aspect(text)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for name, cached in (("words", self._lemmatize_word), ("aspects", self._lemmatize_aspect)):
+            info = cached.cache_info()
+            total = info.hits + info.misses
+            stats[name] = {
+                "hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "max_size": info.maxsize,
+                "hit_rate": info.hits / total if total else 0.0
+            }
+        return stats
+    
+    def clear_caches(self) -> None:
+        self._lemmatize_word.cache_clear()
+        self._lemmatize_aspect.cache_clear()
+    
+    def _lemmatize_words(self, text: str) -> str:
         lemmatized_words = []
         
-        for word in words:
+        for word in text.split():
             clean_word = word.strip(string.punctuation)
             if clean_word:
-                parsed = self.morph.parse(clean_word)[0]
-                lemmatized_words.append(parsed.normal_form)
+                lemmatized_words.append(self._lemmatize_word(clean_word))
         
         return ' '.join(lemmatized_words)
     
+    def _parse_normal_form(self, word: str) -> str:
+        return self.morph.parse(word)[0].normal_form
+    
     def clean_aspect(self, aspect: str) -> str:
         if not aspect:
             return ""
@@ -50,53 +148,8 @@ class TextPreprocessor:
             aspect += self._russian_endings[aspect]
         
         aspect = aspect.strip()
-        aspect = re.sub(r'\s+', ' ', aspect)
-        aspect = re.sub(r'([!?.,:;])\1+', r'\1', aspect)
-        aspect = aspect.strip(string.punctuation + ' ')
+        aspect = _MULTI_SPACE_RE.sub(' ', aspect)
+        aspect = _REPEATED_PUNCTUATION_RE.sub(r'\1', aspect)
+        aspect = aspect.strip(_STRIP_CHARS)
         
         return aspect
-    
-    def _remove_emojis(self, text: str) -> str:
-        emoji_pattern = re.compile(
-            "["
-            u"\U0001F000-\U0001F9FF"  
-            u"\U00002700-\U000027BF"  
-            u"\U0001F600-\U0001F64F"  
-            u"\U0001F300-\U0001F5FF"  
-            u"\U0001F680-\U0001F6FF"  
-            u"\U0001F700-\U0001F77F"  
-            u"\U0001F780-\U0001F7FF"  
-            u"\U0001F800-\U0001F8FF"  
-            u"\U0001F900-\U0001F9FF"  
-            u"\U00002702-\U000027B0"  
-            u"\U000024C2-\U0001F251"  
-            u"\U0001f926-\U0001f937"  
-            u"\U0001F1E0-\U0001F1FF"  
-            u"\u200d"                 
-            u"\u2640-\u2642"          
-            u"\u2600-\u2B55"          
-            u"\u23cf"
-            u"\u23e9"
-            u"\u231a"
-            u"\u3030"
-            u"\ufe0f"                 
-            "]+", flags=re.UNICODE
-        )
-        return emoji_pattern.sub(' ', text)
-    
-    def _decode_html_entities(self, text: str) -> str:
-        replacements = {
-            '&amp;': '&', '&lt;': '<', '&gt;': '>', 
-            '&quot;': '"', '&#39;': "'"
-        }
-        for entity, char in replacements.items():
-            text = text.replace(entity, char)
-        return text
-    
-    def _normalize_whitespace(self, text: str) -> str:
-        return re.sub(r'[\s\t\n\r]+', ' ', text)
-    
-    def _normalize_punctuation(self, text: str) -> str:
-        text = re.sub(r'([!?,.;:])\1+', r'\1', text)  
-        text = re.sub(r'([!?,.;:])([^\s])', r'\1 \2', text)  
-        return text 
\ No newline at end of file
@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('review_analyzer.warmup')
+
+_SAMPLE_SENTENCE = "Качество отличное, доставка быстрая, но упаковка была помята и инструкция непонятная. "
+
+
+@dataclass
+class WarmupStatus:
+    enabled: bool = False
+    ready: bool = False
+    error: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    batches: int = 0
+
+
+_status = WarmupStatus()
+_status_lock = threading.Lock()
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    with _status_lock:
+        return asdict(_status)
+
+
+def is_ready() -> bool:
+    # Без прогрева модель по-прежнему грузится лениво и готовность не ограничивается
+    with _status_lock:
+        return _status.ready or not _status.enabled
+
+
+def mark_warmup_pending() -> None:
+    """Вызывается до запуска прогрева в фоне, чтобы /ready сразу отвечал 503"""
+    with _status_lock:
+        _status.enabled = True
+
+
+def warmup_texts(max_len: int) -> List[str]:
+    """Короткий отзыв, отзыв на всю длину окна и длинный, который режется на окна"""
+    lengths = [60, max_len, max_len * 3]
+    return [(_SAMPLE_SENTENCE * (length // len(_SAMPLE_SENTENCE) + 1))[:length] for length in lengths]
+
+
+def warm_up_analyzer(rounds: int = 2) -> None:
+    from . import get_review_analyzer
+
+    with _status_lock:
+        _status.enabled = True
+        _status.ready = False
+        _status.error = None
+
+    started = time.perf_counter()
+    try:
+        analyzer = get_review_analyzer()
+        texts = warmup_texts(analyzer.config.max_len)
+        # Полный батч каждой длины: первые вызовы выделяют память под такие формы тензоров
+        for _ in range(rounds):
+            for text in texts:
+                analyzer.extractor.extract_aspects_batch([text] * analyzer.config.batch_size)
+                with _status_lock:
+                    _status.batches += 1
+    except Exception as e:
+        logger.error(f"Ошибка прогрева модели: {e}")
+        with _status_lock:
+            _status.error = str(e)
+        return
+
+    duration = time.perf_counter() - started
+    with _status_lock:
+        _status.ready = True
+        _status.duration_seconds = round(duration, 3)
+    logger.info(f"Модель прогрета за {duration:.1f} с")
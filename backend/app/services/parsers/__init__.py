@@ -1,4 +1,27 @@
-from app.services.parsers.ozon import OzonParser
-from app.services.parsers.wb import WildberriesParser
+import importlib
 
-__all__ = ["OzonParser", "WildberriesParser"] 
\ No newline at end of file
+# Парсеры тянут selenium и requests, поэтому модули импортируются при первом обращении
+_LAZY_ATTRIBUTES = {
+    "OzonParser": "app.services.parsers.ozon",
+    "WildberriesParser": "app.services.parsers.wb",
+}
+
+__all__ = ["OzonParser", "WildberriesParser", "create_parser"]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def create_parser(marketplace: str):
+    """Парсер по коду маркетплейса из AnalysisRequest.marketplace"""
+    if marketplace == "wb":
+        return __getattr__("WildberriesParser")()
+    if marketplace == "ozon":
+        return __getattr__("OzonParser")()
+    raise ValueError(f"Неподдерживаемый маркетплейс: {marketplace}")
@@ -4,7 +4,7 @@ import time
 import json
 import random
 import logging
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
 from datetime import datetime, date
 from urllib.parse import urljoin
 
@@ -19,6 +19,8 @@ from selenium_stealth import stealth
 from selenium.webdriver.remote.webdriver import WebDriver
 from dataclasses import dataclass
 
+from app.core.metrics import stage_timer
+
 logger = logging.getLogger("OzonParser")
 
 REMOTE_WEBDRIVER_URL = os.environ.get("REMOTE_WEBDRIVER_URL", "http://selenium:4444/wd/hub")
@@ -73,11 +75,12 @@ class WebDriverManager:
         chrome_options.add_experimental_option('useAutomationExtension', False)
 
         try:
-            self.driver = webdriver.Remote(
-                command_executor=REMOTE_WEBDRIVER_URL,
-                options=chrome_options
-            )
-            self._apply_stealth()
+            with stage_timer("ozon_driver_start"):
+                self.driver = webdriver.Remote(
+                    command_executor=REMOTE_WEBDRIVER_URL,
+                    options=chrome_options
+                )
+                self._apply_stealth()
             return self.driver
         except WebDriverException as e:
             logger.error(f"Не удалось создать WebDriver: {e}", exc_info=True)
@@ -152,6 +155,21 @@ class OzonParser:
         
         return []
     
+    def iter_review_batches(self, product_id: str, max_reviews: int = 500, batch_size: int = 32) -> Iterator[List[Dict[str, Any]]]:
+        """Отзывы пачками по batch_size сразу после разбора каждой страницы; драйвер
+        закрывается, когда генератор исчерпан или закрыт"""
+        if not self.is_valid_product_id(product_id):
+            logger.error(f"Неверный формат ID товара: {product_id}")
+            return
+        
+        reviews_url = f"https://www.ozon.ru/product/{product_id}/reviews/"
+        with WebDriverManager() as driver:
+            if not self._open_reviews_page(driver, reviews_url):
+                return
+            for page_reviews in self._iter_review_pages(driver, max_reviews, self.get_product_info(product_id)):
+                for batch_start in range(0, len(page_reviews), batch_size):
+                    yield page_reviews[batch_start:batch_start + batch_size]
+    
     def get_product_info(self, product_id: str) -> Dict[str, Any]:
         return {
             "id": product_id,
@@ -165,16 +183,20 @@ class OzonParser:
         }
     
     def _parse_reviews_with_selenium(self, driver: WebDriver, url: str, max_reviews: int, product_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not self._open_reviews_page(driver, url):
+            return []
+
+        return self._extract_reviews_from_all_pages(driver, max_reviews, product_info)
+
+    def _open_reviews_page(self, driver: WebDriver, url: str) -> bool:
         logger.info(f"Открываем страницу отзывов: {url}")
-        driver.get(url)
+        with stage_timer("ozon_page_load"):
+            driver.get(url)
         time.sleep(1) 
 
         self._close_popups(driver)
 
-        if not self._handle_initial_checks(driver):
-            return []
-
-        return self._extract_reviews_from_all_pages(driver, max_reviews, product_info)
+        return self._handle_initial_checks(driver)
 
     def _close_popups(self, driver: WebDriver):
         try:
@@ -203,24 +225,35 @@ class OzonParser:
 
     def _extract_reviews_from_all_pages(self, driver: WebDriver, max_reviews: int, product_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         all_reviews = []
+        for page_reviews in self._iter_review_pages(driver, max_reviews, product_info):
+            all_reviews.extend(page_reviews)
+        return all_reviews
+
+    def _iter_review_pages(self, driver: WebDriver, max_reviews: int, product_info: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        collected_count = 0
         
         for page_num in range(1, self.config.max_pages + 1):
             logger.info(f"Обработка страницы отзывов #{page_num}")
             
-            self._scroll_to_bottom(driver)
-            time.sleep(0.5) 
+            with stage_timer("ozon_scroll"):
+                self._scroll_to_bottom(driver)
+                time.sleep(0.5) 
 
-            page_reviews, stop_parsing = self._get_reviews_from_page(driver, product_info, page_num)
+            with stage_timer("ozon_extract_page"):
+                page_reviews, stop_parsing = self._get_reviews_from_page(driver, product_info, page_num)
             
+            page_reviews = page_reviews[:max_reviews - collected_count]
             if page_reviews:
-                all_reviews.extend(page_reviews)
+                collected_count += len(page_reviews)
+                yield page_reviews
 
-            if stop_parsing or len(all_reviews) >= max_reviews:
+            if stop_parsing or collected_count >= max_reviews:
                 break
             
-            if not self._go_to_next_page(driver, page_num):
+            with stage_timer("ozon_next_page"):
+                has_next_page = self._go_to_next_page(driver, page_num)
+            if not has_next_page:
                 break
-        return all_reviews[:max_reviews]
 
     def _scroll_to_bottom(self, driver) -> None:
         try:
@@ -4,11 +4,12 @@ import sys
 import os
 import time
 import json
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterator, Optional, Union
 import random
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.metrics import stage_timer
 
 import requests
 from requests.exceptions import RequestException, Timeout, ConnectionError
@@ -77,7 +78,8 @@ class WildberriesParser:
 
         while attempt <= retries:
             try:
-                response = requests.get(url=url, headers=self.headers, params=params, timeout=timeout)
+                with stage_timer("wb_http", endpoint="feedbacks"):
+                    response = requests.get(url=url, headers=self.headers, params=params, timeout=timeout)
 
                 if response.status_code == 429:
                     attempt += 1
@@ -179,9 +181,16 @@ class WildberriesParser:
 
     def get_all_reviews(self, imt_id: Union[int, str], max_reviews_count: int = 1000, timeout: int = DEFAULT_TIMEOUT, retries: int = MAX_RETRIES) -> List[Review]:
 
+        all_reviews_collected = []
+        for reviews in self._iter_new_reviews(imt_id, max_reviews_count, timeout, retries):
+            all_reviews_collected.extend(reviews)
+        return all_reviews_collected[:max_reviews_count]
+
+    def _iter_new_reviews(self, imt_id: Union[int, str], max_reviews_count: int, timeout: int, retries: int) -> Iterator[List[Review]]:
+        """Новые (без повторов) отзывы каждого ответа источника, пока не набрано max_reviews_count"""
         imt_id_str = str(imt_id)
 
-        all_reviews_collected = []
+        collected_count = 0
         collected_review_ids = set()
         
         main_urls = [
@@ -189,28 +198,33 @@ class WildberriesParser:
             f"https://feedbacks2.wb.ru/feedbacks/v1/{imt_id_str}"
         ]
         
+        def take_new(reviews: List[Review]) -> List[Review]:
+            new_reviews = []
+            for review in reviews:
+                if review.id not in collected_review_ids:
+                    new_reviews.append(review)
+                    collected_review_ids.add(review.id)
+            return new_reviews
+        
         for main_url in main_urls:
             reviews = self._get_reviews_with_params(main_url, params={}, timeout=timeout, retries=retries, version="v1")
             
             if reviews:
-                newly_added = 0
-                for review in reviews:
-                    if review.id not in collected_review_ids:
-                        all_reviews_collected.append(review)
-                        collected_review_ids.add(review.id)
-                        newly_added += 1
-                
+                new_reviews = take_new(reviews)[:max_reviews_count - collected_count]
+                collected_count += len(new_reviews)
+                if new_reviews:
+                    yield new_reviews
                 
-                if len(all_reviews_collected) >= max_reviews_count:
+                if collected_count >= max_reviews_count:
                     break
             else:
                 logger.warning(f"Отзывы не найдены с {main_url}")
         
-        if len(all_reviews_collected) < max_reviews_count:
+        if collected_count < max_reviews_count:
             
             for domain in self.FEEDBACK_DOMAINS:
                 for version in self.API_VERSIONS:
-                    if len(all_reviews_collected) >= max_reviews_count:
+                    if collected_count >= max_reviews_count:
                         break
                     
                     alternative_urls = [
@@ -225,17 +239,13 @@ class WildberriesParser:
                             url, params={}, timeout=timeout, retries=retries, version=version
                         )
                         
-                        newly_added = 0
-                        for review in batch_reviews:
-                            if review.id not in collected_review_ids:
-                                all_reviews_collected.append(review)
-                                collected_review_ids.add(review.id)
-                                newly_added += 1
+                        new_reviews = take_new(batch_reviews)[:max_reviews_count - collected_count]
+                        collected_count += len(new_reviews)
+                        if new_reviews:
+                            yield new_reviews
                         
-                        if len(all_reviews_collected) >= max_reviews_count:
+                        if collected_count >= max_reviews_count:
                             break
-                
-        return all_reviews_collected[:max_reviews_count]
 
     def parse_reviews(self, article_id: str, max_reviews: int = 500) -> List[Dict[str, Any]]:
         
@@ -271,11 +281,27 @@ class WildberriesParser:
             logger.error(f"Ошибка при парсинге отзывов для артикула {article_id}: {e}")
             return []
 
+    def iter_review_batches(self, article_id: str, max_reviews: int = 500, batch_size: int = 32) -> Iterator[List[Dict[str, Any]]]:
+        """Отзывы пачками по batch_size по мере загрузки источников, как в parse_reviews"""
+        if not article_id.isdigit():
+            logger.warning(f"ID {article_id} не является числовым артикулом. Парсинг отзывов невозможен.")
+            return
+        
+        imt_id = self._fetch_imt_id_for_article(int(article_id))
+        if not imt_id:
+            logger.warning(f"Не удалось получить imt_id для артикула: {article_id}. Парсинг отзывов невозможен.")
+            return
+        
+        for reviews in self._iter_new_reviews(imt_id, min(max_reviews, 2000), self.DEFAULT_TIMEOUT, self.MAX_RETRIES):
+            for batch_start in range(0, len(reviews), batch_size):
+                yield [review.model_dump() for review in reviews[batch_start:batch_start + batch_size]]
+
     def _fetch_imt_id_for_article(self, article_id: int, timeout: int = DEFAULT_TIMEOUT) -> Optional[int]:
         url = f"https://card.wb.ru/cards/v2/detail?appType=1&curr=rub&dest=-1257786&spp=30&nm={article_id}"
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=timeout)
+            with stage_timer("wb_http", endpoint="card"):
+                response = requests.get(url, headers=self.headers, timeout=timeout)
             response.raise_for_status()  
             data = response.json()
 
@@ -363,7 +389,8 @@ class WildberriesParser:
         data = None
         for url in urls:
             try:
-                response = requests.get(url, headers=self.headers, timeout=self.DEFAULT_TIMEOUT)
+                with stage_timer("wb_http", endpoint="product"):
+                    response = requests.get(url, headers=self.headers, timeout=self.DEFAULT_TIMEOUT)
                 if response.status_code == 200:
                     data = response.json()
                     if data and isinstance(data, dict):
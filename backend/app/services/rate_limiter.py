@@ -0,0 +1,57 @@
+import asyncio
+from typing import Dict
+
+from app.core.config import settings
+
+
+class RateLimiter:
+    """Не больше max_concurrent загрузок одновременно и не чаще одного старта
+    в min_interval секунд: пакет из десятков товаров не должен упираться в бан"""
+
+    def __init__(self, max_concurrent: int, min_interval: float = 0.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def acquire(self) -> None:
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                delay = self._next_start - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_start = loop.time() + self.min_interval
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(marketplace: str) -> RateLimiter:
+    """Один лимитер на маркетплейс для всего процесса: его делят пакеты и одиночные задачи.
+    Создается при первом вызове внутри event loop - в Python 3.9 примитивы asyncio
+    привязываются к циклу при создании"""
+    limiter = _limiters.get(marketplace)
+    if limiter is None:
+        limits = {
+            "wb": settings.WB_MAX_CONCURRENT_FETCHES,
+            "ozon": settings.OZON_MAX_CONCURRENT_FETCHES,
+        }
+        limiter = RateLimiter(limits.get(marketplace, 1), settings.PARSER_MIN_INTERVAL)
+        _limiters[marketplace] = limiter
+    return limiter
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import settings
+from app.crud.crud_analysis import analysis as crud_analysis
+from app.crud.crud_watched_product import watched_product as crud_watched_product
+from app.crud.review_crud import reviews as crud_reviews
+from app.models.analysis import AnalysisStatus
+from app.schemas.analysis import AnalysisRequestCreate
+from app.services import parsers as marketplace_parsers
+from app.services.analysis_pipeline import PipelineResult
+from app.services.analysis_results import save_analysis_result
+from app.services.analysis_stream import iterate_in_thread, review_rating
+from app.services.analyzer import default_analyzer
+from app.services.analyzer.accumulator import AnalysisAccumulator
+from app.services.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+DUE_BATCH_LIMIT = 100
+# Отзывы, выпавшие из последних max_reviews, из счетчиков не вычесть: когда цепочка
+# предрасчетов учла CHAIN_RESET_FACTOR * max_reviews отзывов, она считается заново
+# по свежей выборке
+CHAIN_RESET_FACTOR = 2
+
+
+def _window_hours() -> int:
+    return (settings.WATCHLIST_WINDOW_END_HOUR - settings.WATCHLIST_WINDOW_START_HOUR) % 24 or 24
+
+
+def in_refresh_window(now: datetime) -> bool:
+    return (now.hour - settings.WATCHLIST_WINDOW_START_HOUR) % 24 < _window_hours()
+
+
+def next_refresh_at(marketplace: str, product_id: str, after: datetime) -> datetime:
+    """Ближайший после after слот товара в ночном окне. Смещение внутри окна -
+    стабильный хеш товара: обновления равномерно распределены по окну, а не
+    начинаются все в его первую минуту"""
+    window_seconds = _window_hours() * 3600
+    offset = zlib.crc32(f"{marketplace}:{product_id}".encode("utf-8")) % window_seconds
+    # Со вчерашнего окна: окно может переходить через полночь
+    window_start = after.replace(
+        hour=settings.WATCHLIST_WINDOW_START_HOUR, minute=0, second=0, microsecond=0
+    ) - timedelta(days=1)
+    slot = window_start + timedelta(seconds=offset)
+    while slot <= after:
+        slot += timedelta(days=1)
+    return slot
+
+
+async def refresh_due_products(now: datetime) -> int:
+    """Обновляет товары, чей слот наступил; не больше WATCHLIST_CONCURRENCY одновременно,
+    загрузки дополнительно ограничены лимитом маркетплейса"""
+    from app.db.database import get_async_session
+
+    async for db in get_async_session():
+        try:
+            due = await crud_watched_product.get_due(db, now=now, limit=DUE_BATCH_LIMIT)
+        finally:
+            await db.close()
+        break
+
+    # Отслеживания одного товара разными пользователями идут по очереди: первое
+    # загружает отзывы, остальные с тем же max_reviews получают копию его результата
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for watch in due:
+        groups.setdefault((watch.marketplace, watch.product_id), []).append(watch.id)
+    semaphore = asyncio.Semaphore(settings.WATCHLIST_CONCURRENCY)
+
+    async def refresh(watch_ids: List[int]) -> None:
+        async with semaphore:
+            for watch_id in watch_ids:
+                await refresh_watched_product(watch_id)
+
+    await asyncio.gather(*(refresh(watch_ids) for watch_ids in groups.values()))
+    return len(due)
+
+
+async def refresh_watched_product(watch_id: int) -> None:
+
+    from app.db.database import get_async_session
+
+    async for db in get_async_session():
+        try:
+            watch = await crud_watched_product.get(db, id=watch_id)
+            if not watch:
+                return
+            error = None
+            try:
+                await _refresh(db, watch)
+            except Exception as e:
+                logger.error(f"Ошибка обновления отслеживаемого товара {watch.marketplace}:{watch.product_id}: {e}")
+                error = str(e)
+                await db.rollback()
+                watch = await crud_watched_product.get(db, id=watch_id)
+
+            update_data = {
+                "last_error": error,
+                "next_refresh_at": next_refresh_at(watch.marketplace, watch.product_id, datetime.utcnow()),
+            }
+            if error is None:
+                update_data["last_refreshed_at"] = datetime.utcnow()
+            await crud_watched_product.update(db, db_obj=watch, obj_in=update_data)
+        finally:
+            await db.close()
+        break
+
+
+async def _refresh(db, watch) -> None:
+    """Загружаются последние max_reviews отзывов, но в модель идут только не учтенные
+    в цепочке предрасчетов: их счетчики складываются со счетчиками предыдущего
+    предрасчета. Цепочка общая для отслеживаний товара с одинаковым max_reviews"""
+    loop = asyncio.get_running_loop()
+
+    latest = await crud_watched_product.get_latest_refreshed(
+        db, marketplace=watch.marketplace, product_id=watch.product_id, max_reviews=watch.max_reviews
+    )
+    previous = await crud_analysis.get(db, id=latest.analysis_id) if latest is not None else None
+    window_start = datetime.utcnow() - timedelta(hours=_window_hours())
+    if previous is not None and latest.id != watch.id and latest.last_refreshed_at >= window_start:
+        # Товар уже обновлен в этом окне другим отслеживанием
+        await _link_analysis(db, watch, previous, latest.counted_review_ids)
+        return
+
+    counted = set(latest.counted_review_ids or []) if previous is not None else set()
+    if len(counted) >= CHAIN_RESET_FACTOR * watch.max_reviews:
+        previous, counted = None, set()
+
+    parser = marketplace_parsers.create_parser(watch.marketplace)
+    batch_size = default_analyzer.config.batch_size
+
+    new_reviews = AnalysisAccumulator()
+    new_rows: List[Dict[str, Any]] = []
+    seen_ids = set(counted)
+    async with get_rate_limiter(watch.marketplace):
+        pages = iterate_in_thread(parser.iter_review_batches(watch.product_id, watch.max_reviews, batch_size))
+        try:
+            async for reviews in pages:
+                fresh = [row for row in _review_rows(watch, reviews) if row["external_id"] not in seen_ids]
+                seen_ids.update(row["external_id"] for row in fresh)
+                if not fresh:
+                    continue
+                analyzed = await loop.run_in_executor(
+                    None, default_analyzer.analyze_reviews, [row["text"] for row in fresh]
+                )
+                new_reviews.add(analyzed, [row["rating"] for row in fresh if row["rating"] is not None])
+                new_rows.extend(fresh)
+        finally:
+            await pages.aclose()
+
+        product_id = int(watch.product_id) if watch.product_id.isdigit() else watch.product_id
+        try:
+            product_info = await loop.run_in_executor(None, parser.get_product_info, product_id)
+        except Exception as e:
+            logger.warning(f"Не удалось получить информацию о товаре {watch.product_id}: {e}")
+            product_info = None
+
+    if not new_rows:
+        # Новых отзывов нет: предыдущий предрасчет по-прежнему актуален
+        if previous is not None and watch.analysis_id != previous.id:
+            await _link_analysis(db, watch, previous, latest.counted_review_ids)
+        return
+
+    previous_accumulator, previous_count = None, 0
+    if previous is not None:
+        previous_accumulator, previous_count = await crud_analysis.get_accumulator(db, request_id=previous.id)
+    accumulator = AnalysisAccumulator.from_dict(previous_accumulator).merge(new_reviews)
+    counted.update(row["external_id"] for row in new_rows)
+
+    analysis = await crud_analysis.create_with_user(db, obj_in=_analysis_request(watch), user_id=watch.user_id)
+    analysis_id = analysis.id
+
+    async def link_reviews() -> None:
+        # Отзывы и ссылка на предрасчет фиксируются одной транзакцией с результатом:
+        # после сбоя следующее обновление снова сочтет эти отзывы новыми
+        await crud_reviews.bulk_upsert(db, new_rows, commit=False)
+        watch.analysis_id = analysis_id
+        watch.counted_review_ids = sorted(counted)
+
+    try:
+        await crud_analysis.update_status(db, db_obj=analysis, status=AnalysisStatus.PROCESSING)
+        await save_analysis_result(
+            db,
+            analysis,
+            PipelineResult(
+                fetched_reviews=previous_count + len(new_rows),
+                accumulator=accumulator,
+                product_info=product_info
+            ),
+            before_save=link_reviews,
+            snapshot=new_reviews
+        )
+    except Exception as e:
+        # Как в _run_analysis: иначе анализ навсегда остается в PROCESSING, и
+        # find_reusable подключает к нему новые запросы этого товара
+        await db.rollback()
+        failed = await crud_analysis.get(db, id=analysis_id)
+        if failed:
+            await crud_analysis.update_status(db, db_obj=failed, status=AnalysisStatus.FAILED, error_message=str(e))
+        raise
+    crud_reviews.invalidate_counts({(row["product_id"], row["source"]) for row in new_rows})
+
+
+async def _link_analysis(db, watch, source, counted_review_ids) -> None:
+    # Копия результата в анализ владельца отслеживания: чужой анализ ему недоступен
+    analysis = await crud_analysis.create_reused(db, obj_in=_analysis_request(watch), user_id=watch.user_id, source=source)
+    watch.analysis_id = analysis.id
+    watch.counted_review_ids = counted_review_ids
+    await db.commit()
+
+
+def _analysis_request(watch) -> AnalysisRequestCreate:
+
+    return AnalysisRequestCreate(
+        url=watch.url,
+        marketplace=watch.marketplace,
+        max_reviews=watch.max_reviews,
+        product_id=watch.product_id
+    )
+
+
+def _review_rows(watch, reviews: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    for review in reviews:
+        external_id = review.get("id")
+        text = (review.get("text") or "").strip()
+        # Без внешнего ID отзыв нельзя отличить от уже учтенного
+        if not external_id or external_id == "unknown" or not text:
+            continue
+        rows[str(external_id)] = {
+            "external_id": str(external_id),
+            "text": text,
+            "rating": review_rating(review),
+            "product_id": watch.product_id,
+            "product_name": review.get("product_name"),
+            "source": review.get("source") or watch.marketplace,
+            "date": review.get("date"),
+            "author": review.get("author"),
+            "likes": review.get("likes", 0),
+            "dislikes": review.get("dislikes", 0),
+            "photos": review.get("photos", []),
+        }
+    return list(rows.values())
@@ -0,0 +1,46 @@
+"""Фоновый воркер: обновляет отслеживаемые товары в ночном окне.
+
+Запуск: python -m app.worker
+"""
+import asyncio
+import logging
+import signal
+from datetime import datetime
+
+from app.services.watchlist import in_refresh_window, refresh_due_products
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TICK = 60
+
+
+async def run_scheduler(stop: asyncio.Event) -> None:
+    """Раз в минуту обновляет товары, чей слот наступил. Вне окна ничего не запускается,
+    а не успевшие товары ждут следующего окна"""
+    while not stop.is_set():
+        now = datetime.utcnow()
+        if in_refresh_window(now):
+            try:
+                refreshed = await refresh_due_products(now)
+                if refreshed:
+                    logger.info(f"Обновлено отслеживаемых товаров: {refreshed}")
+            except Exception as e:
+                logger.error(f"Ошибка планировщика отслеживаемых товаров: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=SCHEDULER_TICK)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Воркер отслеживаемых товаров запущен")
+    await run_scheduler(stop)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
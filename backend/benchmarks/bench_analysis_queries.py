@@ -0,0 +1,221 @@
+"""Замер запросов списка анализов, прогресса и результата до и после индексов.
+
+Наполняет ЛОКАЛЬНУЮ базу синтетическими анализами (по умолчанию 1 000 000 запросов
+с результатами), затем меряет задержку запросов без индексов миграции b7e2c4f81d3a
+и с ними. Запуск из каталога backend:
+
+    python -m benchmarks.bench_analysis_queries --rows 1000000
+    python -m benchmarks.bench_analysis_queries --skip-seed --explain
+    python -m benchmarks.bench_analysis_queries --cleanup
+
+Не запускайте на рабочей базе: сид создает пользователей bench-*@bench.local.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.crud_analysis import analysis as crud_analysis
+
+BENCH_EMAIL_DOMAIN = "bench.local"
+
+INDEXES = {
+    "ix_analysis_requests_user_id_created_at":
+        "CREATE INDEX IF NOT EXISTS ix_analysis_requests_user_id_created_at "
+        "ON analysis_requests (user_id, created_at DESC)",
+    "ix_analysis_results_request_id":
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_analysis_results_request_id "
+        "ON analysis_results (request_id)",
+}
+
+SEED_USERS_SQL = """
+INSERT INTO "user" (email, hashed_password, full_name, is_active, is_superuser, created_at, updated_at)
+SELECT 'bench-' || g || '@{domain}', 'x', 'Bench ' || g, true, false, now(), now()
+FROM generate_series(1, :users) AS g
+ON CONFLICT (email) DO NOTHING
+"""
+
+SEED_REQUESTS_SQL = """
+INSERT INTO analysis_requests (
+    user_id, product_id, marketplace, status, created_at, updated_at, url, max_reviews,
+    is_processed, progress_percentage, current_stage, processed_reviews, total_reviews
+)
+SELECT u.id, (100000 + g)::text, 'wb', 'completed',
+       now() - (g || ' seconds')::interval, now(),
+       'https://www.wildberries.ru/catalog/' || (100000 + g) || '/detail.aspx', 100,
+       true, 100.0, 'completed', 100, 100
+FROM generate_series(1, :rows) AS g
+JOIN (
+    SELECT id, row_number() OVER (ORDER BY id) - 1 AS n
+    FROM "user" WHERE email LIKE '%@{domain}'
+) u ON u.n = g % :users
+"""
+
+SEED_RESULTS_SQL = """
+INSERT INTO analysis_results (
+    request_id, positive_aspects, negative_aspects, aspect_categories,
+    reviews_count, sentiment_summary, product_info, created_at
+)
+SELECT r.id, CAST(:aspects AS json), CAST(:aspects AS json), CAST(:categories AS json),
+       100, CAST(:summary AS json),
+       json_build_object('name', 'Товар ' || r.product_id, 'id', r.product_id), now()
+FROM analysis_requests r
+JOIN "user" u ON u.id = r.user_id
+WHERE u.email LIKE '%@{domain}'
+  AND NOT EXISTS (SELECT 1 FROM analysis_results x WHERE x.request_id = r.id)
+"""
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _measure(
+    session_factory,
+    query: Callable[[AsyncSession, int], Awaitable[Any]],
+    ids: List[int],
+    repeats: int
+) -> Dict[str, float]:
+    timings = []
+    async with session_factory() as db:
+        for i in range(repeats):
+            started = time.perf_counter()
+            await query(db, ids[i % len(ids)])
+            timings.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+async def seed(engine, rows: int, users: int) -> None:
+    aspects = json.dumps([{"text": f"аспект {i}", "count": i} for i in range(50)], ensure_ascii=False)
+    categories = json.dumps({"positive": {"categories": [], "total_aspect_mentions": 0}}, ensure_ascii=False)
+    summary = json.dumps({"total": 100, "positive": 60, "negative": 30, "neutral": 10})
+
+    async with engine.begin() as conn:
+        started = time.perf_counter()
+        await conn.execute(text(SEED_USERS_SQL.format(domain=BENCH_EMAIL_DOMAIN)), {"users": users})
+        await conn.execute(
+            text(SEED_REQUESTS_SQL.format(domain=BENCH_EMAIL_DOMAIN)),
+            {"rows": rows, "users": users}
+        )
+        await conn.execute(
+            text(SEED_RESULTS_SQL.format(domain=BENCH_EMAIL_DOMAIN)),
+            {"aspects": aspects, "categories": categories, "summary": summary}
+        )
+        print(f"Сид: {rows} анализов за {time.perf_counter() - started:.1f} с")
+
+
+async def cleanup(engine) -> None:
+    async with engine.begin() as conn:
+        bench_users = f"SELECT id FROM \"user\" WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'"
+        await conn.execute(text(
+            f"DELETE FROM analysis_results WHERE request_id IN "
+            f"(SELECT id FROM analysis_requests WHERE user_id IN ({bench_users}))"
+        ))
+        await conn.execute(text(f"DELETE FROM analysis_requests WHERE user_id IN ({bench_users})"))
+        await conn.execute(text(f"DELETE FROM \"user\" WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'"))
+
+
+async def explain(engine, user_id: int, request_id: int) -> None:
+    queries = {
+        "list": (
+            "SELECT * FROM analysis_requests WHERE user_id = :user_id "
+            "ORDER BY created_at DESC LIMIT 100",
+            {"user_id": user_id},
+        ),
+        "result": (
+            "SELECT * FROM analysis_results WHERE request_id = :request_id",
+            {"request_id": request_id},
+        ),
+    }
+    async with engine.connect() as conn:
+        for name, (sql, params) in queries.items():
+            plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+            print(f"--- {name}")
+            for (line,) in plan:
+                print(line)
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), echo=False)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if args.cleanup:
+        await cleanup(engine)
+        await engine.dispose()
+        return
+
+    if not args.skip_seed:
+        await seed(engine, args.rows, args.users)
+
+    async with engine.connect() as conn:
+        user_ids = (await conn.execute(text(
+            f"SELECT id FROM \"user\" WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'"
+        ))).scalars().all()
+        request_ids = (await conn.execute(text(
+            "SELECT id FROM analysis_requests TABLESAMPLE SYSTEM (1) LIMIT 1000"
+        ))).scalars().all()
+    if not user_ids or not request_ids:
+        raise SystemExit("Нет данных для замера: запустите без --skip-seed")
+
+    random.seed(0)
+    random.shuffle(user_ids)
+    random.shuffle(request_ids)
+
+    scenarios = {
+        "list": lambda db, user_id: crud_analysis.get_summaries_by_user(db, user_id=user_id, limit=100),
+        "progress": lambda db, request_id: crud_analysis.get(db, id=request_id),
+        "result": lambda db, request_id: crud_analysis.get_result(db, request_id=request_id),
+    }
+    scenario_ids = {"list": user_ids, "progress": request_ids, "result": request_ids}
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for phase in ("before", "after"):
+        async with engine.begin() as conn:
+            for name, ddl in INDEXES.items():
+                if phase == "before":
+                    await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                else:
+                    await conn.execute(text(ddl))
+            await conn.execute(text("ANALYZE analysis_requests"))
+            await conn.execute(text("ANALYZE analysis_results"))
+
+        report[phase] = {}
+        for name, query in scenarios.items():
+            report[phase][name] = await _measure(session_factory, query, scenario_ids[name], args.repeats)
+
+        if args.explain:
+            print(f"=== {phase}")
+            await explain(engine, user_ids[0], request_ids[0])
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Сколько анализов создать")
+    parser.add_argument("--users", type=int, default=1000, help="Между сколькими пользователями их распределить")
+    parser.add_argument("--repeats", type=int, default=200, help="Запросов на сценарий")
+    parser.add_argument("--skip-seed", action="store_true", help="Использовать ранее созданные данные")
+    parser.add_argument("--explain", action="store_true", help="Печатать EXPLAIN ANALYZE для каждой фазы")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить данные бенчмарка и выйти")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
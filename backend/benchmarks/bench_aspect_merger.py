@@ -0,0 +1,108 @@
+"""Слияние похожих аспектов: прежний полный перебор пар против инвертированного индекса.
+
+Генерирует синтетические аспекты (по умолчанию 10 000 различных), проверяет, что
+результат слияния совпадает с прежним, и меряет время. Лемматизация подменена
+тождественной, чтобы замерять только слияние. Запуск из каталога backend:
+
+    python -m benchmarks.bench_aspect_merger --aspects 10000
+"""
+import argparse
+import json
+import random
+import time
+from typing import List, Set, Tuple
+
+from app.services.analyzer.aspect_merger import AspectMerger
+from app.services.analyzer.config import AnalyzerConfig
+from benchmarks.corpus import _ASPECTS, _NEGATIVE, _POSITIVE
+
+
+class IdentityPreprocessor:
+    def lemmatize_text(self, text: str) -> str:
+        return text
+
+
+def legacy_merge_similar_aspects(
+    aspects: List[Tuple[str, int]],
+    similarity_threshold: float
+) -> List[Tuple[str, int]]:
+    def calculate_similarity(lemma1: str, lemma2: str) -> float:
+        words1 = set(lemma1.split())
+        words2 = set(lemma2.split())
+        if not words1 or not words2:
+            return 0.0
+        jaccard = len(words1 & words2) / len(words1 | words2)
+        if words1.issubset(words2) or words2.issubset(words1):
+            jaccard = max(jaccard, 0.7)
+        return jaccard
+
+    lemma_aspects = [(aspect.lower(), aspect, count) for aspect, count in aspects]
+    merged_aspects_dict = {}
+    used_indices: Set[int] = set()
+
+    for i, (lemma_i, aspect_i, count_i) in enumerate(lemma_aspects):
+        if i in used_indices:
+            continue
+        merged_aspect_base = aspect_i
+        merged_count = count_i
+        used_indices.add(i)
+        for j, (lemma_j, aspect_j, count_j) in enumerate(lemma_aspects):
+            if j <= i or j in used_indices:
+                continue
+            if calculate_similarity(lemma_i, lemma_j) >= similarity_threshold:
+                if len(aspect_j) > len(merged_aspect_base) * 1.2:
+                    merged_aspect_base = aspect_j
+                merged_count += count_j
+                used_indices.add(j)
+        merged_aspects_dict[merged_aspect_base] = merged_count
+
+    return sorted(merged_aspects_dict.items(), key=lambda x: x[1], reverse=True)
+
+
+def synthetic_aspects(size: int, seed: int = 0) -> List[Tuple[str, int]]:
+    # Словарь шире, чем в корпусе отзывов: у крупных товаров тысячи различных аспектов.
+    # Часть аспектов - перестановки уже созданных, чтобы слияние действительно происходило
+    rng = random.Random(seed)
+    vocabulary = _ASPECTS + _POSITIVE + _NEGATIVE + [f"слово{i}" for i in range(size // 2)]
+    aspects = {}
+    while len(aspects) < size:
+        if aspects and rng.random() < 0.2:
+            words = rng.choice(list(aspects)).split()
+            rng.shuffle(words)
+        else:
+            words = [rng.choice(_ASPECTS)] + rng.sample(vocabulary, rng.randint(0, 3))
+        aspects[" ".join(words)] = rng.randint(1, 50)
+    return list(aspects.items())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aspects", type=int, default=10000, help="Число различных аспектов")
+    parser.add_argument("--threshold", type=float, default=AnalyzerConfig.similarity_threshold)
+    args = parser.parse_args()
+
+    aspects = synthetic_aspects(args.aspects)
+    merger = AspectMerger(IdentityPreprocessor(), AnalyzerConfig(similarity_threshold=args.threshold))
+
+    started = time.perf_counter()
+    legacy = legacy_merge_similar_aspects(aspects, args.threshold)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    current = merger.merge_similar_aspects(aspects)
+    current_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "aspects": len(aspects),
+        "merged": len(current),
+        "identical": legacy == current,
+        "legacy_s": round(legacy_seconds, 3),
+        "current_s": round(current_seconds, 3),
+        "speedup": round(legacy_seconds / current_seconds, 1),
+    }, indent=2))
+    if legacy != current:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Время импорта приложения по данным `python -X importtime`.
+
+Импортирует модуль (по умолчанию app.main) в чистом процессе, суммирует отчет
+importtime по пакетам верхнего уровня и проверяет, что тяжелые зависимости не
+загружаются при старте. Запуск из каталога backend:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --module app.api.endpoints.auth --top 15
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+HEAVY_MODULES = ["torch", "transformers", "selenium", "selenium_stealth", "pymorphy2", "pandas"]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+PROBE_SCRIPT = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "wall_ms": elapsed * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Собственное время импорта (мкс), просуммированное по пакетам верхнего уровня"""
+    self_by_package = defaultdict(int)
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, name = match.groups()
+            self_by_package[name.split(".")[0]] += int(self_us)
+    return self_by_package
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Импортируемый модуль")
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых дорогих пакетов показать")
+    args = parser.parse_args()
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE_SCRIPT.format(module=args.module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        print(completed.stderr[-2000:], file=sys.stderr)
+        raise SystemExit(completed.returncode)
+
+    probe = json.loads(completed.stdout.strip().splitlines()[-1])
+    self_by_package = parse_importtime(completed.stderr)
+    slowest = sorted(self_by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(json.dumps({
+        "module": args.module,
+        "wall_ms": round(probe["wall_ms"], 1),
+        "max_rss_mb": round(probe["max_rss_mb"], 1),
+        "heavy_modules_loaded": probe["loaded"],
+        "slowest_packages_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }, indent=2, ensure_ascii=False))
+    if probe["loaded"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
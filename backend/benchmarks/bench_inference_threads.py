@@ -0,0 +1,104 @@
+"""Пропускная способность инференса при разных сочетаниях воркеров и потоков torch.
+
+Каждое сочетание запускается в отдельном процессе: число inter-op потоков torch
+фиксируется один раз на процесс. Настройки передаются через те же переменные
+окружения, что читает AnalyzerConfig. Запуск из каталога backend:
+
+    python -m benchmarks.bench_inference_threads --model /path/to/model --reviews 512
+    python -m benchmarks.bench_inference_threads --workers 1,2,4 --intra 1,2,4,8
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+from app.services.analyzer.cpu import available_cpus, cgroup_cpu_limit
+from benchmarks.corpus import synthetic_corpus
+
+
+def _int_list(value: str):
+    return [int(item) for item in value.split(",") if item]
+
+
+def run_single(args: argparse.Namespace) -> None:
+    from app.services.analyzer.review_analyzer import ReviewAnalyzer
+
+    corpus = synthetic_corpus(args.reviews, seed=1)
+    analyzer = ReviewAnalyzer(model_path=args.model)
+    analyzer.config.batch_size = args.batch_size
+
+    # Прогрев: первая итерация платит за аллокации и ленивую инициализацию torch
+    analyzer.extractor.extract_aspects_batch(corpus[:args.batch_size])
+
+    best = float("inf")
+    for _ in range(args.repeats):
+        analyzer.cache.clear()
+        started = time.perf_counter()
+        analyzer.analyze_reviews(corpus)
+        best = min(best, time.perf_counter() - started)
+
+    print(json.dumps({"seconds": best, "reviews_per_second": len(corpus) / best}))
+
+
+def sweep(args: argparse.Namespace) -> None:
+    cpus = available_cpus()
+    workers_options = _int_list(args.workers) if args.workers else sorted({1, 2, max(1, cpus // 2), cpus})
+    intra_options = _int_list(args.intra) if args.intra else sorted({1, 2, max(1, cpus // 2), cpus})
+
+    results = []
+    for workers, intra in itertools.product(workers_options, intra_options):
+        env = dict(
+            os.environ,
+            ANALYZER_WORKERS=str(workers),
+            TORCH_INTRA_OP_THREADS=str(intra),
+            TORCH_INTER_OP_THREADS=str(args.inter),
+        )
+        command = [
+            sys.executable, "-m", "benchmarks.bench_inference_threads", "--single",
+            "--reviews", str(args.reviews), "--batch-size", str(args.batch_size),
+            "--repeats", str(args.repeats),
+        ]
+        if args.model:
+            command += ["--model", args.model]
+
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        measurement = json.loads(output.strip().splitlines()[-1])
+        results.append({
+            "workers": workers,
+            "intra_op_threads": intra,
+            "oversubscribed": workers * intra > cpus,
+            "reviews_per_second": round(measurement["reviews_per_second"], 1),
+        })
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    results.sort(key=lambda row: row["reviews_per_second"], reverse=True)
+    print(json.dumps({
+        "available_cpus": cpus,
+        "cgroup_limit": cgroup_cpu_limit(),
+        "results": results,
+    }, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Каталог модели (по умолчанию из AnalyzerConfig)")
+    parser.add_argument("--reviews", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", help="Список числа воркеров через запятую")
+    parser.add_argument("--intra", help="Список числа intra-op потоков через запятую")
+    parser.add_argument("--inter", type=int, default=1, help="Число inter-op потоков")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args)
+    else:
+        sweep(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Стоимость морфологии pymorphy2: холодная загрузка словарей против общего анализатора.
+
+Меряет в отдельном процессе импорт pymorphy2 и первое создание MorphAnalyzer, затем
+сравнивает прежний вызов статических помощников (новый MorphAnalyzer на каждый
+вызов) с текущим, где все TextPreprocessor используют один анализатор. Запуск из
+каталога backend:
+
+    python -m benchmarks.bench_morph_startup --calls 20
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from app.services.analyzer.review_analyzer import ReviewAnalyzer
+
+COLD_START_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import pymorphy2
+imported = time.perf_counter()
+morph = pymorphy2.MorphAnalyzer()
+loaded = time.perf_counter()
+morph.parse("качество")
+parsed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "dictionaries_ms": (loaded - imported) * 1000,
+    "first_parse_ms": (parsed - loaded) * 1000,
+}))
+"""
+
+SAMPLE_TEXT = "отличное качество и быстрая доставка"
+
+
+def cold_start() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return {key: round(value, 2) for key, value in json.loads(output).items()}
+
+
+def legacy_lemmatize_text(text: str) -> str:
+    import pymorphy2
+
+    morph = pymorphy2.MorphAnalyzer()
+    return " ".join(morph.parse(word)[0].normal_form for word in text.split())
+
+
+def _per_call_ms(func, calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        # Уникальный хвост, чтобы кэш лемм не скрывал стоимость разбора
+        func(f"{SAMPLE_TEXT} {i}")
+    return round((time.perf_counter() - started) / calls * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="Вызовов помощника на замер")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    ReviewAnalyzer.lemmatize_text(SAMPLE_TEXT)
+    first_call_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    print(json.dumps({
+        "cold_start": cold_start(),
+        "shared_first_call_ms": first_call_ms,
+        "legacy_per_call_ms": _per_call_ms(legacy_lemmatize_text, args.calls),
+        "shared_per_call_ms": _per_call_ms(ReviewAnalyzer.lemmatize_text, args.calls),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
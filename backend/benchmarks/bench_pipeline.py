@@ -0,0 +1,340 @@
+"""Сквозной бенчмарк анализатора отзывов с разбивкой по стадиям.
+
+Для каждого корпуса отдельно замеряются стадии конвейера: нормализация, токенизация,
+прямой проход модели, BIO-разбор, слияние похожих аспектов, коррекция тональности и
+категоризация, а затем весь путь analyze_sentiment целиком (отзывов в секунду и
+задержка батча). Результат - JSON с перцентилями и пиковым RSS процесса.
+
+Случай batch_vs_single делит корпус на --batch-products товаров с имитацией загрузки
+страниц (--page-delay) и сравнивает последовательные AnalysisPipeline с одним
+BatchAnalysisPipeline: время и число вызовов модели.
+
+Если в каталоге модели нет весов (saved_model не скачан), строится крошечная
+XLM-R модель со случайными весами и порог уверенности снимается - так бенчмарк
+работает офлайн и измеряет накладные расходы конвейера, а не качество модели.
+Запуск из каталога backend:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes 200,2000 --profiles short,long --output pipeline.json
+    python -m benchmarks.bench_pipeline --corpus reviews.jsonl --model /path/to/model
+    python -m benchmarks.bench_pipeline --baseline pipeline.json --max-regression 10
+
+С --baseline результат сравнивается с сохраненным ранее JSON по совпадающим корпусам:
+если пропускная способность упала или холодный прогон замедлился больше чем на
+--max-regression процентов, процесс завершается с кодом 1 (для CI).
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.corpus import load_corpus, synthetic_corpus
+from benchmarks.tiny_model import build_tiny_model, has_weights
+
+# Число предложений в синтетическом отзыве: (минимум, максимум)
+LENGTH_PROFILES = {
+    "short": (1, 2),
+    "medium": (3, 6),
+    "long": (12, 24),
+}
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _summary(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"calls": 0, "total_ms": 0.0}
+    values = np.asarray(samples) * 1000
+    return {
+        "calls": len(samples),
+        "total_ms": round(float(values.sum()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def _timed(samples: List[float], func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def _reset(analyzer) -> None:
+    analyzer.cache.clear()
+    analyzer.preprocessor.clear_caches()
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_stages(analyzer, corpus: List[str]) -> Dict[str, Any]:
+    """Прогоняет стадии конвейера по отдельности, повторяя порядок analyze_sentiment"""
+    _reset(analyzer)
+    extractor = analyzer.extractor
+    timings = {name: [] for name in (
+        "preprocess", "tokenize", "forward", "bio_decode", "merge", "correct", "categorize"
+    )}
+
+    clean_texts = [_timed(timings["preprocess"], analyzer.preprocessor.preprocess_review, text) for text in corpus]
+    unique_texts = list(dict.fromkeys(text for text in clean_texts if text))
+
+    window_texts, _ = extractor.expand_windows(unique_texts)
+    if not window_texts:
+        return {name: _summary(samples) for name, samples in timings.items()}
+    encoded = _timed(timings["tokenize"], extractor.encode, window_texts)
+
+    pos_counter, neg_counter = Counter(), Counter()
+    for batch in extractor.batch_order(encoded):
+        predictions = _timed(
+            timings["forward"], extractor._get_model_predictions,
+            [encoded.input_ids[i] for i in batch],
+            [encoded.offsets[i] for i in batch]
+        )
+        batch_texts = [window_texts[i] for i in batch]
+        for pos_aspects, neg_aspects in _timed(timings["bio_decode"], extractor._process_bio_predictions, batch_texts, *predictions):
+            pos_counter.update(pos_aspects)
+            neg_counter.update(neg_aspects)
+
+    merged_pos = _timed(timings["merge"], analyzer.merger.merge_similar_aspects, list(pos_counter.items()))
+    merged_neg = _timed(timings["merge"], analyzer.merger.merge_similar_aspects, list(neg_counter.items()))
+    corrected_pros, corrected_cons = _timed(timings["correct"], analyzer.classifier.correct_aspects, merged_pos, merged_neg)
+    _timed(timings["categorize"], analyzer.categorizer.categorize_aspects, corrected_pros)
+    _timed(timings["categorize"], analyzer.categorizer.categorize_aspects, corrected_cons)
+
+    stages = {name: _summary(samples) for name, samples in timings.items()}
+    stages["windows"] = len(window_texts)
+    stages["unique_aspects"] = len(pos_counter) + len(neg_counter)
+    return stages
+
+
+def measure_end_to_end(analyzer, corpus: List[str], repeats: int) -> Dict[str, Any]:
+    """Весь путь как в фоновой задаче: батчи по batch_size, затем агрегация по всем отзывам"""
+    batch_size = analyzer.config.batch_size
+    best = float("inf")
+    batch_latencies: List[float] = []
+
+    for _ in range(repeats):
+        _reset(analyzer)
+        started = time.perf_counter()
+        for batch_start in range(0, len(corpus), batch_size):
+            _timed(batch_latencies, analyzer.analyze_reviews, corpus[batch_start:batch_start + batch_size])
+        analyzer.analyze_sentiment(corpus)
+        best = min(best, time.perf_counter() - started)
+
+    # analyze_sentiment повторно читает кэш аспектов, поэтому в цикле выше он не сбрасывается
+    _reset(analyzer)
+    started = time.perf_counter()
+    analyzer.analyze_sentiment(corpus)
+    cold = time.perf_counter() - started
+
+    return {
+        "best_seconds": round(best, 3),
+        "reviews_per_second": round(len(corpus) / best, 1),
+        "cold_sentiment_seconds": round(cold, 3),
+        "batch_latency": _summary(batch_latencies),
+    }
+
+
+class _InMemoryParser:
+    """Парсер-заглушка: отдает отзывы товара страницами с задержкой, как сеть"""
+
+    def __init__(self, texts: List[str], page_delay: float):
+        self.texts = texts
+        self.page_delay = page_delay
+
+    def iter_review_batches(self, product_id, max_reviews, batch_size):
+        for start in range(0, min(len(self.texts), max_reviews), batch_size):
+            time.sleep(self.page_delay)
+            yield [
+                {"id": index, "text": text}
+                for index, text in enumerate(self.texts[start:start + batch_size], start)
+            ]
+
+    def get_product_info(self, product_id):
+        return {"id": str(product_id)}
+
+
+class _CountingAnalyzer:
+    """Считает вызовы модели, остальное берет у настоящего анализатора"""
+
+    def __init__(self, analyzer):
+        self._analyzer = analyzer
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self._analyzer, name)
+
+    def analyze_reviews(self, texts):
+        self.calls += 1
+        return self._analyzer.analyze_reviews(texts)
+
+
+def measure_batch_vs_single(analyzer, corpus: List[str], products: int, page_delay: float) -> Dict[str, Any]:
+    """Одни и те же товары: по одному через AnalysisPipeline и разом через BatchAnalysisPipeline"""
+    from app.services import rate_limiter
+    from app.services.analysis_pipeline import AnalysisPipeline, BatchAnalysisPipeline, BatchItem
+
+    # Без паузы между стартами: меряем конвейер, а не защиту от бана
+    rate_limiter._limiters["bench"] = rate_limiter.RateLimiter(products, 0.0)
+    chunks = [corpus[index::products] for index in range(products)]
+    counting = _CountingAnalyzer(analyzer)
+
+    async def single() -> None:
+        for index, texts in enumerate(chunks):
+            await AnalysisPipeline(counting, _InMemoryParser(texts, page_delay), str(index), len(texts)).run()
+
+    async def batch() -> None:
+        async def on_item_done(item):
+            pass
+        items = [
+            BatchItem(key=index, parser=_InMemoryParser(texts, page_delay), product_id=str(index),
+                      marketplace="bench", max_reviews=len(texts))
+            for index, texts in enumerate(chunks)
+        ]
+        await BatchAnalysisPipeline(counting, items, on_item_done).run()
+
+    report = {"products": products, "page_delay_seconds": page_delay}
+    for name, run in (("single", single), ("batch", batch)):
+        _reset(analyzer)
+        counting.calls = 0
+        started = time.perf_counter()
+        asyncio.run(run())
+        report[name] = {"seconds": round(time.perf_counter() - started, 3), "inference_calls": counting.calls}
+    report["speedup"] = round(report["single"]["seconds"] / max(report["batch"]["seconds"], 1e-9), 2)
+    return report
+
+
+def find_regressions(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Сравнивает end_to_end по корпусам, которые есть в обоих отчетах"""
+    previous = {item["corpus"]: item["end_to_end"] for item in baseline.get("results", [])}
+    limit = max_regression / 100
+    regressions = []
+    for item in report["results"]:
+        before = previous.get(item["corpus"])
+        if before is None:
+            continue
+        after = item["end_to_end"]
+        # Пропускная способность - чем больше, тем лучше; время холодного прогона - наоборот
+        throughput_drop = 1 - after["reviews_per_second"] / before["reviews_per_second"]
+        if throughput_drop > limit:
+            regressions.append(
+                f"{item['corpus']}: reviews_per_second {before['reviews_per_second']} -> "
+                f"{after['reviews_per_second']} (-{throughput_drop:.1%})"
+            )
+        slowdown = after["cold_sentiment_seconds"] / before["cold_sentiment_seconds"] - 1
+        if slowdown > limit:
+            regressions.append(
+                f"{item['corpus']}: cold_sentiment_seconds {before['cold_sentiment_seconds']} -> "
+                f"{after['cold_sentiment_seconds']} (+{slowdown:.1%})"
+            )
+    return regressions
+
+
+def build_corpora(args: argparse.Namespace) -> Dict[str, List[str]]:
+    if args.corpus:
+        recorded = load_corpus(args.corpus, limit=max(_int_list(args.sizes)) if args.sizes else None)
+        return {f"recorded-{len(recorded)}": recorded}
+
+    corpora = {}
+    for profile in args.profiles.split(","):
+        min_sentences, max_sentences = LENGTH_PROFILES[profile]
+        for size in _int_list(args.sizes):
+            corpora[f"{profile}-{size}"] = synthetic_corpus(size, seed=size, min_sentences=min_sentences, max_sentences=max_sentences)
+    return corpora
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Каталог модели (по умолчанию из AnalyzerConfig)")
+    parser.add_argument("--corpus", help="Записанные отзывы (.jsonl или .txt) вместо синтетических")
+    parser.add_argument("--sizes", default="100,1000", help="Размеры корпусов через запятую")
+    parser.add_argument("--profiles", default="short,medium,long", help=f"Профили длины: {', '.join(LENGTH_PROFILES)}")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-products", type=int, default=20, help="Товаров в случае batch_vs_single, 0 - пропустить")
+    parser.add_argument("--page-delay", type=float, default=0.05, help="Имитация загрузки страницы, секунд")
+    parser.add_argument("--output", help="Куда сохранить JSON с результатами")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Допустимое ухудшение относительно --baseline, %%")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    from app.services.analyzer.config import AnalyzerConfig
+    from app.services.analyzer.review_analyzer import ReviewAnalyzer
+
+    corpora = build_corpora(args)
+    model_path = args.model or AnalyzerConfig().model_path
+    tiny_model = not has_weights(model_path)
+
+    with tempfile.TemporaryDirectory() as tiny_dir:
+        if tiny_model:
+            print("Веса модели не найдены, используется случайная tiny-модель", file=sys.stderr)
+            model_path = build_tiny_model(tiny_dir, (text for corpus in corpora.values() for text in corpus))
+
+        analyzer = ReviewAnalyzer(model_path=model_path, confidence_threshold=0.0 if tiny_model else 0.75)
+        analyzer.config.batch_size = args.batch_size
+
+        started = time.perf_counter()
+        analyzer.extractor.extract_aspects_batch(next(iter(corpora.values()))[:args.batch_size])
+        load_seconds = time.perf_counter() - started
+
+        results = []
+        for name, corpus in corpora.items():
+            results.append({
+                "corpus": name,
+                "reviews": len(corpus),
+                "avg_chars": round(sum(map(len, corpus)) / max(len(corpus), 1), 1),
+                "stages": measure_stages(analyzer, corpus),
+                "end_to_end": measure_end_to_end(analyzer, corpus, args.repeats),
+            })
+            if args.batch_products > 0:
+                results[-1]["batch_vs_single"] = measure_batch_vs_single(
+                    analyzer, corpus, min(args.batch_products, len(corpus)), args.page_delay
+                )
+            print(json.dumps({"corpus": name, **results[-1]["end_to_end"]}, ensure_ascii=False), file=sys.stderr)
+
+    report = {
+        "model": "tiny-random" if tiny_model else model_path,
+        "batch_size": args.batch_size,
+        "max_workers": analyzer.config.max_workers,
+        "intra_op_threads": analyzer.config.intra_op_threads,
+        "load_and_first_batch_seconds": round(load_seconds, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+    if baseline is not None:
+        if baseline.get("model") != report["model"]:
+            print(f"Базовый прогон сделан на другой модели: {baseline.get('model')}", file=sys.stderr)
+        regressions = find_regressions(report, baseline, args.max_regression)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
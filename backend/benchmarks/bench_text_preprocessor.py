@@ -0,0 +1,97 @@
+"""Микробенчмарк нормализации отзывов: прежняя многопроходная версия против normalize_review.
+
+Сначала проверяет, что на всем корпусе результаты совпадают посимвольно, затем меряет
+время. Запуск из каталога backend:
+
+    python -m benchmarks.bench_text_preprocessor --size 20000
+    python -m benchmarks.bench_text_preprocessor --corpus reviews.jsonl
+"""
+import argparse
+import json
+import re
+import string
+import time
+import unicodedata
+from typing import Callable, List
+
+from app.services.analyzer.text_preprocessor import normalize_review
+from benchmarks.corpus import load_corpus, synthetic_corpus
+
+
+def legacy_preprocess_review(review: str) -> str:
+    review = unicodedata.normalize('NFKC', review).lower()
+    emoji_pattern = re.compile(
+        "["
+        u"\U0001F000-\U0001F9FF"
+        u"\U00002700-\U000027BF"
+        u"\U0001F600-\U0001F64F"
+        u"\U0001F300-\U0001F5FF"
+        u"\U0001F680-\U0001F6FF"
+        u"\U0001F700-\U0001F77F"
+        u"\U0001F780-\U0001F7FF"
+        u"\U0001F800-\U0001F8FF"
+        u"\U0001F900-\U0001F9FF"
+        u"\U00002702-\U000027B0"
+        u"\U000024C2-\U0001F251"
+        u"\U0001f926-\U0001f937"
+        u"\U0001F1E0-\U0001F1FF"
+        u"\u200d"
+        u"\u2640-\u2642"
+        u"\u2600-\u2B55"
+        u"\u23cf"
+        u"\u23e9"
+        u"\u231a"
+        u"\u3030"
+        u"\ufe0f"
+        "]+", flags=re.UNICODE
+    )
+    review = emoji_pattern.sub(' ', review)
+    replacements = {
+        '&amp;': '&', '&lt;': '<', '&gt;': '>',
+        '&quot;': '"', '&#39;': "'"
+    }
+    for entity, char in replacements.items():
+        review = review.replace(entity, char)
+    review = re.sub(r'[\s\t\n\r]+', ' ', review)
+    review = re.sub(r'([!?,.;:])\1+', r'\1', review)
+    review = re.sub(r'([!?,.;:])([^\s])', r'\1 \2', review)
+    return review.strip(string.punctuation + ' ')
+
+
+def _time_it(func: Callable[[str], str], corpus: List[str], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000, help="Размер синтетического корпуса")
+    parser.add_argument("--corpus", help="Файл с записанными отзывами (.jsonl или .txt)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.size)
+
+    mismatches = [text for text in corpus if legacy_preprocess_review(text) != normalize_review(text)]
+    if mismatches:
+        print(json.dumps({"parity": False, "mismatches": len(mismatches), "example": mismatches[0]}, ensure_ascii=False))
+        raise SystemExit(1)
+
+    legacy = _time_it(legacy_preprocess_review, corpus, args.repeats)
+    current = _time_it(normalize_review, corpus, args.repeats)
+    print(json.dumps({
+        "parity": True,
+        "reviews": len(corpus),
+        "legacy_us_per_review": round(legacy / len(corpus) * 1e6, 2),
+        "current_us_per_review": round(current / len(corpus) * 1e6, 2),
+        "speedup": round(legacy / current, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
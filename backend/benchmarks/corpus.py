@@ -0,0 +1,71 @@
+"""Корпуса отзывов для бенчмарков: синтетический генератор и загрузка записанных отзывов."""
+import json
+import random
+from pathlib import Path
+from typing import List, Optional
+
+_ASPECTS = [
+    "качество", "цена", "доставка", "упаковка", "размер", "цвет", "материал", "ткань",
+    "швы", "запах", "батарея", "экран", "звук", "инструкция", "застежка", "подошва",
+    "ручка", "крышка", "комплектация", "вес", "дизайн", "кнопки", "зарядка", "чехол",
+]
+_POSITIVE = [
+    "отличное", "хорошее", "прекрасное", "удобная", "приятный", "качественный",
+    "красивый", "надежная", "быстрая", "недорогой", "стильный", "прочный",
+]
+_NEGATIVE = [
+    "плохое", "ужасная", "неудобная", "дорогой", "слабая", "кривые", "громоздкий",
+    "медленная", "некачественный", "грязная", "шумный", "не работает",
+]
+_FILLERS = [
+    "в целом", "честно говоря", "как и ожидалось", "к сожалению", "пришел вовремя",
+    "заказывала уже второй раз", "рекомендую", "не советую", "за эти деньги",
+    "посмотрим как будет дальше", "продавец ответил быстро", "муж доволен",
+]
+_DECORATIONS = ["!!!", "...", "??", " 👍", " 😡", " &quot;ок&quot;", " &amp;", ",,", "\n", "  "]
+
+
+def synthetic_review(rng: random.Random, min_sentences: int = 1, max_sentences: int = 6) -> str:
+    sentences = []
+    for _ in range(rng.randint(min_sentences, max_sentences)):
+        aspect = rng.choice(_ASPECTS)
+        opinion = rng.choice(_POSITIVE if rng.random() < 0.6 else _NEGATIVE)
+        sentence = f"{aspect} {opinion}"
+        if rng.random() < 0.4:
+            sentence = f"{rng.choice(_FILLERS)}, {sentence}"
+        if rng.random() < 0.3:
+            sentence += rng.choice(_DECORATIONS)
+        sentences.append(sentence.capitalize())
+    text = ". ".join(sentences)
+    if rng.random() < 0.3:
+        text = f"Достоинства: {text} Недостатки: {rng.choice(_ASPECTS)} {rng.choice(_NEGATIVE)}"
+    return text
+
+
+def synthetic_corpus(
+    size: int,
+    seed: int = 0,
+    min_sentences: int = 1,
+    max_sentences: int = 6
+) -> List[str]:
+    rng = random.Random(seed)
+    return [synthetic_review(rng, min_sentences, max_sentences) for _ in range(size)]
+
+
+def load_corpus(path: str, limit: Optional[int] = None) -> List[str]:
+    """Читает записанные отзывы: .jsonl (поля text/pros/cons, как у парсеров) или .txt (по строке)."""
+    texts = []
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                parts = [str(record[key]) for key in ("text", "pros", "cons") if record.get(key)]
+                line = " ".join(parts)
+            if line:
+                texts.append(line)
+            if limit and len(texts) >= limit:
+                break
+    return texts
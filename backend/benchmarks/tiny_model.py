@@ -0,0 +1,60 @@
+"""Крошечная XLM-R модель со случайными весами для запуска бенчмарков без saved_model.
+
+Точность такой модели бессмысленна, но формы тензоров, токенизация со смещениями,
+BIO-разбор и агрегация проходят тот же путь, что и с настоящей моделью.
+"""
+import os
+from typing import Iterable
+
+LABELS = ["O", "B-POS", "I-POS", "B-NEG", "I-NEG"]
+_ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяabcdefghijklmnopqrstuvwxyz0123456789!?,.;:-()\"'&#<>"
+_SPECIAL_TOKENS = ["<s>", "<pad>", "</s>", "<unk>"]
+
+
+def has_weights(model_path: str) -> bool:
+    return any(
+        os.path.exists(os.path.join(model_path, name))
+        for name in ("model.safetensors", "pytorch_model.bin")
+    )
+
+
+def build_tiny_model(directory: str, texts: Iterable[str], seed: int = 0, max_len: int = 256) -> str:
+    """Сохраняет в directory модель и Unigram-токенизатор по словарю текстов"""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import XLMRobertaConfig, XLMRobertaForTokenClassification, XLMRobertaTokenizerFast
+
+    words = sorted({word for text in texts for word in text.lower().split()})
+    vocab = [(token, 0.0) for token in _SPECIAL_TOKENS]
+    vocab += [(char, -10.0) for char in _ALPHABET]
+    vocab += [(word, -1.0) for word in words if len(word) > 1]
+
+    tokenizer = Tokenizer(models.Unigram(vocab, unk_id=_SPECIAL_TOKENS.index("<unk>")))
+    tokenizer.pre_tokenizer = pre_tokenizers.Sequence([
+        pre_tokenizers.WhitespaceSplit(),
+        pre_tokenizers.Punctuation(),
+    ])
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>",
+        special_tokens=[("<s>", 0), ("</s>", 2)],
+    )
+    XLMRobertaTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<s>", eos_token="</s>", cls_token="<s>", sep_token="</s>",
+        pad_token="<pad>", unk_token="<unk>", mask_token="<unk>",
+    ).save_pretrained(directory)
+
+    torch.manual_seed(seed)
+    config = XLMRobertaConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+        max_position_embeddings=max_len + 4,
+        pad_token_id=1,
+        id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)},
+    )
+    XLMRobertaForTokenClassification(config).save_pretrained(directory)
+    return directory